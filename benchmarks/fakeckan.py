@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""In-process fake CKAN used by the benchmarks. It stands in for the requests session of the remote CKAN so that
+the library's own code is measured without any network."""
+import copy
+import json
+import threading
+
+from six.moves.urllib.parse import urlparse
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = dict()
+
+
+def synthetic_resource(dataset_index, resource_index):
+    return {'id': 'res-%d-%d' % (dataset_index, resource_index), 'package_id': 'ds-%d' % dataset_index,
+            'name': 'resource_%d_%d.csv' % (dataset_index, resource_index), 'format': 'CSV',
+            'url': 'http://example.org/%d/%d.csv' % (dataset_index, resource_index),
+            'description': 'Synthetic resource', 'url_type': 'api', 'resource_type': 'api',
+            'last_modified': '2017-01-01T00:00:00'}
+
+
+def synthetic_dataset(index, no_resources=2):
+    return {'id': 'ds-%d' % index, 'name': 'dataset-%d' % index, 'title': 'Synthetic dataset %d' % index,
+            'notes': 'Notes for synthetic dataset %d' % index, 'private': False, 'dataset_source': 'Benchmark',
+            'owner_org': 'org-%d' % (index % 50), 'maintainer': 'user-%d' % (index % 20),
+            'dataset_date': '01/01/2017', 'data_update_frequency': '7', 'license_id': 'cc-by',
+            'methodology': 'Other', 'groups': [{'name': 'afg'}], 'tags': [{'name': 'tag%d' % (index % 100)}],
+            'metadata_modified': '2017-01-01T00:00:%02d' % (index % 60),
+            'resources': [synthetic_resource(index, i) for i in range(no_resources)]}
+
+
+def synthetic_locations(number=250):
+    locations = list()
+    for i in range(number):
+        code = 'c%02d' % i
+        locations.append({'id': code, 'name': code, 'title': 'Country %d' % i, 'display_name': 'Country %d' % i})
+    return locations
+
+
+class FakeCKAN(object):
+    """Fake CKAN holding datasets, resources, organizations and locations in memory
+
+    Args:
+        no_datasets (int): Number of synthetic datasets. Defaults to 0.
+        no_resources (int): Number of resources per synthetic dataset. Defaults to 2.
+    """
+
+    def __init__(self, no_datasets=0, no_resources=2):
+        self.lock = threading.Lock()
+        self.datasets = list()
+        self.datasets_by_key = dict()
+        for i in range(no_datasets):
+            self.add_dataset(synthetic_dataset(i, no_resources))
+        self.locations = synthetic_locations()
+        self.datastore_records = dict()
+        self.calls = dict()
+        self.next_id = 0
+
+    def add_dataset(self, dataset):
+        self.datasets.append(dataset)
+        self.datasets_by_key[dataset['id']] = dataset
+        self.datasets_by_key[dataset['name']] = dataset
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    @staticmethod
+    def success(result):
+        return FakeResponse(200, json.dumps({'success': True, 'result': result}))
+
+    @staticmethod
+    def not_found(message='Not found'):
+        return FakeResponse(404, json.dumps({'success': False,
+                                             'error': {'__type': 'Not Found Error', 'message': message}}))
+
+    def new_id(self, prefix):
+        self.next_id += 1
+        return '%s-new-%d' % (prefix, self.next_id)
+
+    def post(self, url, data=None, headers=None, files=None, allow_redirects=False, **kwargs):
+        action = urlparse(url).path.rstrip('/').split('/')[-1]
+        if isinstance(data, bytes):
+            data = json.loads(data.decode('utf-8'))
+        data = data or dict()
+        with self.lock:
+            self.calls[action] = self.calls.get(action, 0) + 1
+            handler = getattr(self, 'action_%s' % action, None)
+            if handler is None:
+                return self.not_found('Unknown action %s' % action)
+            return handler(data)
+
+    def close(self):
+        pass
+
+    def action_package_search(self, data):
+        start = int(data.get('start', 0))
+        rows = int(data.get('rows', 10))
+        results = self.datasets[start:start + rows]
+        fl = data.get('fl')
+        if fl:
+            results = [{key: dataset[key] for key in fl if key in dataset} for dataset in results]
+        return self.success({'count': len(self.datasets), 'results': results})
+
+    def action_current_package_list_with_resources(self, data):
+        offset = int(data.get('offset', 0))
+        limit = int(data.get('limit', 10))
+        return self.success(self.datasets[offset:offset + limit])
+
+    def action_package_list(self, data):
+        return self.success([dataset['name'] for dataset in self.datasets])
+
+    def action_package_show(self, data):
+        dataset = self.datasets_by_key.get(data.get('id'))
+        if dataset is None:
+            return self.not_found()
+        return self.success(dataset)
+
+    def action_package_create(self, data):
+        dataset = copy.deepcopy(data)
+        dataset['id'] = self.new_id('ds')
+        for resource in dataset.get('resources', list()):
+            resource['id'] = self.new_id('res')
+            resource['package_id'] = dataset['id']
+        self.add_dataset(dataset)
+        return self.success(dataset)
+
+    def action_package_update(self, data):
+        existing = self.datasets_by_key.get(data.get('id')) or self.datasets_by_key.get(data.get('name'))
+        if existing is None:
+            return self.not_found()
+        dataset = copy.deepcopy(data)
+        dataset['id'] = existing['id']
+        for resource in dataset.get('resources', list()):
+            if 'id' not in resource:
+                resource['id'] = self.new_id('res')
+            resource['package_id'] = dataset['id']
+        existing.clear()
+        existing.update(dataset)
+        return self.success(existing)
+
+    def action_package_hxl_update(self, data):
+        return self.success(None)
+
+    def action_resource_show(self, data):
+        for dataset in self.datasets:
+            for resource in dataset.get('resources', list()):
+                if resource['id'] == data.get('id'):
+                    return self.success(resource)
+        return self.not_found()
+
+    def action_resource_update(self, data):
+        return self.success(data)
+
+    def action_group_list(self, data):
+        return self.success(self.locations)
+
+    def action_organization_show(self, data):
+        return self.success({'id': data.get('id'), 'name': data.get('id'), 'title': 'Organization'})
+
+    def action_datastore_delete(self, data):
+        self.datastore_records.pop(data.get('resource_id'), None)
+        return self.success(None)
+
+    def action_datastore_create(self, data):
+        self.datastore_records[data['resource_id']] = 0
+        return self.success({'resource_id': data['resource_id'], 'fields': data.get('fields')})
+
+    def action_datastore_upsert(self, data):
+        resource_id = data['resource_id']
+        self.datastore_records[resource_id] = self.datastore_records.get(resource_id, 0) + len(data['records'])
+        return self.success({'resource_id': resource_id})
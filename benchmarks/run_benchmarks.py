@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the library's hot paths run offline against an in-process fake CKAN.
+
+Run from the repository root with the library importable eg.
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --output report.json
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --scale 0.1 --baseline report.json
+
+Each benchmark is timed over several repeats and run once more under tracemalloc (Python 3 only) to find its peak
+memory. The report is written as JSON. If a baseline report is given, benchmarks whose median time or peak memory
+grew by more than the tolerance are listed and the exit code is 1.
+"""
+import argparse
+import csv
+import gc
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+from os.path import join
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from fakeckan import FakeCKAN, synthetic_dataset, synthetic_resource
+from hdx.data.dataset import Dataset
+from hdx.data.mirror import Mirror
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+from hdx.hdx_locations import Locations
+from hdx.utilities.path import script_dir_plus_file
+
+benchmarks = list()
+
+
+def benchmark(function):
+    benchmarks.append(function)
+    return function
+
+
+def setup_configuration(fake):
+    Configuration._create(hdx_site='prod', hdx_key='BENCHMARK', project_config_dict=dict())
+    Configuration.read().remoteckan().session = fake
+
+
+def new_dataset(name, no_resources):
+    data = synthetic_dataset(0, 0)
+    del data['id']
+    del data['resources']
+    data['name'] = name
+    dataset = Dataset(data)
+    for i in range(no_resources):
+        resource = synthetic_resource(0, i)
+        del resource['id']
+        del resource['package_id']
+        dataset.add_update_resource(resource)
+    return dataset
+
+
+@benchmark
+def configuration_construction(scale, tempdir):
+    """Construct 100 configurations"""
+    def run():
+        for _ in range(100):
+            Configuration(hdx_site='prod', hdx_key='BENCHMARK', project_config_dict=dict())
+    return run, None
+
+
+@benchmark
+def locations_lookup(scale, tempdir):
+    """Look up 1000 locations by code, name and partial name among 250 valid locations"""
+    fake = FakeCKAN()
+    setup_configuration(fake)
+    Locations._validlocations = None
+    Locations.validlocations()
+    names = [('C%02d' % i, 'Country %d' % i, 'country %d x' % i) for i in range(250)]
+
+    def run():
+        for i in range(1000):
+            code, name, partial = names[i % 250]
+            Locations.get_location_from_HDX_code(code)
+            Locations.get_HDX_code_from_location(name)
+            Locations.get_HDX_code_from_location_partial(partial)
+    return run, fake
+
+
+@benchmark
+def search_in_hdx(scale, tempdir):
+    """Search returning 50000 datasets"""
+    fake = FakeCKAN(int(50000 * scale))
+    setup_configuration(fake)
+
+    def run():
+        datasets = Dataset.search_in_hdx('*:*')
+        assert len(datasets) == len(fake.datasets)
+    return run, fake
+
+
+@benchmark
+def search_in_hdx_fields(scale, tempdir):
+    """Search returning id, name and metadata_modified of 50000 datasets"""
+    fake = FakeCKAN(int(50000 * scale))
+    setup_configuration(fake)
+
+    def run():
+        datasets = Dataset.search_in_hdx('*:*', fl=['id', 'name', 'metadata_modified'])
+        assert len(datasets) == len(fake.datasets)
+    return run, fake
+
+
+@benchmark
+def get_all_datasets(scale, tempdir):
+    """Get all of 50000 datasets"""
+    fake = FakeCKAN(int(50000 * scale))
+    setup_configuration(fake)
+
+    def run():
+        datasets = Dataset.get_all_datasets()
+        assert len(datasets) == len(fake.datasets)
+    return run, fake
+
+
+@benchmark
+def mirror_query(scale, tempdir):
+    """Query CSV resources of datasets with a tag in a mirror of 50000 datasets 100 times"""
+    fake = FakeCKAN(int(50000 * scale))
+    setup_configuration(fake)
+    mirror = Mirror(join(tempdir, 'mirror.db'))
+    mirror.add_datasets(fake.datasets)
+
+    def run():
+        for i in range(100):
+            resources = mirror.get_resources(format='csv', tag='tag%d' % i, location='afg')
+            assert len(resources) == 2 * len([x for x in fake.datasets[i::100]])
+    return run, fake
+
+
+@benchmark
+def create_in_hdx(scale, tempdir):
+    """Create 10 datasets each with 50 resources"""
+    fake = FakeCKAN()
+    setup_configuration(fake)
+    counter = [0]
+
+    def run():
+        for _ in range(10):
+            counter[0] += 1
+            new_dataset('benchmark-dataset-%d' % counter[0], 50).create_in_hdx()
+    return run, fake
+
+
+@benchmark
+def dataset_merge_hdx_update(scale, tempdir):
+    """Merge and update 10 datasets each with 50 resources"""
+    fake = FakeCKAN(10, 50)
+    setup_configuration(fake)
+
+    def setup():
+        datasets = list()
+        for i in range(10):
+            dataset = new_dataset('dataset-%d' % i, 50)
+            dataset['id'] = 'ds-%d' % i
+            dataset._dataset_load_from_hdx(dataset['id'])
+            datasets.append(dataset)
+        return datasets
+
+    def run(datasets):
+        for dataset in datasets:
+            dataset._dataset_merge_hdx_update(True)
+    return (setup, run), fake
+
+
+@benchmark
+def create_datastore(scale, tempdir):
+    """Upload a CSV of 1000000 rows to the datastore"""
+    fake = FakeCKAN()
+    setup_configuration(fake)
+    rows = int(1000000 * scale)
+    path = join(tempdir, 'datastore.csv')
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'country', 'date', 'value', 'comment'])
+        for i in range(rows):
+            writer.writerow([i, 'c%02d' % (i % 250), '2017-01-%02d' % (i % 28 + 1), i * 0.5, 'row %d' % i])
+    resource = Resource(synthetic_resource(0, 0))
+
+    def run():
+        resource.create_datastore(path=path)
+        assert fake.datastore_records[resource['id']] == rows
+    return run, fake
+
+
+def measure(function, scale, repeat, tempdir):
+    function_or_pair, fake = function(scale, tempdir)
+    if isinstance(function_or_pair, tuple):
+        setup, run = function_or_pair
+    else:
+        setup = None
+        run = function_or_pair
+
+    def timed():
+        args = (setup(),) if setup else ()
+        gc.collect()
+        start = timeit.default_timer()
+        run(*args)
+        return timeit.default_timer() - start
+
+    timed()  # warm up
+    calls_before = fake.total_calls() if fake else 0
+    times = [timed() for _ in range(repeat)]
+    calls = (fake.total_calls() - calls_before) // repeat if fake else 0
+    peak_memory = None
+    if tracemalloc is not None:
+        args = (setup(),) if setup else ()
+        gc.collect()
+        tracemalloc.start()
+        run(*args)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    times.sort()
+    return {'description': function.__doc__, 'times': times, 'min': times[0], 'median': times[len(times) // 2],
+            'peak_memory': peak_memory, 'hdx_calls': calls}
+
+
+def compare(report, baseline, tolerance):
+    regressions = list()
+    for name, result in report['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        for key in ('median', 'peak_memory'):
+            if result.get(key) is None or not base.get(key):
+                continue
+            ratio = result[key] / float(base[key])
+            if ratio > 1 + tolerance:
+                regressions.append('%s %s: %.4g -> %.4g (x%.2f)' % (name, key, base[key], result[key], ratio))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark HDX Python library hot paths offline')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for benchmark sizes eg. 0.01 for a quick run')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed repeats')
+    parser.add_argument('--only', nargs='*', help='Names of benchmarks to run')
+    parser.add_argument('--output', help='Path to write JSON report to')
+    parser.add_argument('--baseline', help='Path to JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed fractional slowdown or memory growth')
+    args = parser.parse_args(args)
+    logging.disable(logging.WARNING)
+    version_file = open(script_dir_plus_file('version.txt', Configuration))
+    report = {'version': version_file.read().strip(), 'python': platform.python_version(),
+              'platform': platform.platform(), 'scale': args.scale, 'repeat': args.repeat, 'benchmarks': dict()}
+    version_file.close()
+    tempdir = tempfile.mkdtemp()
+    try:
+        for function in benchmarks:
+            name = function.__name__
+            if args.only and name not in args.only:
+                continue
+            result = measure(function, args.scale, args.repeat, tempdir)
+            report['benchmarks'][name] = result
+            print('%-28s median %9.4fs  min %9.4fs  peak memory %s  HDX calls %d' %
+                  (name, result['median'], result['min'],
+                   '%.1fMB' % (result['peak_memory'] / 1048576.0) if result['peak_memory'] is not None else 'n/a',
+                   result['hdx_calls']))
+    finally:
+        shutil.rmtree(tempdir)
+        Configuration.delete()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('Regressions against %s:' % args.baseline)
+            for regression in regressions:
+                print('  %s' % regression)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -52,6 +52,7 @@ def get_readme():
 
 
 requirements = ['ckanapi',
+                'futures; python_version < "3"',
                 'hdx-python-country',
                 'ndg-httpsclient',
                 'pyasn1',
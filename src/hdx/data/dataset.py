@@ -1,17 +1,21 @@
 # -*- coding: utf-8 -*-
 """Dataset class containing all logic for creating, checking, and updating datasets and associated resources.
 """
+import json
 import logging
 import sys
+from collections import deque, OrderedDict
 from datetime import datetime
-from os.path import join
-from typing import List, Union, Optional, Dict, Any
+from os import rename, unlink
+from os.path import join, exists
+from typing import List, Union, Optional, Dict, Any, Callable, Tuple
 
 from dateutil import parser
 from hdx.location.country import Country
 from hdx.utilities import is_valid_uuid
 from hdx.utilities import raisefrom
 from hdx.utilities.dictandlist import merge_two_dictionaries
+import six
 from six.moves import range
 
 import hdx.data.organization
@@ -19,6 +23,7 @@ import hdx.data.resource
 import hdx.data.showcase
 from hdx.data.hdxobject import HDXObject, HDXError
 from hdx.data.user import User
+from hdx.hdx_changes import get_file_hash, is_unchanged
 from hdx.hdx_configuration import Configuration
 from hdx.hdx_locations import Locations
 
@@ -27,12 +32,74 @@ logger = logging.getLogger(__name__)
 max_attempts = 5
 page_size = 1000
 max_int = sys.maxsize
+keyset_sort = 'metadata_modified asc, id asc'
 
 
 class NotRequestableError(HDXError):
     pass
 
 
+class DatasetIterator(object):
+    """Iterator over datasets read from HDX a page at a time so that only one page of datasets is held in memory.
+    Datasets already returned are skipped if they appear again because HDX changed between pages. The position is the
+    offset of the next dataset to be returned and can be passed to iter_search_in_hdx or iter_all_datasets to resume
+    from there.
+
+    Args:
+        read_page (Callable[[int, int], List[Dict]]): Function taking offset and rows that returns dataset dictionaries
+        position (int): Offset of first dataset to return
+        total_rows (int): Maximum number of datasets to return
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+    """
+
+    def __init__(self, read_page, position, total_rows, configuration=None):
+        # type: (Callable[[int, int], List[Dict]], int, int, Optional[Configuration]) -> None
+        self.read_page = read_page
+        self.position = position
+        self.rows_left = total_rows
+        self.configuration = configuration
+        self.page = deque()  # type: deque
+        self.finished = False
+        self.ids = set()
+
+    def __iter__(self):
+        return self
+
+    def _read_next_page(self):
+        # type: () -> None
+        rows = min(self.rows_left, page_size)
+        results = self.read_page(self.position, rows)
+        if len(results) < rows:
+            self.finished = True
+        elif all(result.get('id') in self.ids for result in results):  # skipped by __next__ moving position past page
+            logger.debug('Page at offset %d only has datasets already returned!' % self.position)
+        self.page = deque(results)
+
+    def __next__(self):
+        # type: () -> 'Dataset'
+        while True:
+            if not self.page:
+                if self.finished or self.rows_left <= 0:
+                    raise StopIteration
+                self._read_next_page()
+                if not self.page:
+                    raise StopIteration
+            datasetdict = self.page.popleft()
+            self.position += 1
+            identifier = datasetdict.get('id')
+            if identifier in self.ids:  # already returned from an earlier page
+                continue
+            self.ids.add(identifier)
+            self.rows_left -= 1
+            dataset = Dataset(configuration=self.configuration)
+            dataset.old_data = dict()
+            dataset.data = datasetdict
+            dataset._dataset_create_resources()
+            return dataset
+
+    next = __next__
+
+
 class Dataset(HDXObject):
     """Dataset class enabling operations on datasets and associated resources.
 
@@ -98,6 +165,7 @@ class Dataset(HDXObject):
             'update': 'package_update',
             'create': 'package_create',
             'delete': 'package_delete',
+            'patch': 'package_patch',
             'search': 'package_search',
             'list': 'package_list',
             'all': 'current_package_list_with_resources',
@@ -239,11 +307,7 @@ class Dataset(HDXObject):
             Optional[Dataset]: Dataset object if successful read, None if not
         """
 
-        dataset = Dataset(configuration=configuration)
-        result = dataset._dataset_load_from_hdx(identifier)
-        if result:
-            return dataset
-        return None
+        return Dataset._read_identified('dataset', identifier, configuration, Dataset._dataset_load_from_hdx)
 
     def _dataset_create_resources(self):
         # type: () -> None
@@ -254,6 +318,9 @@ class Dataset(HDXObject):
             self.old_data['resources'] = self._copy_hdxobjects(self.resources, hdx.data.resource.Resource, 'file_to_upload')
             self.init_resources()
             self.separate_resources()
+            for resource in self.resources:
+                resource._set_clean()
+        self._set_clean()
 
     def _dataset_load_from_hdx(self, id_or_name):
         # type: (str) -> bool
@@ -293,12 +360,57 @@ class Dataset(HDXObject):
                 ignore_fields = ['package_id']
                 resource.check_required_fields(ignore_fields=ignore_fields)
 
-    def _dataset_merge_hdx_update(self, update_resources):
-        # type: (bool) -> None
+    def _dataset_hash_files(self):
+        # type: () -> None
+        """Set the hash field of resources with a file to upload to the hash of the file
+
+        Returns:
+            None
+        """
+        for resource in self.resources:
+            file_to_upload = resource.get_file_to_upload()
+            if file_to_upload:
+                resource['hash'] = get_file_hash(file_to_upload)
+
+    def _dataset_find_unchanged(self, update_resources):
+        # type: (bool) -> Tuple[bool, List[str]]
+        """Helper method to compare local metadata of dataset and its resources (in old_data after loading) with
+        metadata loaded from HDX. Files are compared using the hash field of resources.
+
+        Args:
+            update_resources (bool): Whether to compare resources
+
+        Returns:
+            Tuple[bool, List[str]]: (True if nothing changed, names of resources whose file is unchanged)
+        """
+        local = {key: value for key, value in self.old_data.items() if key != 'resources'}
+        unchanged = is_unchanged(local, self.data)
+        unchanged_files = list()
+        old_resources = self.old_data.get('resources', None)
+        if not update_resources or not old_resources:
+            return unchanged, unchanged_files
+        resources = {resource['name']: resource for resource in self.resources}
+        for old_resource in old_resources:
+            resource = resources.get(old_resource['name'])
+            if resource is None:
+                unchanged = False
+                continue
+            local = old_resource.data
+            if old_resource.get_file_to_upload():
+                if local.get('hash') and local['hash'] == resource.get('hash'):
+                    unchanged_files.append(resource['name'])
+                local = {key: value for key, value in local.items() if key != 'url'}  # url is set on upload
+            if not is_unchanged(local, resource.data):
+                unchanged = False
+        return unchanged, unchanged_files
+
+    def _dataset_merge_hdx_update(self, update_resources, unchanged_files=None):
+        # type: (bool, Optional[List[str]]) -> None
         """Helper method to check if dataset or its resources exist and update them
 
         Args:
             update_resources (bool): Whether to update resources
+            unchanged_files (Optional[List[str]]): Names of resources whose file need not be uploaded. Defaults to None.
 
         Returns:
             None
@@ -317,10 +429,16 @@ class Dataset(HDXObject):
                 for old_resource in old_resources:
                     if resource_name == old_resource['name']:
                         logger.warning('Resource exists. Updating %s' % resource_name)
+                        file_unchanged = unchanged_files is not None and resource_name in unchanged_files
+                        if file_unchanged and 'url' in old_resource.data:
+                            del old_resource['url']  # keep url of file already uploaded
                         merge_two_dictionaries(resource, old_resource)
                         if old_resource.get_file_to_upload():
                             resource.set_file_to_upload(old_resource.get_file_to_upload())
-                            filestore_resources.append(resource)
+                            if file_unchanged:
+                                logger.info('File of resource %s is unchanged. Not uploading' % resource_name)
+                            else:
+                                filestore_resources.append(resource)
                         resource.check_required_fields(ignore_fields=ignore_fields)
                         break
             for old_resource in old_resources:
@@ -341,16 +459,59 @@ class Dataset(HDXObject):
                     merge_two_dictionaries(created_resource, resource.data)
                     break
 
-    def update_in_hdx(self, update_resources=True):
-        # type: (Optional[bool]) -> None
-        """Check if dataset exists in HDX and if so, update it
+    def _dataset_patch_in_hdx(self, update_resources):
+        # type: (bool) -> None
+        """Helper method to update dataset and its resources in HDX sending only the fields modified since they were
+        read from HDX. Resources without an id are created.
 
         Args:
-            update_resources (Optional[bool]): Whether to update resources. Defaults to True.
+            update_resources (bool): Whether to update resources
 
         Returns:
             None
         """
+        if 'id' in self.data:
+            id_field_name = 'id'
+        else:
+            id_field_name = 'name'
+        self._check_existing_object('dataset', id_field_name)
+        if update_resources:
+            for resource in self.resources:
+                if 'id' in resource.data:
+                    resource.update_in_hdx(patch=True)
+                else:
+                    resource['package_id'] = self.data[id_field_name]
+                    resource.create_in_hdx()
+        self._patch_in_hdx('dataset', id_field_name, ignore_fields=['resources'])
+        if 'resources' in self.data:
+            del self.data['resources']
+            self._set_clean()
+
+    def update_in_hdx(self, update_resources=True, patch=False, skip_unchanged=False):
+        # type: (Optional[bool], Optional[bool], Optional[bool]) -> Optional[Dict]
+        """Check if dataset exists in HDX and if so, update it. With patch, only the fields of the dataset and its
+        resources modified since they were read from HDX are sent using package_patch and resource_patch without
+        reading the dataset first.
+
+        With skip_unchanged, the hash of each file to upload is put in the hash field of its resource. If the metadata
+        of the dataset and its resources and the hashes of the files match what is in HDX, nothing is sent to HDX.
+        Otherwise, files whose hashes match are not uploaded again. skip_unchanged does not apply to patch.
+
+        Args:
+            update_resources (Optional[bool]): Whether to update resources. Defaults to True.
+            patch (Optional[bool]): Whether to send only modified fields. Defaults to False.
+            skip_unchanged (Optional[bool]): Whether to skip sending what is unchanged. Defaults to False.
+
+        Returns:
+            Optional[Dict]: If skip_unchanged, what was skipped ie. {'dataset': True if not updated, 'files': names of resources whose file was not uploaded}
+        """
+        if patch:
+            self._dataset_patch_in_hdx(update_resources)
+            if 'id' in self.data:
+                self.hxl_update()
+            return None
+        if skip_unchanged and update_resources:
+            self._dataset_hash_files()
         loaded = False
         if 'id' in self.data:
             self._check_existing_object('dataset', 'id')
@@ -362,20 +523,38 @@ class Dataset(HDXObject):
             self._check_existing_object('dataset', 'name')
             if not self._dataset_load_from_hdx(self.data['name']):
                 raise HDXError('No existing dataset to update!')
-        self._dataset_merge_hdx_update(update_resources)
-        self.hxl_update()
+        if not skip_unchanged:
+            self._dataset_merge_hdx_update(update_resources)
+            self.hxl_update()
+            return None
+        unchanged, unchanged_files = self._dataset_find_unchanged(update_resources)
+        if unchanged:
+            logger.info('Dataset %s is unchanged. Not updating' % self.data['name'])
+        else:
+            self._dataset_merge_hdx_update(update_resources, unchanged_files)
+            self.hxl_update()
+        return {'dataset': unchanged, 'files': unchanged_files}
 
-    def create_in_hdx(self, allow_no_resources=False):
-        # type: (Optional[bool]) -> None
+    def create_in_hdx(self, allow_no_resources=False, skip_unchanged=False):
+        # type: (Optional[bool], Optional[bool]) -> Optional[Dict]
         """Check if dataset exists in HDX and if so, update it, otherwise create it
 
+        With skip_unchanged, the hash of each file to upload is put in the hash field of its resource. If the dataset
+        exists and the metadata of the dataset and its resources and the hashes of the files match what is in HDX,
+        nothing is sent to HDX. Otherwise, files whose hashes match are not uploaded again.
+
         Args:
             allow_no_resources (Optional[bool]): Whether to allow no resources. Defaults to False.
+            skip_unchanged (Optional[bool]): Whether to skip sending what is unchanged. Defaults to False.
 
         Returns:
-            None
+            Optional[Dict]: If skip_unchanged, what was skipped ie. {'dataset': True if not updated, 'files': names of resources whose file was not uploaded}
         """
         self.check_required_fields(allow_no_resources=allow_no_resources)
+        skipped = None
+        if skip_unchanged:
+            self._dataset_hash_files()
+            skipped = {'dataset': False, 'files': list()}
         loadedid = None
         if 'id' in self.data:
             if self._dataset_load_from_hdx(self.data['id']):
@@ -386,9 +565,16 @@ class Dataset(HDXObject):
             if self._dataset_load_from_hdx(self.data['name']):
                 loadedid = self.data['name']
         if loadedid:
+            unchanged_files = None
+            if skip_unchanged:
+                unchanged, unchanged_files = self._dataset_find_unchanged(True)
+                skipped = {'dataset': unchanged, 'files': unchanged_files}
+                if unchanged:
+                    logger.info('Dataset %s is unchanged. Not updating' % loadedid)
+                    return skipped
             logger.warning('Dataset exists. Updating %s' % loadedid)
-            self._dataset_merge_hdx_update(True)
-            return
+            self._dataset_merge_hdx_update(True, unchanged_files)
+            return skipped
 
         filestore_resources = list()
         if self.resources:
@@ -409,6 +595,7 @@ class Dataset(HDXObject):
         self.init_resources()
         self.separate_resources()
         self.hxl_update()
+        return skipped
 
     def delete_from_hdx(self):
         # type: () -> None
@@ -431,7 +618,8 @@ class Dataset(HDXObject):
     @staticmethod
     def search_in_hdx(query='*:*', configuration=None, **kwargs):
         # type: (Optional[str], Optional[Configuration], ...) -> List['Dataset']
-        """Searches for datasets in HDX
+        """Searches for datasets in HDX. Once the first page of results gives the count of matching datasets, the
+        remaining pages are read concurrently using up to max_workers of the configuration.
 
         Args:
             query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
@@ -446,26 +634,46 @@ class Dataset(HDXObject):
             facet.limit (int): Maximum number of values the facet fields return (- = unlimited). Defaults to 50.
             facet.field (List[str]): Fields to facet upon. Default is empty.
             use_default_schema (bool): Use default package schema instead of custom schema. Defaults to False.
+            keyset (bool): Page by last metadata_modified and id seen rather than by offset. Defaults to False.
+            fl (List[str]): Fields to return eg. ['id', 'name']. id is always returned. Defaults to all fields.
 
         Returns:
             List[Dataset]: list of datasets resulting from query
         """
 
         dataset = Dataset(configuration=configuration)
+        Dataset._add_required_fields(kwargs, 'id')
+        if kwargs.pop('keyset', False):
+            return Dataset._datasets_from_dicts(Dataset._keyset_search(dataset, query, **kwargs), configuration)
         total_rows = kwargs.get('rows', max_int)
         start = kwargs.get('start', 0)
+
+        def read_page(page):
+            # type: (int) -> Union[Dict, str]
+            pagetimespagesize = page * page_size
+            pagekwargs = dict(kwargs)  # copy so that pages can be read concurrently
+            pagekwargs['start'] = start + pagetimespagesize
+            pagekwargs['rows'] = min(total_rows - pagetimespagesize, page_size)
+            _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **pagekwargs)
+            return result
+
         all_datasets = None
         attempts = 0
         while attempts < max_attempts and all_datasets is None:  # if the count values vary for multiple calls, then must redo query
             all_datasets = list()
             counts = set()
-            for page in range(total_rows // page_size + 1):
-                pagetimespagesize = page * page_size
-                kwargs['start'] = start + pagetimespagesize
-                rows_left = total_rows - pagetimespagesize
-                rows = min(rows_left, page_size)
-                kwargs['rows'] = rows
-                _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **kwargs)
+            results = [read_page(0)]
+            first_count = results[0].get('count', None) if results[0] else None
+            expected_rows = min(total_rows, max(first_count - start, 0)) if first_count else 0
+            if expected_rows > page_size and len(results[0]['results']) >= page_size:
+                # The first page gives the count so the remaining pages are known and can be read concurrently
+                pages = range(1, (expected_rows + page_size - 1) // page_size)
+                for result, exception in dataset.configuration.run_concurrently(read_page, pages):
+                    if exception is not None:
+                        raise exception
+                    results.append(result)
+            for page, result in enumerate(results):
+                rows = min(total_rows - page * page_size, page_size)
                 datasets = list()
                 if result:
                     count = result.get('count', None)
@@ -473,11 +681,11 @@ class Dataset(HDXObject):
                         counts.add(count)
                         no_results = len(result['results'])
                         for datasetdict in result['results']:
-                            dataset = Dataset(configuration=configuration)
-                            dataset.old_data = dict()
-                            dataset.data = datasetdict
-                            dataset._dataset_create_resources()
-                            datasets.append(dataset)
+                            newdataset = Dataset(configuration=configuration)
+                            newdataset.old_data = dict()
+                            newdataset.data = datasetdict
+                            newdataset._dataset_create_resources()
+                            datasets.append(newdataset)
                         all_datasets += datasets
                         if no_results < rows:
                             break
@@ -485,11 +693,13 @@ class Dataset(HDXObject):
                         break
                 else:
                     logger.debug(result)
-            if all_datasets and len(counts) != 1:  # Make sure counts are all same for multiple calls to HDX
+            # Make sure counts are all same for multiple calls to HDX and that no more datasets were returned than
+            # counted (both happen if datasets are added or removed while paging)
+            if all_datasets and (len(counts) != 1 or len(all_datasets) > expected_rows):
                 all_datasets = None
                 attempts += 1
             else:
-                ids = [dataset['id'] for dataset in all_datasets]  # check for duplicates (shouldn't happen)
+                ids = [newdataset['id'] for newdataset in all_datasets]  # check for duplicates (shouldn't happen)
                 if len(ids) != len(set(ids)):
                     all_datasets = None
                     attempts += 1
@@ -497,6 +707,228 @@ class Dataset(HDXObject):
             raise HDXError('Maximum attempts reached for searching for datasets!')
         return all_datasets
 
+    @staticmethod
+    def _datasets_from_dicts(datasetdicts, configuration=None):
+        # type: (List[Dict], Optional[Configuration]) -> List['Dataset']
+        """Create datasets from dataset dictionaries read from HDX
+
+        Args:
+            datasetdicts (List[Dict]): Dataset dictionaries
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            List[Dataset]: list of datasets
+        """
+        datasets = list()
+        for datasetdict in datasetdicts:
+            dataset = Dataset(configuration=configuration)
+            dataset.old_data = dict()
+            dataset.data = datasetdict
+            dataset._dataset_create_resources()
+            datasets.append(dataset)
+        return datasets
+
+    @staticmethod
+    def _add_required_fields(kwargs, *fields):
+        # type: (Dict, ...) -> None
+        """If only some fields are to be returned by a search (fl), make sure that they include the given fields and
+        that they are a list as required by CKAN
+
+        Args:
+            kwargs (Dict): Search arguments
+            *fields: Fields that must be returned
+
+        Returns:
+            None
+        """
+        fl = kwargs.get('fl')
+        if not fl:
+            return
+        if isinstance(fl, six.string_types):
+            fl = fl.replace(',', ' ').split()
+        fl = list(fl)
+        for field in fields:
+            if field not in fl:
+                fl.append(field)
+        kwargs['fl'] = fl
+
+    @staticmethod
+    def _solr_key(datasetdict):
+        # type: (Dict) -> Tuple[str, str]
+        """Get sort key of dataset dictionary matching keyset_sort. Solr holds dates to the millisecond.
+
+        Args:
+            datasetdict (Dict): Dataset dictionary
+
+        Returns:
+            Tuple[str, str]: (metadata_modified to the millisecond, id)
+        """
+        return datasetdict['metadata_modified'][:23].rstrip('Z'), datasetdict['id']
+
+    @staticmethod
+    def _combine_fq(fq, keyfq):
+        # type: (Optional[str], str) -> str
+        """Combine filter query with key filter query
+
+        Args:
+            fq (Optional[str]): Filter query
+            keyfq (str): Key filter query
+
+        Returns:
+            str: Combined filter query
+        """
+        if fq:
+            return '(%s) AND %s' % (fq, keyfq)
+        return keyfq
+
+    @staticmethod
+    def _keyset_search(dataset, query, **kwargs):
+        # type: ('Dataset', str, ...) -> List[Dict]
+        """Read dataset dictionaries matching query from HDX sorted by keyset_sort. Each page continues from the last
+        dataset read rather than from an offset so that datasets being created, updated or deleted during the scan do
+        not cause datasets to be missed or repeated and the scan need not restart. Datasets updated during the scan
+        sort after the last read and so are read again, replacing their earlier metadata. Once the scan is finished,
+        if the count of matching datasets differs from the number read, the ids of matching datasets are read to remove
+        datasets deleted during the scan and add any that were missed.
+
+        Args:
+            dataset (Dataset): Dataset used to call HDX
+            query (str): Query (in Solr format)
+            **kwargs: See search_in_hdx. Any sort is ignored.
+
+        Returns:
+            List[Dict]: list of dataset dictionaries resulting from query
+        """
+        total_rows = kwargs.pop('rows', max_int)
+        start = kwargs.pop('start', 0)
+        fq = kwargs.pop('fq', None)
+        kwargs['sort'] = keyset_sort
+        Dataset._add_required_fields(kwargs, 'id', 'metadata_modified')
+        action = Dataset.actions()['search']
+
+        def search(**searchkwargs):
+            # type: (...) -> Tuple[int, List[Dict]]
+            searchkwargs.update(kwargs)
+            _, result = dataset._read_from_hdx('dataset', query, 'q', action, **searchkwargs)
+            if result and result.get('count', None):
+                return result['count'], result['results']
+            logger.debug(result)
+            return 0, list()
+
+        datasetdicts = OrderedDict()  # type: OrderedDict
+        last = None
+        skip = 0
+        while len(datasetdicts) < total_rows:
+            if last is None:
+                pagefq = fq
+                pagestart = start
+            else:  # inclusive as Solr dates are in milliseconds so filter out those already read below
+                pagefq = Dataset._combine_fq(fq, 'metadata_modified:[%sZ TO *]' % last[0])
+                pagestart = skip
+            if pagefq:
+                _, results = search(fq=pagefq, start=pagestart, rows=page_size)
+            else:
+                _, results = search(start=pagestart, rows=page_size)
+            newresults = [result for result in results if last is None or Dataset._solr_key(result) > last]
+            for result in newresults:
+                datasetdicts.pop(result['id'], None)  # updated datasets move to the end
+                datasetdicts[result['id']] = result
+            if len(results) < page_size:
+                break
+            if newresults:
+                last = Dataset._solr_key(newresults[-1])
+                skip = 0
+            else:  # whole page has same millisecond as last dataset read
+                skip += page_size
+        if total_rows != max_int or start != 0:
+            return list(datasetdicts.values())[:total_rows]
+        if fq:
+            count, _ = search(fq=fq, rows=0)
+        else:
+            count, _ = search(rows=0)
+        if count == len(datasetdicts):
+            return list(datasetdicts.values())
+        ids = list()
+        lastid = None
+        while True:
+            if lastid is None:
+                idfq = fq
+            else:
+                idfq = Dataset._combine_fq(fq, 'id:{"%s" TO *]' % lastid)
+            idkwargs = {'fl': ['id'], 'sort': 'id asc', 'rows': page_size}
+            if idfq:
+                idkwargs['fq'] = idfq
+            _, result = dataset._read_from_hdx('dataset', query, 'q', action, **idkwargs)
+            results = result.get('results', list()) if result else list()
+            ids.extend(result['id'] for result in results)
+            if len(results) < page_size:
+                break
+            lastid = ids[-1]
+        idset = set(ids)
+        for identifier in list(datasetdicts.keys()):
+            if identifier not in idset:  # deleted during scan
+                del datasetdicts[identifier]
+        missing = [identifier for identifier in ids if identifier not in datasetdicts]
+        for i in range(0, len(missing), page_size):
+            idsfq = 'id:(%s)' % ' OR '.join('"%s"' % identifier for identifier in missing[i:i + page_size])
+            _, results = search(fq=Dataset._combine_fq(fq, idsfq), rows=page_size)
+            for result in results:
+                datasetdicts[result['id']] = result
+        return list(datasetdicts.values())
+
+    @staticmethod
+    def asearch_in_hdx(query='*:*', configuration=None, **kwargs):
+        # type: (Optional[str], Optional[Configuration], ...) -> asyncio.Future
+        """Searches for datasets in HDX without blocking the asyncio event loop. Takes the same arguments as
+        search_in_hdx.
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            asyncio.Future: Awaitable for list of datasets resulting from query
+        """
+        if configuration is None:
+            configuration = Configuration.read()
+        return configuration.run_async(Dataset.search_in_hdx, query, configuration=configuration, **kwargs)
+
+    @staticmethod
+    def iter_search_in_hdx(query='*:*', configuration=None, position=None, **kwargs):
+        # type: (Optional[str], Optional[Configuration], Optional[int], ...) -> DatasetIterator
+        """Searches for datasets in HDX returning an iterator that reads the results a page at a time so that memory
+        use is bounded however many datasets match. Unlike search_in_hdx, the search is not redone if HDX changes
+        between pages. The iterator's position attribute can be passed as position to resume the search.
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            position (Optional[int]): Position from an earlier iterator from which to resume. Defaults to None (start).
+            **kwargs: See search_in_hdx
+
+        Returns:
+            DatasetIterator: Iterator over datasets resulting from query
+        """
+        dataset = Dataset(configuration=configuration)
+        Dataset._add_required_fields(kwargs, 'id')
+        total_rows = kwargs.pop('rows', max_int)
+        start = kwargs.pop('start', 0)
+        if position is not None:
+            total_rows -= position - start
+            start = position
+
+        def read_page(offset, rows):
+            # type: (int, int) -> List[Dict]
+            _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], start=offset,
+                                               rows=rows, **kwargs)
+            if result and result.get('count', None):
+                return result['results']
+            logger.debug(result)
+            return list()
+
+        return DatasetIterator(read_page, start, total_rows, configuration)
+
     @staticmethod
     def get_all_dataset_names(configuration=None, **kwargs):
         # type: (Optional[Configuration], ...) -> List[str]
@@ -525,12 +957,17 @@ class Dataset(HDXObject):
             **kwargs: See below
             limit (int): Number of rows to return. Defaults to all datasets (sys.maxsize).
             offset (int): Offset in the complete result for where the set of returned datasets should begin
+            keyset (bool): Page by last metadata_modified and id seen rather than by offset. Defaults to False.
 
         Returns:
             List[Dataset]: list of all datasets in HDX
         """
 
         dataset = Dataset(configuration=configuration)
+        if kwargs.pop('keyset', False):
+            datasetdicts = Dataset._keyset_search(dataset, '*:*', rows=kwargs.get('limit', max_int),
+                                                  start=kwargs.get('offset', 0))
+            return Dataset._datasets_from_dicts(datasetdicts, configuration)
         dataset['id'] = 'all datasets'  # only for error message if produced
         total_rows = kwargs.get('limit', max_int)
         start = kwargs.get('offset', 0)
@@ -559,6 +996,7 @@ class Dataset(HDXObject):
                         break
                 else:
                     logger.debug(result)
+                    break
             names_list = [dataset['name'] for dataset in all_datasets]
             names = set(names_list)
             if len(names_list) != len(names):  # check for duplicates (shouldn't happen)
@@ -573,6 +1011,121 @@ class Dataset(HDXObject):
             raise HDXError('Maximum attempts reached for getting all datasets!')
         return all_datasets
 
+    @staticmethod
+    def iter_all_datasets(configuration=None, position=None, **kwargs):
+        # type: (Optional[Configuration], Optional[int], ...) -> DatasetIterator
+        """Get all datasets in HDX returning an iterator that reads them a page at a time so that memory use is bounded
+        however many datasets there are. Unlike get_all_datasets, the datasets are not reread if HDX changes between
+        pages. The iterator's position attribute can be passed as position to resume.
+
+        Args:
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            position (Optional[int]): Position from an earlier iterator from which to resume. Defaults to None (start).
+            **kwargs: See get_all_datasets
+
+        Returns:
+            DatasetIterator: Iterator over all datasets in HDX
+        """
+        dataset = Dataset(configuration=configuration)
+        dataset['id'] = 'all datasets'  # only for error message if produced
+        total_rows = kwargs.pop('limit', max_int)
+        start = kwargs.pop('offset', 0)
+        if position is not None:
+            total_rows -= position - start
+            start = position
+
+        def read_page(offset, rows):
+            # type: (int, int) -> List[Dict]
+            kwargs['offset'] = offset
+            kwargs['limit'] = rows
+            result = dataset._write_to_hdx('all', kwargs, 'id')
+            if result:
+                return result
+            logger.debug(result)
+            return list()
+
+        return DatasetIterator(read_page, start, total_rows, configuration)
+
+    @staticmethod
+    def _to_solr_date(timestamp):
+        # type: (Union[datetime, str]) -> str
+        """Convert timestamp to Solr date format to the millisecond
+
+        Args:
+            timestamp (Union[datetime, str]): Timestamp as datetime or HDX (ISO 8601) string
+
+        Returns:
+            str: Timestamp in Solr date format
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        return '%sZ' % timestamp.rstrip('Z')[:23]
+
+    @staticmethod
+    def get_changed_since(since, configuration=None, **kwargs):
+        # type: (Union[datetime, str], Optional[Configuration], ...) -> List['Dataset']
+        """Get datasets in HDX created or updated since given time (inclusive to the millisecond). The datasets are read
+        with keyset pagination so that changes during the read do not cause datasets to be missed. The latest
+        metadata_modified of the datasets returned is the time to pass in the next call.
+
+        Args:
+            since (Union[datetime, str]): Time in UTC as datetime or HDX (ISO 8601) string eg. 2017-01-01T00:00:00.000000
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            List[Dataset]: list of datasets changed since given time sorted by metadata_modified
+        """
+        keyfq = 'metadata_modified:[%s TO *]' % Dataset._to_solr_date(since)
+        kwargs['fq'] = Dataset._combine_fq(kwargs.get('fq'), keyfq)
+        kwargs['keyset'] = True
+        return Dataset.search_in_hdx(configuration=configuration, **kwargs)
+
+    @staticmethod
+    def sync_changes(watermark_path, configuration=None, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> Tuple[List['Dataset'], List[str]]
+        """Get datasets created or updated and names of datasets deleted or renamed in HDX since the last call with the
+        same watermark file. The watermark file holds the latest metadata_modified seen and the names of all datasets.
+        If it does not exist, all datasets are returned. It is only updated once the changes have been read.
+
+        Args:
+            watermark_path (str): Path to watermark file
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            Tuple[List[Dataset], List[str]]: (datasets created or updated, names of datasets deleted or renamed)
+        """
+        names = Dataset.get_all_dataset_names(configuration=configuration)  # before changes so no deletion is missed
+        if exists(watermark_path):
+            with open(watermark_path) as f:
+                watermark = json.load(f)
+            changed = Dataset.get_changed_since(watermark['metadata_modified'], configuration=configuration,
+                                                **kwargs)
+        else:
+            watermark = {'metadata_modified': None, 'names': list()}
+            changed = Dataset.search_in_hdx(configuration=configuration, keyset=True, **kwargs)
+        nameset = set(names)
+        deleted = [name for name in watermark['names'] if name not in nameset]
+        for dataset in changed:
+            name = dataset.data.get('name')
+            if name and name not in nameset:  # created after names were read
+                names.append(name)
+                nameset.add(name)
+            metadata_modified = dataset.data.get('metadata_modified')
+            if metadata_modified and (watermark['metadata_modified'] is None or
+                                      metadata_modified > watermark['metadata_modified']):
+                watermark['metadata_modified'] = metadata_modified
+        watermark['names'] = names
+        if watermark['metadata_modified'] is not None:
+            temp_path = '%s.part' % watermark_path
+            with open(temp_path, 'w') as f:
+                json.dump(watermark, f)
+            if exists(watermark_path):
+                unlink(watermark_path)
+            rename(temp_path, watermark_path)
+        return changed, deleted
+
     @staticmethod
     def get_all_resources(datasets):
         # type: (List['Dataset']) -> List[hdx.data.resource.Resource]
@@ -1066,7 +1619,7 @@ class Dataset(HDXObject):
         """
         if isinstance(showcase, hdx.data.showcase.Showcase) or isinstance(showcase, dict):
             if 'id' not in showcase:
-                showcase = hdx.data.showcase.Showcase.read_from_hdx(showcase['name'])
+                showcase = hdx.data.showcase.Showcase.read_from_hdx(showcase['name'], configuration=self.configuration)
             showcase = showcase['id']
         elif not isinstance(showcase, str):
             raise HDXError('Type %s cannot be added as a showcase!' % type(showcase).__name__)
@@ -10,10 +10,11 @@ else:
 
 import abc
 import copy
+import json
 import logging
 
 from ckanapi.errors import NotFound
-from typing import Optional, List, Tuple, TypeVar, Union, Dict
+from typing import Optional, List, Tuple, TypeVar, Union, Dict, Callable, Any
 
 from hdx.utilities import raisefrom
 from hdx.hdx_configuration import Configuration
@@ -22,6 +23,8 @@ from hdx.utilities.loader import load_yaml_into_existing_dict, load_json_into_ex
 
 logger = logging.getLogger(__name__)
 
+_encode = json.JSONEncoder(separators=(',', ':'), default=str).encode
+
 HDXObjectUpperBound = TypeVar('T', bound='HDXObject')
 
 
@@ -38,6 +41,7 @@ class HDXObject(UserDict, object):
         configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
     """
     __metaclass__ = abc.ABCMeta
+    identity_fields = ('id', 'name')  # fields that each uniquely identify an object of this type
 
     @staticmethod
     @abc.abstractmethod
@@ -54,6 +58,7 @@ class HDXObject(UserDict, object):
         # type: (Dict, Optional[Configuration]) -> None
         super(HDXObject, self).__init__(initial_data)
         self.old_data = None
+        self.clean_fields = None  # type: Optional[Dict]
         if configuration is None:
             self.configuration = Configuration.read()
         else:
@@ -68,6 +73,55 @@ class HDXObject(UserDict, object):
         """
         return self.old_data
 
+    @staticmethod
+    def _get_fingerprint(value):
+        # type: (Any) -> Any
+        """Get value to compare to detect changes to a field. Lists and dictionaries (which may be modified in place)
+        are reduced to a hash of their JSON so that no copy is kept. Other values are returned unchanged.
+
+        Args:
+            value (Any): Value of field
+
+        Returns:
+            Any: Fingerprint of value
+        """
+        if isinstance(value, (dict, list, tuple)):
+            return hash(_encode(value))
+        return value
+
+    def _set_clean(self):
+        # type: () -> None
+        """Record the current internal dictionary as matching what is in HDX so that later modifications can be
+        tracked. A fingerprint of each top level field is kept rather than a copy of the dictionary.
+
+        Returns:
+            None
+        """
+        if isinstance(self.data, dict):
+            self.clean_fields = {key: self._get_fingerprint(value) for key, value in self.data.items()}
+        else:
+            self.clean_fields = None
+
+    def get_dirty_fields(self, ignore_fields=list()):
+        # type: (List[str]) -> Dict
+        """Get fields of internal dictionary that were added or modified since the HDX object was last read from or
+        written to HDX. If it was never read or written, all fields are returned. Removed fields are not included.
+
+        Args:
+            ignore_fields (List[str]): Fields to ignore. Default is [].
+
+        Returns:
+            Dict: Dictionary of added or modified fields
+        """
+        dirty_fields = dict()
+        for key, value in self.data.items():
+            if key in ignore_fields:
+                continue
+            if self.clean_fields is None or key not in self.clean_fields or \
+                    self.clean_fields[key] != self._get_fingerprint(value):
+                dirty_fields[key] = value
+        return dirty_fields
+
     def update_from_yaml(self, path):
         # type: (str) -> None
         """Update metadata with static metadata from YAML file
@@ -136,10 +190,60 @@ class HDXObject(UserDict, object):
         if success:
             self.old_data = self.data
             self.data = result
+            self._set_clean()
             return True
         logger.debug(result)
         return False
 
+    def _get_identifiers(self, identifier=None):
+        # type: (Optional[str]) -> List[Optional[str]]
+        """Get identifiers of HDX object for identity map
+
+        Args:
+            identifier (Optional[str]): Identifier used to read HDX object. Defaults to None.
+
+        Returns:
+            List[Optional[str]]: Identifiers of HDX object
+        """
+        identifiers = [self.data.get(field) for field in self.identity_fields]
+        if identifier is not None and identifier not in identifiers:
+            identifiers.append(identifier)
+        return identifiers
+
+    @classmethod
+    def _read_identified(cls, object_type, identifier, configuration=None, load=None):
+        # type: (str, str, Optional[Configuration], Optional[Callable[[HDXObjectUpperBound, str], bool]]) -> Optional[HDXObjectUpperBound]
+        """Helper method to read the HDX object given by identifier from HDX and return it. If the configuration has an
+        identity map, an object of the same type already read with the identifier is returned instead and objects read
+        are added to it.
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            identifier (str): HDX object identifier
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            load (Optional[Callable[[T <= HDXObject, str], bool]]): Function to load HDX object returning True if loaded. Defaults to _load_from_hdx.
+
+        Returns:
+            Optional[T <= HDXObject]: HDX object if successful read, None if not
+        """
+        if configuration is None:
+            configuration = Configuration.read()
+        identitymap = configuration.identity_map()
+        if identitymap is not None:
+            hdxobject = identitymap.get(cls.__name__, identifier)
+            if hdxobject is not None:
+                return hdxobject
+        hdxobject = cls(configuration=configuration)
+        if load is None:
+            loaded = hdxobject._load_from_hdx(object_type, identifier)
+        else:
+            loaded = load(hdxobject, identifier)
+        if not loaded:
+            return None
+        if identitymap is not None:
+            identitymap.add(cls.__name__, hdxobject, hdxobject._get_identifiers(identifier))
+        return hdxobject
+
     @staticmethod
     @abc.abstractmethod
     def read_from_hdx(id_field, configuration=None):
@@ -155,6 +259,51 @@ class HDXObject(UserDict, object):
         """
         raise NotImplementedError
 
+    @classmethod
+    def aread_from_hdx(cls, identifier, configuration=None):
+        # type: (str, Optional[Configuration]) -> asyncio.Future
+        """Read the HDX object given by identifier from HDX without blocking the asyncio event loop
+
+        Args:
+            identifier (str): HDX object identifier
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            asyncio.Future: Awaitable for HDX object if successful read, None if not
+        """
+        if configuration is None:
+            configuration = Configuration.read()
+        return configuration.run_async(cls.read_from_hdx, identifier, configuration=configuration)
+
+    @classmethod
+    def read_many_from_hdx(cls, identifiers, configuration=None, max_workers=None):
+        # type: (List[str], Optional[Configuration], Optional[int]) -> Tuple[List[Optional[HDXObjectUpperBound]], Dict[str, Exception]]
+        """Read the HDX objects given by a list of identifiers from HDX concurrently
+
+        Args:
+            identifiers (List[str]): List of HDX object identifiers
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            max_workers (Optional[int]): Maximum number of concurrent reads. Defaults to max_workers of configuration.
+
+        Returns:
+            Tuple[List[Optional[T <= HDXObject]], Dict[str, Exception]]: (HDX objects in input order with None for those not read, errors by identifier)
+        """
+        if configuration is None:
+            configuration = Configuration.read()
+        identifiers = list(identifiers)
+
+        def read(identifier):
+            return cls.read_from_hdx(identifier, configuration=configuration)
+
+        hdxobjects = list()
+        errors = dict()
+        for identifier, (hdxobject, error) in zip(identifiers, configuration.run_concurrently(read, identifiers,
+                                                                                             max_workers)):
+            if error is not None:
+                errors[identifier] = error
+            hdxobjects.append(hdxobject)
+        return hdxobjects, errors
+
     def _check_existing_object(self, object_type, id_field_name):
         # type: (str, str) -> None
         if not self.data:
@@ -232,6 +381,18 @@ class HDXObject(UserDict, object):
         """
         raise NotImplementedError
 
+    def aupdate_in_hdx(self, **kwargs):
+        # type: (...) -> asyncio.Future
+        """Check if HDX object exists in HDX and if so, update it without blocking the asyncio event loop
+
+        Args:
+            **kwargs: Keyword arguments to pass to update_in_hdx
+
+        Returns:
+            asyncio.Future: Awaitable that completes when the update is done
+        """
+        return self.configuration.run_async(self.update_in_hdx, **kwargs)
+
     def _update_in_hdx(self, object_type, id_field_name, file_to_upload=None):
         # type: (str, str, Optional[str]) -> None
         """Helper method to check if HDX object exists in HDX and if so, update it
@@ -248,6 +409,32 @@ class HDXObject(UserDict, object):
         self._check_load_existing_object(object_type, id_field_name)
         self._merge_hdx_update(object_type, id_field_name, file_to_upload)
 
+    def _patch_in_hdx(self, object_type, id_field_name, file_to_upload=None, ignore_fields=list()):
+        # type: (str, str, Optional[str], List[str]) -> None
+        """Helper method to update HDX object in HDX sending only the fields added or modified since it was last read
+        from or written to HDX using the patch action. No read of the HDX object is made beforehand. If there is no
+        patch action for the HDX object, a full update is made instead.
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+            ignore_fields (List[str]): Fields not to send. Default is [].
+
+        Returns:
+            None
+        """
+        if 'patch' not in self.actions():
+            self._update_in_hdx(object_type, id_field_name, file_to_upload)
+            return
+        self._check_existing_object(object_type, id_field_name)
+        data = self.get_dirty_fields(ignore_fields)
+        if not data and not file_to_upload:
+            logger.debug('%s %s is unchanged. Nothing to patch.' % (object_type, self.data[id_field_name]))
+            return
+        data[id_field_name] = self.data[id_field_name]
+        self._save_to_hdx('patch', id_field_name, file_to_upload, data)
+
     def _write_to_hdx(self, action, data, id_field_name, file_to_upload=None):
         # type: (str, Dict, str, Optional[str]) -> Dict
         """Creates or updates an HDX object in HDX and return HDX object metadata dict
@@ -275,22 +462,43 @@ class HDXObject(UserDict, object):
             if file_to_upload and file:
                 file.close()
 
-    def _save_to_hdx(self, action, id_field_name, file_to_upload=None):
-        # type: (str, str, Optional[str]) -> None
+    def _save_to_hdx(self, action, id_field_name, file_to_upload=None, data=None):
+        # type: (str, str, Optional[str], Optional[Dict]) -> None
         """Creates or updates an HDX object in HDX, saving current data and replacing with returned HDX object data
         from HDX
 
         Args:
-            action (str): Action to perform: 'create' or 'update'
+            action (str): Action to perform: 'create', 'update' or 'patch'
             id_field_name (str): Name of field containing HDX object identifier
             file_to_upload (Optional[str]): File to upload to HDX
+            data (Optional[Dict]): Data to write to HDX. Defaults to internal dictionary.
 
         Returns:
             None
         """
-        result = self._write_to_hdx(action, self.data, id_field_name, file_to_upload)
+        if data is None:
+            data = self.data
+        result = self._write_to_hdx(action, data, id_field_name, file_to_upload)
+        self._invalidate_cache(self.data)
+        self._invalidate_cache(result)
         self.old_data = self.data
         self.data = result
+        self._set_clean()
+
+    def _invalidate_cache(self, data):
+        # type: (Optional[Dict]) -> None
+        """Remove cached responses for HDX object and any parent dataset given metadata
+
+        Args:
+            data (Optional[Dict]): HDX object metadata
+
+        Returns:
+            None
+        """
+        if not isinstance(data, dict):
+            return
+        for id_field_name in ('id', 'package_id'):
+            self.configuration.invalidate_cache(data.get(id_field_name))
 
     @abc.abstractmethod
     def create_in_hdx(self):
@@ -302,6 +510,19 @@ class HDXObject(UserDict, object):
         """
         raise NotImplementedError
 
+    def acreate_in_hdx(self, **kwargs):
+        # type: (...) -> asyncio.Future
+        """Check if HDX object exists in HDX and if so, update it, otherwise create it without blocking the asyncio
+        event loop
+
+        Args:
+            **kwargs: Keyword arguments to pass to create_in_hdx
+
+        Returns:
+            asyncio.Future: Awaitable that completes when the creation or update is done
+        """
+        return self.configuration.run_async(self.create_in_hdx, **kwargs)
+
     def _create_in_hdx(self, object_type, id_field_name, name_field_name,
                        file_to_upload=None):
         # type: (str, str, str, Optional[str]) -> None
@@ -334,6 +555,15 @@ class HDXObject(UserDict, object):
         """
         raise NotImplementedError
 
+    def adelete_from_hdx(self):
+        # type: () -> asyncio.Future
+        """Deletes HDX object from HDX without blocking the asyncio event loop
+
+        Returns:
+            asyncio.Future: Awaitable that completes when the deletion is done
+        """
+        return self.configuration.run_async(self.delete_from_hdx)
+
     def _delete_from_hdx(self, object_type, id_field_name):
         # type: (str, str) -> None
         """Helper method to deletes a resource from HDX
@@ -347,7 +577,11 @@ class HDXObject(UserDict, object):
         """
         if id_field_name not in self.data:
             raise HDXError('No %s field (mandatory) in %s!' % (id_field_name, object_type))
+        identifiers = self._get_identifiers()
         self._save_to_hdx('delete', id_field_name)
+        identitymap = self.configuration.identity_map()
+        if identitymap is not None:
+            identitymap.remove(type(self).__name__, identifiers)
 
     def _addupdate_hdxobject(self, hdxobjects, id_field, new_hdxobject):
         # type: (List[HDXObjectUpperBound], str, HDXObjectUpperBound) -> HDXObjectUpperBound
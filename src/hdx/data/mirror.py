@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""Local copy of HDX metadata in an SQLite database for fast querying"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import islice
+
+from typing import Optional, List, Dict, Union, Iterable, Tuple, Any
+
+import hdx.data.dataset
+import hdx.data.organization
+import hdx.data.resource
+from hdx.hdx_configuration import Configuration
+
+
+class Mirror(object):
+    """Local copy of the metadata of datasets, resources, organizations and locations in HDX stored in an SQLite
+    database with indexes on dataset name, organization, locations (groups), tags and metadata_modified and on
+    resource format. Queries return Dataset, Resource and Organization objects. Thread safe.
+
+    Args:
+        path (str): Path to SQLite database file. Defaults to ':memory:' (not stored).
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+    """
+    tables = [
+        'CREATE TABLE IF NOT EXISTS datasets (id TEXT PRIMARY KEY, name TEXT, owner_org TEXT, '
+        'metadata_modified TEXT, data TEXT)',
+        'CREATE INDEX IF NOT EXISTS datasets_name ON datasets (name)',
+        'CREATE INDEX IF NOT EXISTS datasets_owner_org ON datasets (owner_org)',
+        'CREATE INDEX IF NOT EXISTS datasets_metadata_modified ON datasets (metadata_modified)',
+        'CREATE TABLE IF NOT EXISTS dataset_groups (dataset_id TEXT, name TEXT)',
+        'CREATE INDEX IF NOT EXISTS dataset_groups_dataset_id ON dataset_groups (dataset_id, name)',
+        'CREATE INDEX IF NOT EXISTS dataset_groups_name ON dataset_groups (name, dataset_id)',
+        'CREATE TABLE IF NOT EXISTS dataset_tags (dataset_id TEXT, name TEXT)',
+        'CREATE INDEX IF NOT EXISTS dataset_tags_dataset_id ON dataset_tags (dataset_id, name)',
+        'CREATE INDEX IF NOT EXISTS dataset_tags_name ON dataset_tags (name, dataset_id)',
+        'CREATE TABLE IF NOT EXISTS resources (id TEXT, package_id TEXT, format TEXT, position INTEGER, data TEXT)',
+        'CREATE INDEX IF NOT EXISTS resources_id ON resources (id)',
+        'CREATE INDEX IF NOT EXISTS resources_package_id ON resources (package_id)',
+        'CREATE INDEX IF NOT EXISTS resources_format ON resources (format)',
+        'CREATE TABLE IF NOT EXISTS organizations (id TEXT PRIMARY KEY, name TEXT, data TEXT)',
+        'CREATE INDEX IF NOT EXISTS organizations_name ON organizations (name)',
+        'CREATE TABLE IF NOT EXISTS locations (name TEXT PRIMARY KEY, title TEXT, data TEXT)',
+    ]
+    analyze_threshold = 1000  # number of datasets added after which statistics for the query planner are updated
+
+    def __init__(self, path=':memory:', configuration=None):
+        # type: (str, Optional[Configuration]) -> None
+        self.path = path
+        self.configuration = configuration
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            for table in self.tables:
+                self._connection.execute(table)
+
+    def close(self):
+        # type: () -> None
+        """
+        Close SQLite database
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _delete_datasets(self, ids):
+        # type: (List[str]) -> None
+        for table, column in (('datasets', 'id'), ('dataset_groups', 'dataset_id'), ('dataset_tags', 'dataset_id'),
+                              ('resources', 'package_id')):
+            self._connection.executemany('DELETE FROM %s WHERE %s = ?' % (table, column),
+                                         [(identifier,) for identifier in ids])
+
+    def _insert_dataset(self, dataset):
+        # type: (Union[hdx.data.dataset.Dataset, Dict]) -> None
+        if isinstance(dataset, hdx.data.dataset.Dataset):
+            datasetdict = dict(dataset.data)
+            datasetdict['resources'] = [resource.data for resource in dataset.get_resources()]
+        else:
+            datasetdict = dataset
+        identifier = datasetdict['id']
+        self._delete_datasets([identifier])
+        resources = datasetdict.get('resources', list())
+        self._connection.execute('INSERT INTO datasets VALUES (?, ?, ?, ?, ?)',
+                                 (identifier, datasetdict.get('name'), datasetdict.get('owner_org'),
+                                  datasetdict.get('metadata_modified'), json.dumps(datasetdict)))
+        self._connection.executemany('INSERT INTO dataset_groups VALUES (?, ?)',
+                                     [(identifier, group['name']) for group in datasetdict.get('groups', list())])
+        self._connection.executemany('INSERT INTO dataset_tags VALUES (?, ?)',
+                                     [(identifier, tag['name']) for tag in datasetdict.get('tags', list())])
+        self._connection.executemany('INSERT INTO resources VALUES (?, ?, ?, ?, ?)',
+                                     [(resource['id'], identifier, (resource.get('format') or '').lower(), i,
+                                       json.dumps(resource)) for i, resource in enumerate(resources)])
+        organization = datasetdict.get('organization')
+        if organization and organization.get('id'):
+            self._insert_organization(organization)
+
+    def _insert_organization(self, organization):
+        # type: (Union[hdx.data.organization.Organization, Dict]) -> None
+        if isinstance(organization, hdx.data.organization.Organization):
+            organization = organization.data
+        self._connection.execute('INSERT OR REPLACE INTO organizations VALUES (?, ?, ?)',
+                                 (organization['id'], organization.get('name'), json.dumps(organization)))
+
+    def _insert_datasets(self, datasets):
+        # type: (Iterable[Union[hdx.data.dataset.Dataset, Dict]]) -> int
+        number = 0
+        for dataset in datasets:
+            self._insert_dataset(dataset)
+            number += 1
+        return number
+
+    def add_datasets(self, datasets):
+        # type: (Iterable[Union[hdx.data.dataset.Dataset, Dict]]) -> None
+        """
+        Add or replace datasets and their resources. The organizations of the datasets are also added if they are
+        included in the datasets (as they are in search results).
+
+        Args:
+            datasets (Iterable[Union[Dataset, Dict]]): Datasets or dataset dictionaries
+
+        Returns:
+            None
+        """
+        with self._lock, self._connection:
+            if self._insert_datasets(datasets) >= self.analyze_threshold:
+                self._connection.execute('ANALYZE')
+
+    def remove_datasets(self, identifiers):
+        # type: (Iterable[str]) -> None
+        """
+        Remove datasets and their resources
+
+        Args:
+            identifiers (Iterable[str]): Ids or names of datasets
+
+        Returns:
+            None
+        """
+        with self._lock, self._connection:
+            ids = list()
+            for identifier in identifiers:
+                rows = self._connection.execute('SELECT id FROM datasets WHERE id = ? OR name = ?',
+                                                (identifier, identifier)).fetchall()
+                ids.extend(row[0] for row in rows)
+            self._delete_datasets(ids)
+
+    def add_organizations(self, organizations):
+        # type: (Iterable[Union[hdx.data.organization.Organization, Dict]]) -> None
+        """
+        Add or replace organizations
+
+        Args:
+            organizations (Iterable[Union[Organization, Dict]]): Organizations or organization dictionaries
+
+        Returns:
+            None
+        """
+        with self._lock, self._connection:
+            for organization in organizations:
+                self._insert_organization(organization)
+
+    def set_locations(self, locations):
+        # type: (Iterable[Dict]) -> None
+        """
+        Replace locations with list of dictionaries of form {'name': 'zmb', 'title', 'Zambia'}
+
+        Args:
+            locations (Iterable[Dict]): Location dictionaries
+
+        Returns:
+            None
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM locations')
+            self._connection.executemany('INSERT OR REPLACE INTO locations VALUES (?, ?, ?)',
+                                         [(location['name'], location.get('title'), json.dumps(location))
+                                          for location in locations])
+
+    def update_from_hdx(self, watermark_path=None, **kwargs):
+        # type: (Optional[str], ...) -> None
+        """
+        Update mirror from HDX. If a watermark file is given, only datasets changed or deleted since the last update
+        using that file are read (see Dataset.sync_changes). Otherwise, all datasets are read a page at a time, each
+        page is added to the mirror as it is read and datasets no longer in HDX are removed at the end. Queries made
+        during the update are not blocked while HDX is read but may see a mix of old and new datasets. Locations are
+        also read (without changing the valid locations cached by Locations).
+
+        Args:
+            watermark_path (Optional[str]): Path to watermark file. Defaults to None (read all datasets).
+            **kwargs: See Dataset.search_in_hdx
+
+        Returns:
+            None
+        """
+        if watermark_path:
+            changed, deleted = hdx.data.dataset.Dataset.sync_changes(watermark_path,
+                                                                     configuration=self.configuration, **kwargs)
+            self.remove_datasets(deleted)
+            self.add_datasets(changed)
+        else:
+            datasets = hdx.data.dataset.Dataset.iter_search_in_hdx(configuration=self.configuration, **kwargs)
+            ids = set()
+            while True:
+                page = list(islice(datasets, hdx.data.dataset.page_size))  # read from HDX without holding the lock
+                if not page:
+                    break
+                with self._lock, self._connection:
+                    self._insert_datasets(page)
+                ids.update(dataset['id'] for dataset in page)
+            with self._lock, self._connection:
+                rows = self._connection.execute('SELECT id FROM datasets').fetchall()
+                self._delete_datasets([row[0] for row in rows if row[0] not in ids])
+                if len(ids) >= self.analyze_threshold:
+                    self._connection.execute('ANALYZE')
+        configuration = self.configuration
+        if configuration is None:
+            configuration = Configuration.read()
+        self.set_locations(configuration.call_remoteckan('group_list', {'all_fields': True}))
+
+    @staticmethod
+    def _from_where(resources=False, format=None, name=None, organization=None, location=None, tag=None,
+                    modified_since=None):
+        # type: (bool, Optional[str], Optional[str], Optional[str], Optional[str], Optional[str], Optional[Union[datetime, str]]) -> Tuple[str, List]
+        """Get SQL FROM and WHERE clauses and parameters selecting datasets (d) and optionally their resources (r).
+        Locations and tags are joined rather than used in subqueries so that the query planner can start from the
+        most selective.
+
+        Args:
+            resources (bool): Whether to join resources. Defaults to False.
+            format (Optional[str]): Resource format (case insensitive). Defaults to None.
+            name (Optional[str]): Dataset name. Defaults to None.
+            organization (Optional[str]): Organization id or name. Defaults to None.
+            location (Optional[str]): Location (group) name eg. afg. Defaults to None.
+            tag (Optional[str]): Tag name. Defaults to None.
+            modified_since (Optional[Union[datetime, str]]): Minimum metadata_modified. Defaults to None.
+
+        Returns:
+            Tuple[str, List]: (FROM and WHERE clauses, parameters)
+        """
+        joins = ['datasets d']
+        conditions = list()
+        parameters = list()  # type: List[Any]
+        if location is not None:
+            joins.append('JOIN dataset_groups g ON g.dataset_id = d.id AND g.name = ?')
+            parameters.append(location)
+        if tag is not None:
+            joins.append('JOIN dataset_tags t ON t.dataset_id = d.id AND t.name = ?')
+            parameters.append(tag)
+        if resources:
+            joins.append('JOIN resources r ON r.package_id = d.id')
+            if format is not None:
+                conditions.append('r.format = ?')
+                parameters.append(format.lower())
+        if name is not None:
+            conditions.append('d.name = ?')
+            parameters.append(name)
+        if organization is not None:
+            conditions.append('(d.owner_org = ? OR d.owner_org IN (SELECT id FROM organizations WHERE name = ?))')
+            parameters.extend([organization, organization])
+        if modified_since is not None:
+            if isinstance(modified_since, datetime):
+                modified_since = modified_since.strftime('%Y-%m-%dT%H:%M:%S.%f')
+            conditions.append('d.metadata_modified >= ?')
+            parameters.append(modified_since)
+        clauses = ' '.join(joins)
+        if conditions:
+            clauses = '%s WHERE %s' % (clauses, ' AND '.join(conditions))
+        return clauses, parameters
+
+    def count_datasets(self, **kwargs):
+        # type: (...) -> int
+        """
+        Count datasets in mirror
+
+        Args:
+            **kwargs: See get_datasets
+
+        Returns:
+            int: Number of datasets matching arguments
+        """
+        clauses, parameters = self._from_where(**kwargs)
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM %s' % clauses, parameters).fetchone()[0]
+
+    def get_datasets(self, **kwargs):
+        # type: (...) -> List[hdx.data.dataset.Dataset]
+        """
+        Get datasets in mirror sorted by metadata_modified
+
+        Args:
+            **kwargs: See below
+            name (str): Dataset name
+            organization (str): Organization id or name
+            location (str): Location (group) name eg. afg
+            tag (str): Tag name
+            modified_since (Union[datetime, str]): Minimum metadata_modified
+
+        Returns:
+            List[Dataset]: List of datasets matching arguments
+        """
+        clauses, parameters = self._from_where(**kwargs)
+        with self._lock:
+            rows = self._connection.execute('SELECT d.data FROM %s ORDER BY d.metadata_modified, d.id' % clauses,
+                                            parameters).fetchall()
+        return hdx.data.dataset.Dataset._datasets_from_dicts([json.loads(row[0]) for row in rows],
+                                                             self.configuration)
+
+    def get_dataset(self, identifier):
+        # type: (str) -> Optional[hdx.data.dataset.Dataset]
+        """
+        Get dataset in mirror
+
+        Args:
+            identifier (str): Dataset id or name
+
+        Returns:
+            Optional[Dataset]: Dataset or None if not in mirror
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM datasets WHERE id = ? OR name = ?',
+                                           (identifier, identifier)).fetchone()
+        if row is None:
+            return None
+        return hdx.data.dataset.Dataset._datasets_from_dicts([json.loads(row[0])], self.configuration)[0]
+
+    def get_resources(self, format=None, **kwargs):
+        # type: (Optional[str], ...) -> List[hdx.data.resource.Resource]
+        """
+        Get resources in mirror eg. all CSV resources of datasets in a location with
+        get_resources(format='csv', location='afg')
+
+        Args:
+            format (Optional[str]): Resource format (case insensitive). Defaults to None.
+            **kwargs: Arguments selecting datasets of resources. See get_datasets.
+
+        Returns:
+            List[Resource]: List of resources matching arguments
+        """
+        clauses, parameters = self._from_where(resources=True, format=format, **kwargs)
+        with self._lock:
+            rows = self._connection.execute('SELECT r.data FROM %s ORDER BY d.metadata_modified, d.id, r.position' %
+                                            clauses, parameters).fetchall()
+        return [hdx.data.resource.Resource(json.loads(row[0]), configuration=self.configuration) for row in rows]
+
+    def get_organization(self, identifier):
+        # type: (str) -> Optional[hdx.data.organization.Organization]
+        """
+        Get organization in mirror
+
+        Args:
+            identifier (str): Organization id or name
+
+        Returns:
+            Optional[Organization]: Organization or None if not in mirror
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM organizations WHERE id = ? OR name = ?',
+                                           (identifier, identifier)).fetchone()
+        if row is None:
+            return None
+        return hdx.data.organization.Organization(json.loads(row[0]), configuration=self.configuration)
+
+    def get_organizations(self):
+        # type: () -> List[hdx.data.organization.Organization]
+        """
+        Get all organizations in mirror sorted by name
+
+        Returns:
+            List[Organization]: List of organizations
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT data FROM organizations ORDER BY name').fetchall()
+        return [hdx.data.organization.Organization(json.loads(row[0]), configuration=self.configuration)
+                for row in rows]
+
+    def get_locations(self):
+        # type: () -> List[Dict]
+        """
+        Get all locations in mirror sorted by name
+
+        Returns:
+            List[Dict]: List of dictionaries of form {'name': 'zmb', 'title', 'Zambia'}
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT data FROM locations ORDER BY name').fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -39,6 +39,7 @@ class Organization(HDXObject):
             'update': 'organization_update',
             'create': 'organization_create',
             'delete': 'organization_delete',
+            'patch': 'organization_patch',
             'list': 'organization_list'
         }
 
@@ -79,11 +80,7 @@ class Organization(HDXObject):
             Optional[Organization]: Organization object if successful read, None if not
         """
 
-        organization = Organization(configuration=configuration)
-        result = organization._load_from_hdx('organization', identifier)
-        if result:
-            return organization
-        return None
+        return Organization._read_identified('organization', identifier, configuration)
 
     def check_required_fields(self, ignore_fields=list()):
         # type: (List[str]) -> None
@@ -98,14 +95,21 @@ class Organization(HDXObject):
         """
         self._check_required_fields('organization', ignore_fields)
 
-    def update_in_hdx(self):
-        # type: () -> None
-        """Check if organization exists in HDX and if so, update organization
+    def update_in_hdx(self, patch=False):
+        # type: (Optional[bool]) -> None
+        """Check if organization exists in HDX and if so, update organization. With patch, only the fields modified
+        since the organization was read from HDX are sent using organization_patch without reading it first.
+
+        Args:
+            patch (Optional[bool]): Whether to send only modified fields. Defaults to False.
 
         Returns:
             None
         """
-        self._update_in_hdx('organization', 'id')
+        if patch:
+            self._patch_in_hdx('organization', 'id')
+        else:
+            self._update_in_hdx('organization', 'id')
 
     def create_in_hdx(self):
         # type: () -> None
@@ -125,27 +129,57 @@ class Organization(HDXObject):
         """
         self._delete_from_hdx('organization', 'id')
 
-    def get_users(self, capacity=None):
-        # type: (Optional[str]) -> List[User]
-        """Returns the organization's users.
+    def get_users(self, capacity=None, full=True):
+        # type: (Optional[str], bool) -> List[User]
+        """Returns the organization's users. By default, the full metadata of each user is read from HDX, reading
+        users concurrently (see max_workers in Configuration) and each distinct user only once. If full is False, the
+        user metadata already in the organization (as returned by organization_show) is used without reading from HDX.
+        Users that cannot be read are omitted.
 
         Args:
             capacity (Optional[str]): Filter by capacity eg. member, admin. Defaults to None.
+            full (bool): Whether to read full metadata of users from HDX. Defaults to True.
+
         Returns:
             List[User]: Returns the organization's users.
         """
-        users = list()
         usersdicts = self.data.get('users')
-        if usersdicts is not None:
-            for userdata in usersdicts:
-                if capacity is not None and userdata['capacity'] != capacity:
-                    continue
-                id = userdata.get('id')
-                if id is None:
-                    id = userdata['name']
-                user = User.read_from_hdx(id, configuration=self.configuration)
-                user['capacity'] = userdata['capacity']
-                users.append(user)
+        if usersdicts is None:
+            return list()
+        members = list()
+        for userdata in usersdicts:
+            if capacity is not None and userdata['capacity'] != capacity:
+                continue
+            id = userdata.get('id')
+            if id is None:
+                id = userdata['name']
+            members.append((id, userdata))
+        if not full:
+            return [User(dict(userdata), configuration=self.configuration) for _, userdata in members]
+        ids = list()
+        for id, _ in members:
+            if id not in ids:
+                ids.append(id)
+
+        def read_user(id):
+            return User.read_from_hdx(id, configuration=self.configuration)
+
+        readusers = dict()
+        for id, (user, exception) in zip(ids, self.configuration.run_concurrently(read_user, ids)):
+            if exception is not None:
+                raise exception
+            readusers[id] = user
+        users = list()
+        for id, userdata in members:
+            user = readusers[id]
+            if user is None:
+                logger.warning('User %s in organization %s could not be read!' % (id, self.data.get('name')))
+                continue
+            # copy so that capacity in this organization is not set on a user shared with other lists (eg. via the
+            # identity map) or appearing more than once in this one
+            user = User(dict(user.data), configuration=self.configuration)
+            user['capacity'] = userdata['capacity']
+            users.append(user)
         return users
 
     def add_update_user(self, user, capacity=None):
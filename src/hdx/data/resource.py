@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 """Resource class containing all logic for creating, checking, and updating resources."""
+import json
 import logging
 import zipfile
 from os import unlink
 from os.path import join, splitext
+from shutil import copyfile
 from tempfile import gettempdir
 from typing import Optional, List, Tuple, Dict
 
@@ -15,7 +17,14 @@ from tabulator import Stream
 
 import hdx.data.dataset
 from hdx.data.hdxobject import HDXObject, HDXError
+from hdx.hdx_changes import get_file_hash
 from hdx.hdx_configuration import Configuration
+from hdx.hdx_datastore import ChunkSizer, UpsertPipeline, Checkpoint, RowIndex, TypeInferrer, infer_schema
+
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,8 @@ class Resource(HDXObject):
         initial_data (Optional[Dict]): Initial resource metadata dictionary. Defaults to None.
         configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
     """
+    identity_fields = ('id',)  # resource names are not unique
+    delete_batch_size = 1000  # primary key values per datastore_delete call
 
     def __init__(self, initial_data=None, configuration=None):
         # type: (Optional[Dict], Optional[Configuration]) -> None
@@ -93,11 +104,7 @@ class Resource(HDXObject):
             Optional[Resource]: Resource object if successful read, None if not
         """
 
-        resource = Resource(configuration=configuration)
-        result = resource._load_from_hdx('resource', identifier)
-        if result:
-            return resource
-        return None
+        return Resource._read_identified('resource', identifier, configuration)
 
     def get_file_type(self):
         # type: () -> Optional[str]
@@ -172,14 +179,21 @@ class Resource(HDXObject):
                 del self.data['tracking_summary']
         self._check_required_fields('resource', ignore_fields)
 
-    def update_in_hdx(self):
-        # type: () -> None
-        """Check if resource exists in HDX and if so, update it
+    def update_in_hdx(self, patch=False):
+        # type: (Optional[bool]) -> None
+        """Check if resource exists in HDX and if so, update it. With patch, only the fields modified since the resource
+        was read from HDX are sent using resource_patch without reading the resource first.
+
+        Args:
+            patch (Optional[bool]): Whether to send only modified fields. Defaults to False.
 
         Returns:
             None
         """
-        self._update_in_hdx('resource', 'id', self.file_to_upload)
+        if patch:
+            self._patch_in_hdx('resource', 'id', self.file_to_upload)
+        else:
+            self._update_in_hdx('resource', 'id', self.file_to_upload)
 
     def create_in_hdx(self):
         # type: () -> None
@@ -209,7 +223,7 @@ class Resource(HDXObject):
         package_id = self.data.get('package_id')
         if package_id is None:
             raise HDXError('Resource has no package id!')
-        return hdx.data.dataset.Dataset.read_from_hdx(package_id)
+        return hdx.data.dataset.Dataset.read_from_hdx(package_id, configuration=self.configuration)
 
     @staticmethod
     def search_in_hdx(query, configuration=None, **kwargs):
@@ -240,9 +254,29 @@ class Resource(HDXObject):
             logger.debug(result)
         return resources
 
+    @staticmethod
+    def asearch_in_hdx(query, configuration=None, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> asyncio.Future
+        """Searches for resources in HDX without blocking the asyncio event loop. Takes the same arguments as
+        search_in_hdx. NOTE: Does not search dataset metadata!
+
+        Args:
+            query (str): Query
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            asyncio.Future: Awaitable for list of resources resulting from query
+        """
+        if configuration is None:
+            configuration = Configuration.read()
+        return configuration.run_async(Resource.search_in_hdx, query, configuration=configuration, **kwargs)
+
     def download(self, folder=None):
         # type: (Optional[str]) -> Tuple[str, str]
-        """Download resource store to provided folder or temporary folder if no folder supplied
+        """Download resource store to provided folder or temporary folder if no folder supplied. If the configuration
+        has a download cache, the resource is only downloaded if it has changed since it was cached and the path of
+        the cached file is returned if no folder is supplied (it should not be modified or deleted).
 
         Args:
             folder (Optional[str]): Folder to download resource to. Defaults to None.
@@ -256,6 +290,14 @@ class Resource(HDXObject):
         if not url:
             raise HDXError('No URL to download!')
         logger.debug('Downloading %s' % url)
+        download_cache = self.configuration.download_cache()
+        if download_cache is not None:
+            path, _ = download_cache.download(url)
+            if folder:
+                cached_path = path
+                path = Download.get_path_for_url(url, folder)
+                copyfile(cached_path, path)
+            return url, path
         with Download() as download:
             path = download.download_file(url, folder)
             return url, path
@@ -273,34 +315,121 @@ class Resource(HDXObject):
         if not success:
             logger.debug(result)
 
+    def _upsert_datastore(self, records, method, rownumbers, sizer):
+        # type: (List[Dict], str, List[int], ChunkSizer) -> None
+        """Helper method to upsert records into the HDX datastore. If HDX rejects them as too large (or the call times
+        out and the method is upsert so that they can safely be sent again), they are split in two and sent again. If
+        a later part fails, the error raised has a rows_done attribute giving how many records were upserted first.
+
+        Args:
+            records (List[Dict]): Records to upsert
+            method (str): Method of datastore_upsert: insert or upsert
+            rownumbers (List[int]): Row numbers of records in file (for messages)
+            sizer (ChunkSizer): Chooser of chunk sizes to inform of outcome
+
+        Returns:
+            None
+        """
+        nbytes = len(json.dumps(records, default=str))
+        data = {'resource_id': self.data['id'], 'force': True, 'method': method, 'records': records}
+        start = monotonic()
+        try:
+            self._write_to_hdx('datastore_upsert', data, 'resource_id')
+        except HDXError as e:
+            status = self.configuration.last_response_status()
+            if len(records) == 1 or not ChunkSizer.is_too_large(e, status) or (status != 413 and method != 'upsert'):
+                raisefrom(HDXError, 'Upload to datastore failed for %d rows from rows %d to %d!' %
+                          (len(records), rownumbers[0], rownumbers[-1]), e)
+            sizer.shrink()
+            half = len(records) // 2
+            logger.warning('Upload to datastore of rows %d to %d too large or too slow. Splitting in two.' %
+                           (rownumbers[0], rownumbers[-1]))
+            self._upsert_datastore(records[:half], method, rownumbers[:half], sizer)
+            try:
+                self._upsert_datastore(records[half:], method, rownumbers[half:], sizer)
+            except HDXError as e:
+                e.rows_done = half + getattr(e, 'rows_done', 0)
+                raise
+            return
+        sizer.record(len(records), nbytes, monotonic() - start)
+
+    def _delete_from_datastore(self, key, deleted, row_index):
+        # type: (List[str], List[List], RowIndex) -> None
+        """Helper method to delete rows from the HDX datastore by primary key. With a single field primary key, rows
+        are deleted in batches by filtering on a list of values.
+
+        Args:
+            key (List[str]): Fields of primary key
+            deleted (List[List]): List of primary key values of rows to delete
+            row_index (RowIndex): Index from which to remove rows once deleted
+
+        Returns:
+            None
+        """
+        logger.debug('Deleting %d rows from datastore' % len(deleted))
+        if len(key) == 1:
+            batches = [deleted[i:i + self.delete_batch_size] for i in range(0, len(deleted), self.delete_batch_size)]
+            filters = [{key[0]: [values[0] for values in batch]} for batch in batches]
+        else:
+            batches = [[values] for values in deleted]
+            filters = [dict(zip(key, values)) for values in deleted]
+        for batch, batchfilters in zip(batches, filters):
+            data = {'resource_id': self.data['id'], 'force': True, 'filters': batchfilters}
+            self._write_to_hdx('datastore_delete', data, 'resource_id')
+            row_index.remove(batch)
+
     def create_datastore(self, schema=None, primary_key=None,
-                         delete_first=0, path=None):
-        # type: (Optional[List[Dict]], Optional[str], int, Optional[str]) -> None
+                         delete_first=0, path=None, chunk_bytes=1000000, chunk_seconds=30.0, workers=1,
+                         checkpoint=None, resume=False, index=None, infer_types=False, infer_rows=1000):
+        # type: (Optional[List[Dict]], Optional[str], int, Optional[str], int, Optional[float], int, Optional[str], bool, Optional[str], bool, Optional[int]) -> None
         """For csvs, create a resource in the HDX datastore which enables data preview in HDX. If no schema is provided
-        all fields are assumed to be text. If path is not supplied, the file is first downloaded from HDX.
+        all fields are assumed to be text unless infer_types is True in which case the type of each field (int, numeric,
+        timestamp or text) is inferred from the first infer_rows rows or the whole file if infer_rows is None. Values are
+        sent typed according to the schema. If path is not supplied, the file is first downloaded from HDX.
+
+        Rows are sent in chunks whose size targets chunk_bytes. Chunks shrink when HDX rejects them as too large, times
+        out or takes longer than chunk_seconds and grow back when calls are fast. The file is read while workers
+        send chunks concurrently. With a primary key, rows are divided between workers by key so that rows with the
+        same key are sent in order.
+
+        With checkpoint, the number of rows from the start of the file that have been loaded is saved to the checkpoint
+        file along with the resource id and a hash of the file. The checkpoint file is deleted once the load completes.
+        With resume, a load that failed continues after the rows in the checkpoint file without deleting or creating
+        the datastore again provided the resource and file are the same. Rows loaded from a chunk that was split in two
+        before the failure are included in the checkpoint. Without a primary key, rows can still be inserted twice on
+        resume if there is more than one worker (rows after the checkpoint that other workers loaded before the
+        failure) or if the call that failed timed out after HDX had loaded its rows.
+
+        With index, which requires a primary key, a hash of each row loaded is kept by primary key in the index file.
+        Rows whose hashes are unchanged since the last load are not sent and rows whose keys are no longer in the file
+        are deleted from the datastore so that only the changes are sent. The index is discarded if the datastore is
+        deleted first or the schema differs from the one used to build it.
 
         Args:
             schema (List[Dict]): List of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}. Defaults to None.
             primary_key (Optional[str]): Primary key of schema. Defaults to None.
             delete_first (int): Delete datastore before creation. 0 = No, 1 = Yes, 2 = If no primary key. Defaults to 0.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            chunk_bytes (int): Target size in bytes of rows sent in each call. Defaults to 1000000.
+            chunk_seconds (Optional[float]): Seconds above which a call is regarded as too slow. Defaults to 30.
+            workers (int): Number of concurrent datastore_upsert calls. Defaults to 1.
+            checkpoint (Optional[str]): Path to checkpoint file. Defaults to None.
+            resume (bool): Whether to resume from checkpoint file. Defaults to False.
+            index (Optional[str]): Path to index file of row hashes for sending only changes. Defaults to None.
+            infer_types (bool): Whether to infer types of fields if no schema is provided. Defaults to False.
+            infer_rows (Optional[int]): Number of rows from which to infer types or None for all. Defaults to 1000.
 
         Returns:
             None
         """
-        if delete_first == 0:
-            pass
-        elif delete_first == 1:
-            self.delete_datastore()
-        elif delete_first == 2:
-            if primary_key is None:
-                self.delete_datastore()
-        else:
+        if delete_first not in (0, 1, 2):
             raise HDXError('delete_first must be 0, 1 or 2! (0 = No, 1 = Yes, 2 = Delete if no primary key)')
+        if index is not None and primary_key is None:
+            raise HDXError('An index requires a primary key!')
         if path is None:
             # Download the resource
             url, path = self.download()
-            delete_after_download = True
+            delete_after_download = self.configuration.download_cache() is None
         else:
             url = self.data.get('url', None)
             if not url:
@@ -310,6 +439,26 @@ class Resource(HDXObject):
         zip_path = None
         stream = None
         try:
+            resource_id = self.data['id']
+            checkpoint_file = None
+            file_hash = None
+            skip_rows = 0
+            if checkpoint:
+                checkpoint_file = Checkpoint(checkpoint)
+                file_hash = get_file_hash(path)
+                if resume:
+                    skip_rows = checkpoint_file.load(resource_id, file_hash)
+            if primary_key is None:
+                key = None
+            else:
+                key = [field.strip() for field in primary_key.split(',')]
+            deleted_first = False
+            if skip_rows == 0:
+                if delete_first == 1 or (delete_first == 2 and primary_key is None):
+                    self.delete_datastore()
+                    deleted_first = True
+            else:
+                logger.info('Resuming upload to datastore after row %d' % skip_rows)
             extension = splitext(path)[1]
             if extension.lower() == '.zip':
                 zip_file = zipfile.ZipFile(path)
@@ -319,41 +468,92 @@ class Resource(HDXObject):
                 zip_path = path
                 path = join(tempdir, filename)
 
-            def convert_to_text(extended_rows):
+            fieldtypes = dict()
+
+            def convert_values(extended_rows):
                 for number, headers, row in extended_rows:
+                    types = [fieldtypes.get(header, 'text') for header in headers]
                     for i, val in enumerate(row):
-                        row[i] = str(val)
+                        row[i] = TypeInferrer.convert(val, types[i] if i < len(types) else 'text')
                     yield (number, headers, row)
 
-            stream = Stream(path, headers=1, post_parse=[convert_to_text], bytes_sample_size=1000000)
+            stream = Stream(path, headers=1, post_parse=[convert_values], bytes_sample_size=1000000)
             stream.open()
             nonefieldname = False
             if schema is None:
-                schema = list()
-                for fieldname in stream.headers:
-                    if fieldname is not None:
-                        schema.append({'id': fieldname, 'type': 'text'})
-                    else:
-                        nonefieldname = True
-            data = {'resource_id': self.data['id'], 'force': True, 'fields': schema, 'primary_key': primary_key}
-            self._write_to_hdx('datastore_create', data, 'resource_id')
+                nonefieldname = None in stream.headers
+                if infer_types:
+                    schema = infer_schema(path, infer_rows)['schema']
+                else:
+                    schema = [{'id': fieldname, 'type': 'text'} for fieldname in stream.headers
+                              if fieldname is not None]
+            for field in schema:
+                fieldtypes[field['id']] = field['type']
+            row_index = None
+            if index is not None:
+                row_index = RowIndex(index, key, schema)
+                if not deleted_first:
+                    row_index.load(resource_id)
+            if skip_rows == 0:
+                data = {'resource_id': resource_id, 'force': True, 'fields': schema, 'primary_key': primary_key}
+                self._write_to_hdx('datastore_create', data, 'resource_id')
             if primary_key is None:
                 method = 'insert'
             else:
                 method = 'upsert'
             logger.debug('Uploading data from %s to datastore' % url)
-            offset = 0
-            chunksize = 100
-            rowset = stream.read(keyed=True, limit=chunksize)
-            while len(rowset) != 0:
-                if nonefieldname:
-                    for row in rowset:
-                        del row[None]
-                data = {'resource_id': self.data['id'], 'force': True, 'method': method, 'records': rowset}
-                self._write_to_hdx('datastore_upsert', data, 'resource_id')
-                rowset = stream.read(keyed=True, limit=chunksize)
-                logger.debug('Uploading: %s' % offset)
-                offset += chunksize
+            sizer = ChunkSizer(chunk_bytes, chunk_seconds)
+
+            def upsert(records, rownumbers):
+                if row_index is None:
+                    self._upsert_datastore(records, method, rownumbers, sizer)
+                    return
+                records, rownumbers, keyhashes = row_index.get_changed(records, rownumbers)
+                if records:
+                    self._upsert_datastore(records, method, rownumbers, sizer)
+                row_index.commit(keyhashes)
+
+            if checkpoint_file is None:
+                on_commit = None
+            else:
+                def on_commit(committed):
+                    checkpoint_file.save(resource_id, file_hash, committed)
+
+            pipeline = UpsertPipeline(upsert, workers, key, on_commit=on_commit)
+            try:
+                offset = 0
+                while offset < skip_rows:
+                    rowset = stream.read(keyed=True, limit=min(skip_rows - offset, 10000))
+                    if len(rowset) == 0:
+                        break
+                    if row_index is not None:
+                        row_index.see(rowset)
+                    offset += len(rowset)
+                rowset = stream.read(keyed=True, limit=sizer.get_rows())
+                while len(rowset) != 0:
+                    if nonefieldname:
+                        for row in rowset:
+                            del row[None]
+                    if not pipeline.put(rowset, offset):
+                        break
+                    offset += len(rowset)
+                    logger.debug('Uploading: %s' % offset)
+                    rowset = stream.read(keyed=True, limit=sizer.get_rows())
+            finally:
+                error = pipeline.close()
+                if row_index is not None:
+                    row_index.save(resource_id)
+            if error is not None:
+                raise error
+            if row_index is not None:
+                deleted = row_index.get_deleted()
+                if deleted:
+                    try:
+                        self._delete_from_datastore(key, deleted, row_index)
+                    finally:
+                        row_index.save(resource_id)
+            if checkpoint_file is not None:
+                checkpoint_file.delete()
         except Exception as e:
             raisefrom(HDXError, 'Upload to datastore of %s failed!' % url, e)
         finally:
@@ -367,8 +567,8 @@ class Resource(HDXObject):
                 if zip_path:
                     unlink(path)  # ie. we keep the zip but remove the extracted file
 
-    def create_datastore_from_dict_schema(self, data, delete_first=0, path=None):
-        # type: (dict, int, Optional[str]) -> None
+    def create_datastore_from_dict_schema(self, data, delete_first=0, path=None, **kwargs):
+        # type: (dict, int, Optional[str], ...) -> None
         """For csvs, create a resource in the HDX datastore which enables data preview in HDX from a dictionary
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -377,17 +577,18 @@ class Resource(HDXObject):
             data (dict): Dictionary containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             delete_first (int): Delete datastore before creation. 0 = No, 1 = Yes, 2 = If no primary key. Defaults to 0.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
         schema = data['schema']
         primary_key = data.get('primary_key')
-        self.create_datastore(schema, primary_key, delete_first, path=path)
+        self.create_datastore(schema, primary_key, delete_first, path=path, **kwargs)
 
     def create_datastore_from_yaml_schema(self, yaml_path, delete_first=0,
-                                          path=None):
-        # type: (str, Optional[int], Optional[str]) -> None
+                                          path=None, **kwargs):
+        # type: (str, Optional[int], Optional[str], ...) -> None
         """For csvs, create a resource in the HDX datastore which enables data preview in HDX from a YAML file
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -396,15 +597,16 @@ class Resource(HDXObject):
             yaml_path (str): Path to YAML file containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             delete_first (int): Delete datastore before creation. 0 = No, 1 = Yes, 2 = If no primary key. Defaults to 0.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
         data = load_yaml(yaml_path)
-        self.create_datastore_from_dict_schema(data, delete_first, path=path)
+        self.create_datastore_from_dict_schema(data, delete_first, path=path, **kwargs)
 
-    def create_datastore_from_json_schema(self, json_path, delete_first=0, path=None):
-        # type: (str, int, Optional[str]) -> None
+    def create_datastore_from_json_schema(self, json_path, delete_first=0, path=None, **kwargs):
+        # type: (str, int, Optional[str], ...) -> None
         """For csvs, create a resource in the HDX datastore which enables data preview in HDX from a JSON file
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -413,46 +615,50 @@ class Resource(HDXObject):
             json_path (str): Path to JSON file containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             delete_first (int): Delete datastore before creation. 0 = No, 1 = Yes, 2 = If no primary key. Defaults to 0.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
         data = load_json(json_path)
-        self.create_datastore_from_dict_schema(data, delete_first, path=path)
+        self.create_datastore_from_dict_schema(data, delete_first, path=path, **kwargs)
 
-    def create_datastore_for_topline(self, delete_first=0, path=None):
-        # type: (int, Optional[str]) -> None
+    def create_datastore_for_topline(self, delete_first=0, path=None, **kwargs):
+        # type: (int, Optional[str], ...) -> None
         """For csvs, create a resource in the HDX datastore which enables data preview in HDX using the built in
         YAML definition for a topline. If path is not supplied, the file is first downloaded from HDX.
 
         Args:
             delete_first (int): Delete datastore before creation. 0 = No, 1 = Yes, 2 = If no primary key. Defaults to 0.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
         data = load_yaml(script_dir_plus_file(join('..', 'hdx_datasource_topline.yml'), Resource))
-        self.create_datastore_from_dict_schema(data, delete_first, path=path)
+        self.create_datastore_from_dict_schema(data, delete_first, path=path, **kwargs)
 
     def update_datastore(self, schema=None, primary_key=None,
-                         path=None):
-        # type: (Optional[List[Dict]], Optional[str], Optional[str]) -> None
+                         path=None, **kwargs):
+        # type: (Optional[List[Dict]], Optional[str], Optional[str], ...) -> None
         """For csvs, update a resource in the HDX datastore which enables data preview in HDX. If no schema is provided
-        all fields are assumed to be text. If path is not supplied, the file is first downloaded from HDX.
+        all fields are assumed to be text unless infer_types is passed. If path is not supplied, the file is first
+        downloaded from HDX.
 
         Args:
             schema (List[Dict]): List of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}. Defaults to None.
             primary_key (Optional[str]): Primary key of schema. Defaults to None.
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
-        self.create_datastore(schema, primary_key, 2, path=path)
+        self.create_datastore(schema, primary_key, 2, path=path, **kwargs)
 
-    def update_datastore_from_dict_schema(self, data, path=None):
-        # type: (dict, Optional[str]) -> None
+    def update_datastore_from_dict_schema(self, data, path=None, **kwargs):
+        # type: (dict, Optional[str], ...) -> None
         """For csvs, update a resource in the HDX datastore which enables data preview in HDX from a dictionary
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -460,14 +666,15 @@ class Resource(HDXObject):
         Args:
             data (dict): Dictionary containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
-        self.create_datastore_from_dict_schema(data, 2, path=path)
+        self.create_datastore_from_dict_schema(data, 2, path=path, **kwargs)
 
-    def update_datastore_from_yaml_schema(self, yaml_path, path=None):
-        # type: (str, Optional[str]) -> None
+    def update_datastore_from_yaml_schema(self, yaml_path, path=None, **kwargs):
+        # type: (str, Optional[str], ...) -> None
         """For csvs, update a resource in the HDX datastore which enables data preview in HDX from a YAML file
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -475,14 +682,15 @@ class Resource(HDXObject):
         Args:
             yaml_path (str): Path to YAML file containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
-        self.create_datastore_from_yaml_schema(yaml_path, 2, path=path)
+        self.create_datastore_from_yaml_schema(yaml_path, 2, path=path, **kwargs)
 
-    def update_datastore_from_json_schema(self, json_path, path=None):
-        # type: (str, Optional[str]) -> None
+    def update_datastore_from_json_schema(self, json_path, path=None, **kwargs):
+        # type: (str, Optional[str], ...) -> None
         """For csvs, update a resource in the HDX datastore which enables data preview in HDX from a JSON file
         containing a list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'} and optionally a primary key.
         If path is not supplied, the file is first downloaded from HDX.
@@ -490,24 +698,26 @@ class Resource(HDXObject):
         Args:
             json_path (str): Path to JSON file containing list of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
-        self.create_datastore_from_json_schema(json_path, 2, path=path)
+        self.create_datastore_from_json_schema(json_path, 2, path=path, **kwargs)
 
-    def update_datastore_for_topline(self, path=None):
-        # type: (Optional[str]) -> None
+    def update_datastore_for_topline(self, path=None, **kwargs):
+        # type: (Optional[str], ...) -> None
         """For csvs, update a resource in the HDX datastore which enables data preview in HDX using the built in YAML
         definition for a topline. If path is not supplied, the file is first downloaded from HDX.
 
         Args:
             path (Optional[str]): Local path to file that was uploaded. Defaults to None.
+            **kwargs: Other arguments to pass to create_datastore eg. chunk_bytes
 
         Returns:
             None
         """
-        self.create_datastore_for_topline(2, path=path)
+        self.create_datastore_for_topline(2, path=path, **kwargs)
 
     def touch(self):
         # type: () -> None
@@ -84,11 +84,7 @@ class Showcase(hdx.data.hdxobject.HDXObject):
             Optional[Showcase]: Showcase object if successful read, None if not
         """
 
-        showcase = Showcase(configuration=configuration)
-        result = showcase._load_from_hdx('showcase', identifier)
-        if result:
-            return showcase
-        return None
+        return Showcase._read_identified('showcase', identifier, configuration)
 
     def check_required_fields(self, ignore_fields=list()):
         # type: (List[str]) -> None
@@ -203,7 +199,7 @@ class Showcase(hdx.data.hdxobject.HDXObject):
         """
         if isinstance(dataset, hdx.data.dataset.Dataset) or isinstance(dataset, dict):
             if 'id' not in dataset:
-                dataset = hdx.data.dataset.Dataset.read_from_hdx(dataset['name'])
+                dataset = hdx.data.dataset.Dataset.read_from_hdx(dataset['name'], configuration=self.configuration)
             dataset = dataset['id']
         elif not isinstance(dataset, str):
             raise hdx.data.hdxobject.HDXError('Type %s cannot be added as a dataset!' % type(dataset).__name__)
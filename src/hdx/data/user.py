@@ -77,11 +77,7 @@ class User(HDXObject):
             Optional[User]: User object if successful read, None if not
         """
 
-        user = User(configuration=configuration)
-        result = user._load_from_hdx('user', identifier)
-        if result:
-            return user
-        return None
+        return User._read_identified('user', identifier, configuration)
 
     def check_required_fields(self, ignore_fields=list()):
         # type: (List[str]) -> None
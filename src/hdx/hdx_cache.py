@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""Caching of responses to HDX read actions in memory or on disk"""
+import abc
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+from typing import Optional, Dict, Any, Iterable
+
+
+class ResponseCache(object):
+    """Abstract cache of responses to HDX read actions keyed by (site, action, parameters). Entries expire after ttl
+    seconds and the least recently used entries are evicted when there are more than max_size. Each entry is tagged
+    with the id of the object returned, if any, so that it can be invalidated when that object is written.
+
+    Args:
+        ttl (Optional[float]): Seconds before entries expire or None for no expiry. Defaults to 300.
+        max_size (int): Maximum number of entries. Defaults to 1000.
+        actions (Optional[Iterable[str]]): Actions to cache. Defaults to default_actions.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    default_actions = frozenset(['package_show', 'organization_show', 'user_show', 'group_list', 'group_show',
+                                 'resource_show', 'ckanext_showcase_show'])
+
+    def __init__(self, ttl=300, max_size=1000, actions=None):
+        # type: (Optional[float], int, Optional[Iterable[str]]) -> None
+        if max_size < 1:
+            raise ValueError('Maximum size must be at least 1!')
+        self.ttl = ttl
+        self.max_size = max_size
+        if actions is None:
+            self.actions = self.default_actions
+        else:
+            self.actions = frozenset(actions)
+
+    def is_cacheable(self, action, files=None):
+        # type: (str, Optional[Iterable]) -> bool
+        """
+        Check if the response to a call to HDX can be cached
+
+        Args:
+            action (str): HDX action eg. package_show
+            files (Optional[Iterable]): Files uploaded by call. Defaults to None.
+
+        Returns:
+            bool: True if response can be cached, False if not
+        """
+        return not files and action in self.actions
+
+    @staticmethod
+    def make_key(site_url, action, data_dict, apikey=None):
+        # type: (str, str, Optional[Dict], Optional[str]) -> str
+        """
+        Make cache key for a call to HDX. A hash of the API key is included so that users with different access do not
+        share entries.
+
+        Args:
+            site_url (str): HDX site url
+            action (str): HDX action eg. package_show
+            data_dict (Optional[Dict]): Parameters passed to action
+            apikey (Optional[str]): HDX API key used. Defaults to None.
+
+        Returns:
+            str: Cache key
+        """
+        if apikey:
+            user = hashlib.sha256(apikey.encode('utf-8')).hexdigest()[:16]
+        else:
+            user = ''
+        return json.dumps([site_url, user, action, data_dict or dict()], sort_keys=True)
+
+    @staticmethod
+    def get_tag(value):
+        # type: (Any) -> Optional[str]
+        """
+        Get tag used to invalidate a cached response which is the id of the HDX object returned if any
+
+        Args:
+            value (Any): Response from HDX
+
+        Returns:
+            Optional[str]: Tag or None
+        """
+        if isinstance(value, dict):
+            return value.get('id')
+        return None
+
+    def _expiry(self):
+        # type: () -> Optional[float]
+        if self.ttl is None:
+            return None
+        return time() + self.ttl
+
+    @abc.abstractmethod
+    def get(self, key):
+        # type: (str) -> Any
+        """
+        Get cached response
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Any: Cached response or None if there is no unexpired entry
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        # type: (str, Any) -> None
+        """
+        Cache response
+
+        Args:
+            key (str): Cache key
+            value (Any): Response from HDX
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def invalidate(self, tag):
+        # type: (str) -> None
+        """
+        Remove cached responses for an HDX object
+
+        Args:
+            tag (str): Id of HDX object
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        # type: () -> None
+        """
+        Remove all cached responses
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """In memory cache of responses to HDX read actions. Responses are copied in and out so that changes to HDX
+    objects do not alter the cache. Thread safe.
+
+    Args:
+        ttl (Optional[float]): Seconds before entries expire or None for no expiry. Defaults to 300.
+        max_size (int): Maximum number of entries. Defaults to 1000.
+        actions (Optional[Iterable[str]]): Actions to cache. Defaults to default_actions.
+    """
+
+    def __init__(self, ttl=300, max_size=1000, actions=None):
+        # type: (Optional[float], int, Optional[Iterable[str]]) -> None
+        super(MemoryCache, self).__init__(ttl=ttl, max_size=max_size, actions=actions)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._entries)
+
+    def get(self, key):
+        # type: (str) -> Any
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, tag, value = entry
+            if expires is not None and expires < time():
+                return None
+            self._entries[key] = entry
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        # type: (str, Any) -> None
+        entry = (self._expiry(), self.get_tag(value), copy.deepcopy(value))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag):
+        # type: (str) -> None
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == tag]:
+                del self._entries[key]
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(ResponseCache):
+    """On disk cache of responses to HDX read actions stored in an SQLite database so that it can be shared between
+    runs. Thread safe.
+
+    Args:
+        path (str): Path to SQLite database file
+        ttl (Optional[float]): Seconds before entries expire or None for no expiry. Defaults to 3600.
+        max_size (int): Maximum number of entries. Defaults to 10000.
+        actions (Optional[Iterable[str]]): Actions to cache. Defaults to default_actions.
+    """
+
+    def __init__(self, path, ttl=3600, max_size=10000, actions=None):
+        # type: (str, Optional[float], int, Optional[Iterable[str]]) -> None
+        super(DiskCache, self).__init__(ttl=ttl, max_size=max_size, actions=actions)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, tag TEXT, '
+                                     'value TEXT, expires REAL, accessed REAL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_tag ON responses (tag)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def __len__(self):
+        # type: () -> int
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        # type: (str) -> Any
+        now = time()
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT value, expires FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires is not None and expires < now:
+                self._connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            self._connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value):
+        # type: (str, Any) -> None
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                     (key, self.get_tag(value), json.dumps(value), self._expiry(), time()))
+            self._connection.execute('DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY '
+                                     'accessed DESC LIMIT -1 OFFSET ?)', (self.max_size,))
+
+    def invalidate(self, tag):
+        # type: (str) -> None
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM responses WHERE tag = ?', (tag,))
+
+    def clear(self):
+        # type: () -> None
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM responses')
+
+    def close(self):
+        # type: () -> None
+        """
+        Close SQLite database
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Change detection by hashing metadata and files so that unchanged HDX objects need not be sent to HDX again"""
+import hashlib
+import json
+
+from typing import Any, Dict
+
+block_size = 65536
+
+
+def project(remote, local):
+    # type: (Any, Any) -> Any
+    """Project remote metadata onto the structure of local metadata ie. keep only the keys of dictionaries that are
+    in the local metadata. Fields that HDX adds (eg. ids of tags) are thereby ignored in comparisons.
+
+    Args:
+        remote (Any): Metadata from HDX
+        local (Any): Local metadata
+
+    Returns:
+        Any: Remote metadata projected onto local metadata
+    """
+    if isinstance(local, dict) and isinstance(remote, dict):
+        return {key: project(remote.get(key), value) for key, value in local.items()}
+    if isinstance(local, list) and isinstance(remote, list) and len(local) == len(remote):
+        return [project(remotevalue, localvalue) for remotevalue, localvalue in zip(remote, local)]
+    return remote
+
+
+def get_metadata_hash(data):
+    # type: (Dict) -> str
+    """Get canonical hash of metadata that does not depend upon the order of keys
+
+    Args:
+        data (Dict): Metadata
+
+    Returns:
+        str: SHA-256 hash of metadata
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def get_file_hash(path):
+    # type: (str) -> str
+    """Get hash of contents of file
+
+    Args:
+        path (str): Path to file
+
+    Returns:
+        str: SHA-256 hash of file
+    """
+    filehash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            filehash.update(block)
+    return filehash.hexdigest()
+
+
+def is_unchanged(local, remote):
+    # type: (Dict, Dict) -> bool
+    """Check if sending local metadata to HDX would change the metadata that HDX has
+
+    Args:
+        local (Dict): Local metadata
+        remote (Dict): Metadata from HDX
+
+    Returns:
+        bool: True if local metadata is unchanged from metadata in HDX, False if not
+    """
+    return get_metadata_hash(local) == get_metadata_hash(project(remote, local))
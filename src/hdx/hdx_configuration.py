@@ -7,21 +7,36 @@ from hdx.utilities.session import get_session
 
 if six.PY2:
     from UserDict import IterableUserDict as UserDict
+    asyncio = None
 else:
     from collections import UserDict
+    import asyncio
 
 
 import logging
+import threading
+import time
 from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
 from os.path import expanduser, join
-from typing import Optional
+from typing import Optional, Callable, Iterable, List, Tuple, Any, Union, Dict
 
 import ckanapi
+import requests
+from requests.adapters import HTTPAdapter
 
 from hdx.utilities.dictandlist import merge_two_dictionaries
 from hdx.utilities.loader import load_yaml, load_json, load_file_to_str
 from hdx.utilities.path import script_dir_plus_file
 
+from hdx.hdx_cache import ResponseCache
+from hdx.hdx_downloadcache import DownloadCache
+from hdx.hdx_identitymap import IdentityMap
+from hdx.hdx_metrics import Metrics
+from hdx.hdx_ratelimiter import RateLimiter, monotonic
+from hdx.hdx_remoteckan import HDXRemoteCKAN
+from hdx.hdx_retry import RetryPolicy
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +44,26 @@ class ConfigurationError(Exception):
     pass
 
 
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter that applies a default timeout to requests that do not specify one
+
+    Args:
+        timeout (Union[float, Tuple[Optional[float], Optional[float]], None]): Default (connect, read) timeout. Defaults to None (no timeout).
+        **kwargs: Keyword arguments to pass to requests HTTPAdapter
+    """
+
+    def __init__(self, timeout=None, **kwargs):
+        # type: (Union[float, Tuple[Optional[float], Optional[float]], None], ...) -> None
+        self.timeout = timeout
+        super(TimeoutHTTPAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # type: (requests.PreparedRequest, ...) -> requests.Response
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super(TimeoutHTTPAdapter, self).send(request, **kwargs)
+
+
 class Configuration(UserDict, object):
     """Configuration for HDX
 
@@ -44,10 +79,24 @@ class Configuration(UserDict, object):
         project_config_dict (dict): Project configuration dictionary OR
         project_config_json (str): Path to JSON Project configuration OR
         project_config_yaml (str): Path to YAML Project configuration
+        max_workers (int): Maximum number of concurrent HDX calls in asynchronous and bulk operations. Defaults to 10.
+        pool_connections (int): Number of connection pools to cache in HDX session. Defaults to 10.
+        pool_maxsize (int): Maximum number of connections to keep per host in HDX session. Defaults to max_workers.
+        connect_timeout (Optional[float]): Timeout in seconds for connecting to HDX. Defaults to None (no timeout).
+        read_timeout (Optional[float]): Timeout in seconds for reading from HDX. Defaults to None (no timeout).
+        keep_alive (bool): Whether to keep connections to HDX alive between calls. Defaults to True.
+        ratelimiter (Optional[RateLimiter]): Rate limiter for calls to HDX. Defaults to adaptive concurrency up to max_workers.
+        retry_policy (Optional[RetryPolicy]): Policy for retrying idempotent calls to HDX. Defaults to RetryPolicy().
+        cache (Optional[ResponseCache]): Cache for responses to HDX read actions eg. MemoryCache(). Defaults to None (no caching).
+        download_cache (Optional[DownloadCache]): Cache of resource downloads revalidated with conditional GETs. Defaults to None.
+        metrics (Optional[Metrics]): Metrics to record calls to HDX in or None to disable. Defaults to Metrics().
+        identity_map (Optional[IdentityMap]): Map of HDX objects already read eg. IdentityMap(). Defaults to None (disabled).
     """
 
     _configuration = None
     default_hdx_key_file = join(expanduser('~'), '.hdxkey')
+    default_max_workers = 10
+    default_pool_connections = 10
 
     def __init__(self, **kwargs):
         # type: (...) -> None
@@ -55,6 +104,24 @@ class Configuration(UserDict, object):
 
         self._remoteckan = None
         self._emailer = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.max_workers = kwargs.get('max_workers', Configuration.default_max_workers)
+        self.pool_connections = kwargs.get('pool_connections', Configuration.default_pool_connections)
+        self.pool_maxsize = kwargs.get('pool_maxsize', self.max_workers)
+        self.connect_timeout = kwargs.get('connect_timeout', None)
+        self.read_timeout = kwargs.get('read_timeout', None)
+        self.keep_alive = kwargs.get('keep_alive', True)
+        self._ratelimiter = kwargs.get('ratelimiter', None)
+        if self._ratelimiter is None:
+            self._ratelimiter = RateLimiter(max_concurrency=self.max_workers)
+        self._retry_policy = kwargs.get('retry_policy', None)
+        if self._retry_policy is None:
+            self._retry_policy = RetryPolicy()
+        self._cache = kwargs.get('cache', None)
+        self._download_cache = kwargs.get('download_cache', None)
+        self._metrics = kwargs.get('metrics', Metrics())
+        self._identity_map = kwargs.get('identity_map', None)
 
         hdx_config_found = False
         hdx_config_dict = kwargs.get('hdx_config_dict', None)
@@ -205,7 +272,8 @@ class Configuration(UserDict, object):
     def call_remoteckan(self, *args, **kwargs):
         # type: (...) -> Dict
         """
-        Calls the remote CKAN
+        Calls the remote CKAN subject to the rate limiter, retrying idempotent calls that fail transiently according
+        to the retry policy. Responses to read actions are returned from and stored in the response cache if enabled.
 
         Args:
             *args: Arguments to pass to remote CKAN call_action method
@@ -220,25 +288,333 @@ class Configuration(UserDict, object):
         kwargs['requests_kwargs'] = requests_kwargs
         apikey = kwargs.get('apikey', self.get_api_key())
         kwargs['apikey'] = apikey
-        return self.remoteckan().call_action(*args, **kwargs)
+        if args:
+            action = args[0]
+        else:
+            action = kwargs.get('action')
+        if len(args) > 1:
+            data_dict = args[1]
+        else:
+            data_dict = kwargs.get('data_dict')
+        if len(args) > 4:
+            files = args[4]
+        else:
+            files = kwargs.get('files')
+        key = None
+        if self._cache is not None and self._cache.is_cacheable(action, files):
+            key = self._cache.make_key(self.get_hdx_site_url(), action, data_dict, apikey)
+            result = self._cache.get(key)
+            if result is not None:
+                if self._metrics is not None:
+                    self._metrics.record_cache_hit(action)
+                return result
+        if self._retry_policy.is_idempotent(action, data_dict, files):
+            max_attempts = self._retry_policy.max_attempts
+        else:
+            max_attempts = 1
+        result = self._call_remoteckan_with_retry(action, max_attempts, *args, **kwargs)
+        if key is not None and result is not None:
+            self._cache.set(key, result)
+        return result
 
-    def create_remoteckan(self, session=get_session(method_whitelist=frozenset(['HEAD', 'TRACE', 'GET', 'POST', 'PUT',
-                                                                                'OPTIONS', 'DELETE']))):
-        # type: () -> ckanapi.RemoteCKAN
+    def _call_remoteckan_with_retry(self, action, max_attempts, *args, **kwargs):
+        # type: (str, int, ...) -> Dict
+        """
+        Calls the remote CKAN subject to the rate limiter making up to max_attempts attempts
+
+        Args:
+            action (str): HDX action eg. package_show
+            max_attempts (int): Maximum number of attempts
+            *args: Arguments to pass to remote CKAN call_action method
+            **kwargs: Keyword arguments to pass to remote CKAN call_action method
+
+        Returns:
+            Dict: The response from the remote CKAN call_action method
+
+        """
+        remoteckan = self.remoteckan()
+        attempt = 0
+        while True:
+            attempt += 1
+            start = self._ratelimiter.acquire(action)
+            error = None
+            try:
+                return remoteckan.call_action(*args, **kwargs)
+            except Exception as e:
+                error = e
+                status, headers = self._last_response(remoteckan)
+                if attempt >= max_attempts or not self._retry_policy.is_transient(e, status):
+                    raise
+                backoff = self._retry_policy.get_backoff(attempt, headers)
+                logger.warning('Attempt %d of %d for %s failed! Retrying in %.1f seconds. (%s)' %
+                               (attempt, max_attempts, action, backoff, e))
+            finally:
+                latency = monotonic() - start
+                status, _ = self._last_response(remoteckan)
+                self._ratelimiter.release(action, start, status)
+                if self._metrics is not None:
+                    request_bytes, response_bytes = 0, 0
+                    if isinstance(remoteckan, HDXRemoteCKAN):
+                        request_bytes, response_bytes = remoteckan.last_transfer()
+                    self._metrics.record(action, latency, request_bytes, response_bytes, attempt > 1, error)
+            time.sleep(backoff)
+
+    @staticmethod
+    def _last_response(remoteckan):
+        # type: (ckanapi.RemoteCKAN) -> Tuple[Optional[int], Dict]
+        """
+        Get the status code and headers of the last response received from remote CKAN by the calling thread if
+        available
+
+        Args:
+            remoteckan (ckanapi.RemoteCKAN): Remote CKAN object
+
+        Returns:
+            Tuple[Optional[int], Dict]: (status code or None if not available, headers)
+
+        """
+        if isinstance(remoteckan, HDXRemoteCKAN):
+            return remoteckan.last_response()
+        return None, dict()
+
+    def last_response_status(self):
+        # type: () -> Optional[int]
+        """
+        Get the status code of the last response received from HDX by the calling thread if available
+
+        Returns:
+            Optional[int]: Status code or None if not available
+
+        """
+        status, _ = self._last_response(self.remoteckan())
+        return status
+
+    def ratelimiter(self):
+        # type: () -> RateLimiter
+        """
+        Return the rate limiter applied to calls to HDX
+
+        Returns:
+            RateLimiter: The rate limiter
+
+        """
+        return self._ratelimiter
+
+    def retry_policy(self):
+        # type: () -> RetryPolicy
+        """
+        Return the policy for retrying calls to HDX
+
+        Returns:
+            RetryPolicy: The retry policy
+
+        """
+        return self._retry_policy
+
+    def cache(self):
+        # type: () -> Optional[ResponseCache]
+        """
+        Return the cache of responses to HDX read actions if caching is enabled
+
+        Returns:
+            Optional[ResponseCache]: The response cache or None if caching is disabled
+
+        """
+        return self._cache
+
+    def download_cache(self):
+        # type: () -> Optional[DownloadCache]
+        """
+        Return the cache of resource downloads if enabled
+
+        Returns:
+            Optional[DownloadCache]: The download cache or None if disabled
+
+        """
+        return self._download_cache
+
+    def metrics(self):
+        # type: () -> Optional[Metrics]
+        """
+        Return the metrics recorded for calls to HDX if enabled
+
+        Returns:
+            Optional[Metrics]: The metrics or None if disabled
+
+        """
+        return self._metrics
+
+    def identity_map(self):
+        # type: () -> Optional[IdentityMap]
+        """
+        Return the map of HDX objects already read if enabled
+
+        Returns:
+            Optional[IdentityMap]: The identity map or None if disabled
+
+        """
+        return self._identity_map
+
+    def invalidate_cache(self, identifier):
+        # type: (Optional[str]) -> None
+        """
+        Remove cached responses for HDX object with given id if caching is enabled
+
+        Args:
+            identifier (Optional[str]): Id of HDX object. Nothing is removed if None.
+
+        Returns:
+            None
+
+        """
+        if self._cache is not None and identifier:
+            self._cache.invalidate(identifier)
+
+    def executor(self):
+        # type: () -> ThreadPoolExecutor
+        """
+        Return the executor used to run HDX calls concurrently, creating it if necessary. It is sized by max_workers
+        and shared by all asynchronous and bulk operations using this configuration.
+
+        Returns:
+            ThreadPoolExecutor: Executor for concurrent HDX calls
+
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def shutdown_executor(self, wait=True):
+        # type: (bool) -> None
+        """
+        Shut down the executor used to run HDX calls concurrently. A new one is created if it is needed again.
+
+        Args:
+            wait (bool): Whether to wait for pending calls to finish. Defaults to True.
+
+        Returns:
+            None
+
+        """
+        with self._executor_lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def run_async(self, function, *args, **kwargs):
+        # type: (Callable, ...) -> asyncio.Future
+        """
+        Run function on the configuration's executor and return an awaitable for its result. Must be called from
+        within a running asyncio event loop.
+
+        Args:
+            function (Callable): Function to run
+            *args: Arguments to pass to function
+            **kwargs: Keyword arguments to pass to function
+
+        Returns:
+            asyncio.Future: Awaitable for the result of the function
+
+        """
+        if asyncio is None:
+            raise ConfigurationError('Asynchronous operations require Python 3!')
+        return asyncio.wrap_future(self.executor().submit(function, *args, **kwargs))
+
+    def run_concurrently(self, function, values, max_workers=None):
+        # type: (Callable, Iterable, Optional[int]) -> List[Tuple[Any, Optional[Exception]]]
+        """
+        Call function on each of values concurrently using a bounded pool of workers. The pool is separate from the
+        executor used by run_async so that asynchronous operations can themselves run bulk operations without
+        starving each other of workers.
+
+        Args:
+            function (Callable): Function to call with each value
+            values (Iterable): Values to pass to function
+            max_workers (Optional[int]): Maximum number of concurrent calls. Defaults to max_workers of configuration.
+
+        Returns:
+            List[Tuple[Any, Optional[Exception]]]: (result, None) or (None, exception) for each value in input order
+
+        """
+        values = list(values)
+        if not values:
+            return list()
+        if max_workers is None:
+            max_workers = self.max_workers
+        if max_workers < 1:
+            raise ConfigurationError('max_workers must be at least 1!')
+        results = list()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(values))) as executor:
+            futures = [executor.submit(function, value) for value in values]
+            for future in futures:
+                exception = future.exception()
+                if exception is None:
+                    results.append((future.result(), None))
+                else:
+                    results.append((None, exception))
+        return results
+
+    def acall_remoteckan(self, *args, **kwargs):
+        # type: (...) -> asyncio.Future
+        """
+        Calls the remote CKAN without blocking the asyncio event loop
+
+        Args:
+            *args: Arguments to pass to remote CKAN call_action method
+            **kwargs: Keyword arguments to pass to remote CKAN call_action method
+
+        Returns:
+            asyncio.Future: Awaitable for the response from the remote CKAN call_action method
+
+        """
+        return self.run_async(self.call_remoteckan, *args, **kwargs)
+
+    def create_session(self):
+        # type: () -> requests.Session
+        """
+        Create requests Session object for calling HDX with retrying of connection errors and connection pool sizes,
+        timeouts and keep-alive taken from configuration
+
+        Returns:
+            requests.Session: requests Session object
+
+        """
+        session = get_session(method_whitelist=frozenset(['HEAD', 'TRACE', 'GET', 'POST', 'PUT', 'OPTIONS', 'DELETE']))
+        if self.connect_timeout is None and self.read_timeout is None:
+            timeout = None
+        else:
+            timeout = (self.connect_timeout, self.read_timeout)
+        for prefix in ('http://', 'https://'):
+            # Only retry connection errors in session. Retrying responses and read errors is left to call_remoteckan
+            # which only does so for idempotent actions
+            max_retries = session.get_adapter(prefix).max_retries.new(read=0, status_forcelist=frozenset(),
+                                                                      respect_retry_after_header=False)
+            session.mount(prefix, TimeoutHTTPAdapter(timeout=timeout, max_retries=max_retries,
+                                                     pool_connections=self.pool_connections,
+                                                     pool_maxsize=self.pool_maxsize))
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def create_remoteckan(self, session=None):
+        # type: (Optional[requests.Session]) -> ckanapi.RemoteCKAN
         """
         Create remote CKAN instance from configuration
 
         Args:
-            session: requests Session object to use. Defaults to calling hdx.utilities.session.get_session()
+            session (Optional[requests.Session]): requests Session object to use. Defaults to calling create_session().
 
         Returns:
             ckanapi.RemoteCKAN: Remote CKAN instance
 
         """
+        if session is None:
+            session = self.create_session()
         version_file = open(script_dir_plus_file('version.txt', Configuration))
         version = version_file.read().strip()
-        return ckanapi.RemoteCKAN(self.get_hdx_site_url(), session=session,
-                                  user_agent='HDXPythonLibrary/%s' % version)
+        return HDXRemoteCKAN(self.get_hdx_site_url(), session=session, user_agent='HDXPythonLibrary/%s' % version)
 
     def setup_remoteckan(self, remoteckan=None):
         # type: (Optional[ckanapi.RemoteCKAN]) -> None
@@ -343,6 +719,18 @@ class Configuration(UserDict, object):
             project_config_dict (dict): Project configuration dictionary OR
             project_config_json (str): Path to JSON Project configuration OR
             project_config_yaml (str): Path to YAML Project configuration
+            max_workers (int): Maximum number of concurrent HDX calls in asynchronous and bulk operations. Defaults to 10.
+            pool_connections (int): Number of connection pools to cache in HDX session. Defaults to 10.
+            pool_maxsize (int): Maximum number of connections to keep per host in HDX session. Defaults to max_workers.
+            connect_timeout (Optional[float]): Timeout in seconds for connecting to HDX. Defaults to None (no timeout).
+            read_timeout (Optional[float]): Timeout in seconds for reading from HDX. Defaults to None (no timeout).
+            keep_alive (bool): Whether to keep connections to HDX alive between calls. Defaults to True.
+            ratelimiter (Optional[RateLimiter]): Rate limiter for calls to HDX. Defaults to adaptive concurrency up to max_workers.
+            retry_policy (Optional[RetryPolicy]): Policy for retrying idempotent calls to HDX. Defaults to RetryPolicy().
+            cache (Optional[ResponseCache]): Cache for responses to HDX read actions eg. MemoryCache(). Defaults to None (no caching).
+            download_cache (Optional[DownloadCache]): Cache of resource downloads revalidated with conditional GETs. Defaults to None.
+            metrics (Optional[Metrics]): Metrics to record calls to HDX in or None to disable. Defaults to Metrics().
+            identity_map (Optional[IdentityMap]): Map of HDX objects already read eg. IdentityMap(). Defaults to None (disabled).
 
         Returns:
             None
@@ -373,6 +761,18 @@ class Configuration(UserDict, object):
             project_config_dict (dict): Project configuration dictionary OR
             project_config_json (str): Path to JSON Project configuration OR
             project_config_yaml (str): Path to YAML Project configuration
+            max_workers (int): Maximum number of concurrent HDX calls in asynchronous and bulk operations. Defaults to 10.
+            pool_connections (int): Number of connection pools to cache in HDX session. Defaults to 10.
+            pool_maxsize (int): Maximum number of connections to keep per host in HDX session. Defaults to max_workers.
+            connect_timeout (Optional[float]): Timeout in seconds for connecting to HDX. Defaults to None (no timeout).
+            read_timeout (Optional[float]): Timeout in seconds for reading from HDX. Defaults to None (no timeout).
+            keep_alive (bool): Whether to keep connections to HDX alive between calls. Defaults to True.
+            ratelimiter (Optional[RateLimiter]): Rate limiter for calls to HDX. Defaults to adaptive concurrency up to max_workers.
+            retry_policy (Optional[RetryPolicy]): Policy for retrying idempotent calls to HDX. Defaults to RetryPolicy().
+            cache (Optional[ResponseCache]): Cache for responses to HDX read actions eg. MemoryCache(). Defaults to None (no caching).
+            download_cache (Optional[DownloadCache]): Cache of resource downloads revalidated with conditional GETs. Defaults to None.
+            metrics (Optional[Metrics]): Metrics to record calls to HDX in or None to disable. Defaults to Metrics().
+            identity_map (Optional[IdentityMap]): Map of HDX objects already read eg. IdentityMap(). Defaults to None (disabled).
 
         Returns:
             str: HDX site url
@@ -402,6 +802,18 @@ class Configuration(UserDict, object):
             project_config_dict (dict): Project configuration dictionary OR
             project_config_json (str): Path to JSON Project configuration OR
             project_config_yaml (str): Path to YAML Project configuration
+            max_workers (int): Maximum number of concurrent HDX calls in asynchronous and bulk operations. Defaults to 10.
+            pool_connections (int): Number of connection pools to cache in HDX session. Defaults to 10.
+            pool_maxsize (int): Maximum number of connections to keep per host in HDX session. Defaults to max_workers.
+            connect_timeout (Optional[float]): Timeout in seconds for connecting to HDX. Defaults to None (no timeout).
+            read_timeout (Optional[float]): Timeout in seconds for reading from HDX. Defaults to None (no timeout).
+            keep_alive (bool): Whether to keep connections to HDX alive between calls. Defaults to True.
+            ratelimiter (Optional[RateLimiter]): Rate limiter for calls to HDX. Defaults to adaptive concurrency up to max_workers.
+            retry_policy (Optional[RetryPolicy]): Policy for retrying idempotent calls to HDX. Defaults to RetryPolicy().
+            cache (Optional[ResponseCache]): Cache for responses to HDX read actions eg. MemoryCache(). Defaults to None (no caching).
+            download_cache (Optional[DownloadCache]): Cache of resource downloads revalidated with conditional GETs. Defaults to None.
+            metrics (Optional[Metrics]): Metrics to record calls to HDX in or None to disable. Defaults to Metrics().
+            identity_map (Optional[IdentityMap]): Map of HDX objects already read eg. IdentityMap(). Defaults to None (disabled).
 
         Returns:
             str: HDX site url
@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+"""Helpers for loading data into the HDX datastore"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from datetime import date, datetime
+from os import rename, unlink
+from os.path import exists
+
+import requests
+import six
+from six.moves import queue
+from tabulator import Stream
+from typing import Optional, Callable, List, Dict, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+
+def _save_json(path, data):
+    # type: (str, Dict) -> None
+    """Save dictionary to JSON file by writing a temporary file and renaming it over the file so that a failure part
+    way through does not leave a partial file
+
+    Args:
+        path (str): Path to JSON file
+        data (Dict): Dictionary to save
+
+    Returns:
+        None
+    """
+    temp_path = '%s.part' % path
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    if exists(path):
+        unlink(path)
+    rename(temp_path, path)
+
+
+class ChunkSizer(object):
+    """Chooses the number of rows to send in each datastore_upsert call so that payloads are close to a byte budget.
+    The budget starts at target_bytes. It is multiplied by backoff when a call is rejected as too large or times out
+    or when a call takes longer than target_seconds. It grows by growth up to target_bytes again when calls take
+    less than half of target_seconds. The number of bytes per row is estimated from the chunks sent. Thread safe.
+
+    Args:
+        target_bytes (int): Target size of records in each call in bytes. Defaults to 1000000.
+        target_seconds (Optional[float]): Seconds above which a call is regarded as too slow. Defaults to 30.
+        initial_rows (int): Number of rows in first chunk before bytes per row is known. Defaults to 100.
+        min_bytes (int): Minimum budget in bytes. Defaults to 10000.
+        max_rows (int): Maximum number of rows in a chunk. Defaults to 100000.
+        backoff (float): Factor to multiply budget by on failure or slow call. Defaults to 0.5.
+        growth (float): Factor to multiply budget by on fast call. Defaults to 1.5.
+    """
+    bytes_per_row_smoothing = 0.2
+    shrink_statuses = (413, 504)
+
+    def __init__(self, target_bytes=1000000, target_seconds=30.0, initial_rows=100, min_bytes=10000,
+                 max_rows=100000, backoff=0.5, growth=1.5):
+        # type: (int, Optional[float], int, int, int, float, float) -> None
+        if target_bytes < 1 or initial_rows < 1 or max_rows < 1:
+            raise ValueError('Target bytes and rows must be positive!')
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.initial_rows = initial_rows
+        self.min_bytes = min(min_bytes, target_bytes)
+        self.max_rows = max_rows
+        self.backoff = backoff
+        self.growth = growth
+        self.budget = float(target_bytes)
+        self.bytes_per_row = None  # type: Optional[float]
+        self._lock = threading.Lock()
+
+    def get_rows(self):
+        # type: () -> int
+        """
+        Get number of rows to read for the next chunk
+
+        Returns:
+            int: Number of rows
+        """
+        with self._lock:
+            if self.bytes_per_row is None:
+                return min(self.initial_rows, self.max_rows)
+            return int(max(1, min(self.max_rows, self.budget / self.bytes_per_row)))
+
+    def record(self, rows, nbytes, seconds):
+        # type: (int, int, float) -> None
+        """
+        Record a successful call to update the bytes per row estimate and adjust the budget from its latency
+
+        Args:
+            rows (int): Number of rows sent
+            nbytes (int): Number of bytes of records sent
+            seconds (float): Duration of call in seconds
+
+        Returns:
+            None
+        """
+        if rows < 1:
+            return
+        with self._lock:
+            bytes_per_row = float(nbytes) / rows
+            if self.bytes_per_row is None:
+                self.bytes_per_row = bytes_per_row
+            else:
+                self.bytes_per_row += self.bytes_per_row_smoothing * (bytes_per_row - self.bytes_per_row)
+            if self.target_seconds is None:
+                return
+            if seconds > self.target_seconds:
+                self.budget = max(float(self.min_bytes), self.budget * self.backoff)
+            elif seconds < self.target_seconds / 2.0:
+                self.budget = min(float(self.target_bytes), self.budget * self.growth)
+
+    def shrink(self):
+        # type: () -> None
+        """
+        Shrink the budget after a call was rejected as too large or timed out
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.budget = max(float(self.min_bytes), self.budget * self.backoff)
+
+    @classmethod
+    def is_too_large(cls, exception, status=None):
+        # type: (Exception, Optional[int]) -> bool
+        """
+        Check if a failed call might succeed with a smaller payload ie. it was rejected as too large (413) or timed
+        out
+
+        Args:
+            exception (Exception): Exception raised by call
+            status (Optional[int]): HTTP status code of response. Defaults to None.
+
+        Returns:
+            bool: True if call might succeed with a smaller payload, False if not
+        """
+        if status is not None and status in cls.shrink_statuses:
+            return True
+        while exception is not None:
+            if isinstance(exception, requests.exceptions.Timeout):
+                return True
+            exception = getattr(exception, '__cause__', None)
+        return False
+
+
+class UpsertPipeline(object):
+    """Pipeline in which chunks of rows read by the caller are upserted by worker threads so that reading and
+    parsing overlap with calls to HDX. Without a key, workers take chunks from a shared bounded queue. With a key,
+    each row goes to the worker given by the hash of its key values so that rows with the same key are upserted in
+    the order they were read. Once a worker fails, no further chunks are upserted and close returns the error. The
+    number of rows from the start that have all been upserted is kept in committed. Without a key, if the error
+    raised by upsert has a rows_done attribute giving how many of the chunk's rows were upserted before it failed,
+    those rows are included in committed.
+
+    Args:
+        upsert (Callable[[List[Dict], List[int]], None]): Function to upsert rows given rows and their row numbers
+        workers (int): Number of worker threads. Defaults to 1.
+        key (Optional[List[str]]): Fields whose values determine the worker for each row. Defaults to None.
+        queue_size (Optional[int]): Maximum chunks waiting for each queue. Defaults to 2 per worker sharing it.
+        on_commit (Optional[Callable[[int], None]]): Function called with committed whenever it increases. Defaults to None.
+    """
+
+    def __init__(self, upsert, workers=1, key=None, queue_size=None, on_commit=None):
+        # type: (Callable[[List[Dict], List[int]], None], int, Optional[List[str]], Optional[int], Optional[Callable[[int], None]]) -> None
+        if workers < 1:
+            raise ValueError('Number of workers must be at least 1!')
+        self.upsert = upsert
+        self.key = key
+        self.on_commit = on_commit
+        self.committed = 0
+        self.error = None  # type: Optional[Exception]
+        self._chunks = list()  # type: List[Tuple[int, int]]
+        self._partial = dict()  # type: Dict[int, int]
+        self._outstanding = dict()  # type: Dict[int, int]
+        self._next_chunk = 0
+        self._lock = threading.Lock()
+        if key is None:
+            nqueues = 1
+        else:
+            nqueues = workers
+        if queue_size is None:
+            queue_size = 2 * workers // nqueues
+        self._queues = [queue.Queue(queue_size) for _ in range(nqueues)]
+        self._threads = list()
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, args=(self._queues[i % nqueues],))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self, chunkqueue):
+        # type: (queue.Queue) -> None
+        while True:
+            item = chunkqueue.get()
+            if item is None:
+                return
+            chunkindex, rows, rownumbers = item
+            if self.error is not None:
+                continue
+            try:
+                self.upsert(rows, rownumbers)
+                self._done(chunkindex)
+            except Exception as e:
+                rows_done = getattr(e, 'rows_done', 0)
+                with self._lock:
+                    if self.error is None:
+                        self.error = e
+                if self.key is None and rows_done > 0:
+                    self._done(chunkindex, rows_done)
+
+    def _done(self, chunkindex, rows_done=None):
+        # type: (int, Optional[int]) -> None
+        with self._lock:
+            if rows_done is None:
+                self._outstanding[chunkindex] -= 1
+            else:
+                self._partial[chunkindex] = rows_done
+            committed = self.committed
+            while self._next_chunk < len(self._chunks) and self._outstanding.get(self._next_chunk) == 0:
+                del self._outstanding[self._next_chunk]
+                self.committed = self._chunks[self._next_chunk][1]
+                self._next_chunk += 1
+            rows_done = self._partial.get(self._next_chunk)
+            if rows_done is not None:
+                self.committed = max(self.committed, self._chunks[self._next_chunk][0] + rows_done)
+            if self.on_commit is not None and self.committed > committed:
+                self.on_commit(self.committed)
+
+    def put(self, rows, offset):
+        # type: (List[Dict], int) -> bool
+        """
+        Add chunk of rows to be upserted, waiting if the workers are behind
+
+        Args:
+            rows (List[Dict]): Rows to upsert
+            offset (int): Number of rows read before these rows
+
+        Returns:
+            bool: True if chunk added or False if a worker failed
+        """
+        if self.error is not None:
+            return False
+        rownumbers = list(range(offset + 1, offset + len(rows) + 1))
+        if self.key is None:
+            parts = [(self._queues[0], rows, rownumbers)]
+        else:
+            partrows = [list() for _ in self._queues]
+            partrownumbers = [list() for _ in self._queues]
+            for row, rownumber in zip(rows, rownumbers):
+                i = hash(tuple(str(row.get(field)) for field in self.key)) % len(self._queues)
+                partrows[i].append(row)
+                partrownumbers[i].append(rownumber)
+            parts = [(chunkqueue, partrows[i], partrownumbers[i]) for i, chunkqueue in enumerate(self._queues)
+                     if partrows[i]]
+        with self._lock:
+            chunkindex = len(self._chunks)
+            self._chunks.append((offset, offset + len(rows)))
+            self._outstanding[chunkindex] = len(parts)
+        for chunkqueue, partrows, partrownumbers in parts:
+            chunkqueue.put((chunkindex, partrows, partrownumbers))
+        return True
+
+    def close(self):
+        # type: () -> Optional[Exception]
+        """
+        Wait for workers to upsert all chunks added and stop them
+
+        Returns:
+            Optional[Exception]: Error of first worker that failed or None
+        """
+        for i, thread in enumerate(self._threads):
+            self._queues[i % len(self._queues)].put(None)
+        for thread in self._threads:
+            thread.join()
+        return self.error
+
+
+class Checkpoint(object):
+    """Checkpoint file recording how many rows of a file have been loaded into the datastore of a resource so that
+    a failed load can be resumed. The file is only used for the same resource and file contents.
+
+    Args:
+        path (str): Path to checkpoint file
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+
+    def load(self, resource_id, file_hash):
+        # type: (str, str) -> int
+        """
+        Get number of rows already loaded from checkpoint file
+
+        Args:
+            resource_id (str): Id of resource
+            file_hash (str): Hash of file being loaded
+
+        Returns:
+            int: Number of rows already loaded or 0 if no checkpoint for resource and file
+        """
+        if not exists(self.path):
+            return 0
+        try:
+            with open(self.path) as f:
+                checkpoint = json.load(f)
+        except ValueError:
+            logger.warning('Ignoring invalid checkpoint file %s!' % self.path)
+            return 0
+        if checkpoint.get('resource_id') != resource_id or checkpoint.get('file_hash') != file_hash:
+            logger.warning('Checkpoint file %s is for a different resource or file. Ignoring it.' % self.path)
+            return 0
+        return checkpoint.get('committed', 0)
+
+    def save(self, resource_id, file_hash, committed):
+        # type: (str, str, int) -> None
+        """
+        Save number of rows loaded to checkpoint file
+
+        Args:
+            resource_id (str): Id of resource
+            file_hash (str): Hash of file being loaded
+            committed (int): Number of rows from the start of the file loaded
+
+        Returns:
+            None
+        """
+        _save_json(self.path, {'resource_id': resource_id, 'file_hash': file_hash, 'committed': committed})
+
+    def delete(self):
+        # type: () -> None
+        """
+        Delete checkpoint file if it exists
+
+        Returns:
+            None
+        """
+        if exists(self.path):
+            unlink(self.path)
+
+
+class RowIndex(object):
+    """Index from the primary key of each row loaded into the datastore of a resource to a hash of the row kept in a
+    sidecar file so that a later load of a new version of the file need only send rows that were inserted or changed
+    and delete rows whose keys are no longer present. The index is only used for the same resource, primary key and
+    schema because the schema determines the values that are sent and hence the keys and hashes of rows. Thread safe.
+
+    Args:
+        path (str): Path to index file
+        key (List[str]): Fields of primary key
+        schema (List[Dict]): List of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
+    """
+    hash_length = 16
+
+    def __init__(self, path, key, schema):
+        # type: (str, List[str], List[Dict]) -> None
+        self.path = path
+        self.key = key
+        self.schema = [[field['id'], field['type']] for field in schema]
+        self.hashes = dict()  # type: Dict[str, str]
+        self.seen = set()
+        self._lock = threading.Lock()
+
+    def load(self, resource_id):
+        # type: (str) -> bool
+        """
+        Load index from index file
+
+        Args:
+            resource_id (str): Id of resource
+
+        Returns:
+            bool: True if index loaded, False if no index for resource, primary key and schema
+        """
+        self.hashes = dict()
+        self.seen = set()
+        if not exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+        except ValueError:
+            logger.warning('Ignoring invalid index file %s!' % self.path)
+            return False
+        if index.get('resource_id') != resource_id or index.get('key') != self.key:
+            logger.warning('Index file %s is for a different resource or primary key. Ignoring it.' % self.path)
+            return False
+        if index.get('schema') != self.schema:
+            logger.warning('Index file %s is for a different schema. Ignoring it.' % self.path)
+            return False
+        self.hashes = index.get('hashes', dict())
+        return True
+
+    def save(self, resource_id):
+        # type: (str) -> None
+        """
+        Save index to index file
+
+        Args:
+            resource_id (str): Id of resource
+
+        Returns:
+            None
+        """
+        with self._lock:
+            _save_json(self.path, {'resource_id': resource_id, 'key': self.key, 'schema': self.schema,
+                                   'hashes': self.hashes})
+
+    def clear(self):
+        # type: () -> None
+        """
+        Clear index eg. after the datastore is deleted
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.hashes = dict()
+            self.seen = set()
+
+    def get_key(self, row):
+        # type: (Dict) -> str
+        """
+        Get key of row in index
+
+        Args:
+            row (Dict): Row
+
+        Returns:
+            str: Key of row
+        """
+        return json.dumps([row.get(field) for field in self.key], default=str)
+
+    @classmethod
+    def get_hash(cls, row):
+        # type: (Dict) -> str
+        """
+        Get hash of row that does not depend upon the order of its fields
+
+        Args:
+            row (Dict): Row
+
+        Returns:
+            str: Hash of row
+        """
+        canonical = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:cls.hash_length]
+
+    def see(self, rows):
+        # type: (List[Dict]) -> None
+        """
+        Mark keys of rows as present in file without checking if rows changed eg. for rows skipped on resume
+
+        Args:
+            rows (List[Dict]): Rows
+
+        Returns:
+            None
+        """
+        keys = [self.get_key(row) for row in rows]
+        with self._lock:
+            self.seen.update(keys)
+
+    def get_changed(self, rows, rownumbers):
+        # type: (List[Dict], List[int]) -> Tuple[List[Dict], List[int], List[Tuple[str, str]]]
+        """
+        Get rows that are not in the index or whose hash differs from the one in the index and mark keys of all rows
+        as present in file
+
+        Args:
+            rows (List[Dict]): Rows
+            rownumbers (List[int]): Row numbers of rows in file
+
+        Returns:
+            Tuple[List[Dict], List[int], List[Tuple[str, str]]]: (changed rows, their row numbers, their keys and hashes)
+        """
+        rowkeys = [self.get_key(row) for row in rows]
+        rowhashes = [self.get_hash(row) for row in rows]
+        changed_rows = list()
+        changed_rownumbers = list()
+        keyhashes = list()
+        with self._lock:
+            for row, rownumber, rowkey, rowhash in zip(rows, rownumbers, rowkeys, rowhashes):
+                self.seen.add(rowkey)
+                if self.hashes.get(rowkey) != rowhash:
+                    changed_rows.append(row)
+                    changed_rownumbers.append(rownumber)
+                    keyhashes.append((rowkey, rowhash))
+        return changed_rows, changed_rownumbers, keyhashes
+
+    def commit(self, keyhashes):
+        # type: (List[Tuple[str, str]]) -> None
+        """
+        Record hashes of rows once they have been loaded
+
+        Args:
+            keyhashes (List[Tuple[str, str]]): Keys and hashes of rows
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for rowkey, rowhash in keyhashes:
+                self.hashes[rowkey] = rowhash
+
+    def get_deleted(self):
+        # type: () -> List[List]
+        """
+        Get primary key values of rows in index whose keys are not present in file
+
+        Returns:
+            List[List]: List of primary key values of deleted rows
+        """
+        with self._lock:
+            return [json.loads(rowkey) for rowkey in self.hashes if rowkey not in self.seen]
+
+    def remove(self, deleted):
+        # type: (List[List]) -> None
+        """
+        Remove rows from index once they have been deleted from the datastore
+
+        Args:
+            deleted (List[List]): List of primary key values of deleted rows
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for values in deleted:
+                self.hashes.pop(json.dumps(values, default=str), None)
+
+
+class TypeInferrer(object):
+    """Infers the datastore type of each column from the values in it. A column is int if all its values are integers
+    that fit in a 32 bit integer, numeric if they are all numbers, timestamp if they are all dates or ISO 8601 date
+    strings and text otherwise. Empty values are ignored and columns with no values are text. Integers written with
+    leading zeros (eg. codes) and dates in other formats (whose day and month order is ambiguous) are text.
+    """
+    types = ('int', 'numeric', 'timestamp', 'text')
+    int_types = ('int', 'int4', 'int8', 'integer', 'bigint')
+    numeric_types = ('numeric', 'float', 'float8', 'double precision')
+    timestamp_types = ('timestamp', 'date', 'time')
+    int_regex = re.compile(r'^[+-]?(0|[1-9][0-9]*)$')
+    numeric_regex = re.compile(r'^[+-]?((0|[1-9][0-9]*)(\.[0-9]*)?|\.[0-9]+)([eE][+-]?[0-9]+)?$')
+    timestamp_regex = re.compile(r'^([0-9]{4}-[0-9]{2}-[0-9]{2})([ T][0-9]{2}:[0-9]{2}(:[0-9]{2}(\.[0-9]+)?)?'
+                                 r'(Z|[+-][0-9]{2}:?[0-9]{2})?)?$')
+    max_int = 2 ** 31 - 1
+
+    def __init__(self):
+        # type: () -> None
+        self.columns = dict()  # type: Dict[int, str]
+
+    @classmethod
+    def get_type(cls, value):
+        # type: (Any) -> Optional[str]
+        """
+        Get the most specific datastore type of a value
+
+        Args:
+            value (Any): Value
+
+        Returns:
+            Optional[str]: int, numeric, timestamp or text or None if value is empty
+        """
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return 'text'
+        if isinstance(value, six.integer_types):
+            if -cls.max_int - 1 <= value <= cls.max_int:
+                return 'int'
+            return 'numeric'
+        if isinstance(value, float):
+            if value != value or value in (float('inf'), float('-inf')):
+                return 'text'
+            return 'numeric'
+        if isinstance(value, (datetime, date)):
+            return 'timestamp'
+        value = six.text_type(value).strip()
+        if not value:
+            return None
+        if cls.int_regex.match(value):
+            return cls.get_type(int(value))
+        if cls.numeric_regex.match(value):
+            return 'numeric'
+        match = cls.timestamp_regex.match(value)
+        if match:
+            try:
+                datetime.strptime(match.group(1), '%Y-%m-%d')
+                return 'timestamp'
+            except ValueError:
+                pass
+        return 'text'
+
+    def add(self, row):
+        # type: (List) -> None
+        """
+        Add values of row to inference
+
+        Args:
+            row (List): Values of row in column order
+
+        Returns:
+            None
+        """
+        for i, value in enumerate(row):
+            valuetype = self.get_type(value)
+            if valuetype is None:
+                continue
+            columntype = self.columns.get(i)
+            if columntype is None or columntype == valuetype:
+                self.columns[i] = valuetype
+            elif {columntype, valuetype} == {'int', 'numeric'}:
+                self.columns[i] = 'numeric'
+            else:
+                self.columns[i] = 'text'
+
+    def get_schema(self, headers):
+        # type: (List[Optional[str]]) -> List[Dict]
+        """
+        Get schema from types inferred for columns
+
+        Args:
+            headers (List[Optional[str]]): Column headers. Columns with header None are omitted.
+
+        Returns:
+            List[Dict]: List of fields and types of form {'id': 'FIELD', 'type': 'TYPE'}
+        """
+        return [{'id': header, 'type': self.columns.get(i, 'text')} for i, header in enumerate(headers)
+                if header is not None]
+
+    @classmethod
+    def convert(cls, value, fieldtype):
+        # type: (Any, str) -> Any
+        """
+        Convert value for sending to the datastore as a field of the given type. Empty values of typed fields become
+        None, integers read as text become integers and dates become ISO 8601 strings. Numbers read as text are sent
+        unchanged so that no precision is lost. Values that do not match the type are sent unchanged for the
+        datastore to reject. Values of text fields and fields of other types are converted to text.
+
+        Args:
+            value (Any): Value
+            fieldtype (str): Datastore type of field
+
+        Returns:
+            Any: Converted value
+        """
+        if fieldtype in cls.int_types or fieldtype in cls.numeric_types or fieldtype in cls.timestamp_types:
+            if value is None or isinstance(value, bool):
+                return value
+            if isinstance(value, (datetime, date)):
+                return value.isoformat()
+            if isinstance(value, float) and fieldtype in cls.int_types and value.is_integer():
+                return int(value)
+            if not isinstance(value, six.string_types):
+                return value
+            value = value.strip()
+            if not value:
+                return None
+            if fieldtype in cls.int_types and cls.int_regex.match(value):
+                return int(value)
+            return value
+        return str(value)
+
+
+def infer_schema(path, infer_rows=1000, **kwargs):
+    # type: (str, Optional[int], Any) -> Dict
+    """Infer datastore schema of a file (eg. csv or xlsx) from the first infer_rows rows or the whole file. The result
+    can be passed to create_datastore_from_dict_schema or update_datastore_from_dict_schema of Resource.
+
+    Args:
+        path (str): Path to file
+        infer_rows (Optional[int]): Number of rows to read or None for whole file. Defaults to 1000.
+        **kwargs: Other arguments to pass to tabulator Stream eg. sheet
+
+    Returns:
+        Dict: Dictionary containing list of fields and types of form {'schema': [{'id': 'FIELD', 'type': 'TYPE'}]}
+    """
+    kwargs.setdefault('bytes_sample_size', 1000000)
+    inferrer = TypeInferrer()
+    with Stream(path, headers=1, **kwargs) as stream:
+        for i, row in enumerate(stream.iter()):
+            if infer_rows is not None and i >= infer_rows:
+                break
+            inferrer.add(row)
+        headers = stream.headers
+    return {'schema': inferrer.get_schema(headers)}
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache of downloaded files revalidated with conditional GETs"""
+import hashlib
+import json
+import logging
+from os import makedirs, unlink, rename
+from os.path import join, exists, splitext
+from posixpath import basename
+
+from six.moves.urllib.parse import urlparse
+from typing import Optional, Tuple, Dict
+
+from hdx.utilities import raisefrom
+from hdx.utilities.downloader import Download, DownloadError
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCache(object):
+    """Cache of downloaded files in a folder keyed by url. The ETag and Last-Modified headers of each download are
+    stored alongside the file and sent back as If-None-Match and If-Modified-Since so that unchanged files are not
+    downloaded again.
+
+    Args:
+        folder (str): Folder in which to keep downloaded files
+        **kwargs: Keyword arguments to pass to Download eg. auth
+    """
+
+    def __init__(self, folder, **kwargs):
+        # type: (str, ...) -> None
+        if not exists(folder):
+            makedirs(folder)
+        self.folder = folder
+        self.download_kwargs = kwargs
+
+    def get_paths(self, url):
+        # type: (str) -> Tuple[str, str]
+        """Get paths of cached file and its metadata for url. The file keeps the extension of the url so that its
+        format can be detected.
+
+        Args:
+            url (str): URL to download
+
+        Returns:
+            Tuple[str, str]: (Path of cached file, Path of metadata)
+        """
+        filename, extension = splitext(basename(urlparse(url).path))
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        path = join(self.folder, '%s_%s%s' % (key, filename, extension))
+        return path, '%s.json' % join(self.folder, key)
+
+    def get_metadata(self, url):
+        # type: (str) -> Optional[Dict]
+        """Get stored url, ETag and Last-Modified of cached file for url if it exists
+
+        Args:
+            url (str): URL to download
+
+        Returns:
+            Optional[Dict]: Metadata or None if url is not cached
+        """
+        path, metadata_path = self.get_paths(url)
+        if not exists(path) or not exists(metadata_path):
+            return None
+        with open(metadata_path) as f:
+            return json.load(f)
+
+    def download(self, url, timeout=None):
+        # type: (str, Optional[float]) -> Tuple[str, bool]
+        """Download file from url into cache unless the cached copy is still valid
+
+        Args:
+            url (str): URL to download
+            timeout (Optional[float]): Timeout for connecting to URL. Defaults to None (no timeout).
+
+        Returns:
+            Tuple[str, bool]: (Path of cached file, True if downloaded or False if cached copy was still valid)
+        """
+        path, metadata_path = self.get_paths(url)
+        headers = dict()
+        metadata = self.get_metadata(url)
+        if metadata is not None:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+        with Download(**self.download_kwargs) as download:
+            try:
+                download.response = download.session.get(url, stream=True, headers=headers, timeout=timeout)
+                if download.response.status_code == 304 and metadata is not None:
+                    logger.debug('Using cached download of %s' % url)
+                    return path, False
+                download.response.raise_for_status()
+            except Exception as e:
+                raisefrom(DownloadError, 'Download of %s failed!' % url, e)
+            temp_path = '%s.part' % path
+            f = None
+            try:
+                f = open(temp_path, 'wb')
+                for chunk in download.response.iter_content(chunk_size=10240):
+                    if chunk:  # filter out keep-alive new chunks
+                        f.write(chunk)
+            except Exception as e:
+                raisefrom(DownloadError, 'Download of %s failed in retrieval of stream!' % url, e)
+            finally:
+                if f:
+                    f.close()
+            if exists(path):
+                unlink(path)
+            rename(temp_path, path)
+            metadata = {'url': url, 'etag': download.response.headers.get('ETag'),
+                        'last_modified': download.response.headers.get('Last-Modified')}
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f)
+        return path, True
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Identity map of HDX objects already read so that they are not read and created again"""
+import threading
+import weakref
+from contextlib import contextmanager
+
+from typing import Any, Optional, Dict, Tuple, Iterable, Iterator
+
+
+class IdentityMap(object):
+    """Map from (object type, id or name) to HDX objects already read from HDX. Objects are held weakly so that the map
+    does not keep alive objects that are no longer used elsewhere. Within a scope, objects added are also held strongly
+    until the scope ends when they are removed from the map so that later reads get fresh metadata. Thread safe.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self._objects = weakref.WeakValueDictionary()  # type: weakref.WeakValueDictionary
+        self._scopes = list()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        # type: () -> int
+        with self._lock:
+            return len(self._objects)
+
+    def get(self, object_type, identifier):
+        # type: (str, str) -> Any
+        """
+        Get HDX object from map
+
+        Args:
+            object_type (str): Type of HDX object eg. Dataset
+            identifier (str): Id or name of HDX object
+
+        Returns:
+            Any: HDX object or None if not in map
+        """
+        with self._lock:
+            return self._objects.get((object_type, identifier))
+
+    def add(self, object_type, hdxobject, identifiers):
+        # type: (str, Any, Iterable[Optional[str]]) -> None
+        """
+        Add HDX object to map under each of its identifiers
+
+        Args:
+            object_type (str): Type of HDX object eg. Dataset
+            hdxobject (Any): HDX object
+            identifiers (Iterable[Optional[str]]): Ids and/or names of HDX object. Any that are None are ignored.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for identifier in identifiers:
+                if identifier is None:
+                    continue
+                key = (object_type, identifier)
+                self._objects[key] = hdxobject
+                if self._scopes:
+                    self._scopes[-1][key] = hdxobject
+
+    def remove(self, object_type, identifiers):
+        # type: (str, Iterable[Optional[str]]) -> None
+        """
+        Remove HDX object from map
+
+        Args:
+            object_type (str): Type of HDX object eg. Dataset
+            identifiers (Iterable[Optional[str]]): Ids and/or names of HDX object. Any that are None are ignored.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for identifier in identifiers:
+                self._objects.pop((object_type, identifier), None)
+
+    def clear(self):
+        # type: () -> None
+        """
+        Remove all HDX objects from map
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._objects.clear()
+
+    @contextmanager
+    def scope(self):
+        # type: () -> Iterator['IdentityMap']
+        """
+        Context manager within which HDX objects added to the map are kept alive. When it exits, they are removed from
+        the map. Scopes can be nested eg. one per job.
+
+        Returns:
+            Iterator[IdentityMap]: This identity map
+        """
+        scope = dict()  # type: Dict[Tuple[str, str], Any]
+        with self._lock:
+            self._scopes.append(scope)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._scopes.remove(scope)
+                for key, hdxobject in scope.items():
+                    if self._objects.get(key) is hdxobject:
+                        del self._objects[key]
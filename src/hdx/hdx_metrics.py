@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Metrics for calls to HDX"""
+import threading
+from bisect import bisect_left
+
+from typing import Optional, Dict, List, Callable, Any
+
+
+class ActionMetrics(object):
+    """Metrics for calls to one HDX action. Latencies are counted in histogram buckets from which percentiles are
+    estimated so that memory use does not grow with the number of calls.
+
+    Args:
+        buckets (List[float]): Upper bounds in seconds of latency histogram buckets in ascending order
+    """
+
+    def __init__(self, buckets):
+        # type: (List[float]) -> None
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # last is +Inf
+        self.calls = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.errors = dict()  # type: Dict[str, int]
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def record(self, latency, request_bytes=0, response_bytes=0, retry=False, error=None):
+        # type: (float, int, int, bool, Optional[str]) -> None
+        """
+        Record a call
+
+        Args:
+            latency (float): Seconds taken by call
+            request_bytes (int): Size of request. Defaults to 0.
+            response_bytes (int): Size of response. Defaults to 0.
+            retry (bool): Whether call was a retry. Defaults to False.
+            error (Optional[str]): Class name of error raised by call if any. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.calls += 1
+        if retry:
+            self.retries += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        self.bucket_counts[bisect_left(self.buckets, latency)] += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+
+    def percentile(self, percent):
+        # type: (float) -> Optional[float]
+        """
+        Estimate latency percentile by interpolating within the histogram bucket that contains it
+
+        Args:
+            percent (float): Percentile to estimate eg. 95
+
+        Returns:
+            Optional[float]: Estimated latency in seconds or None if there have been no calls
+        """
+        if self.calls == 0:
+            return None
+        rank = percent / 100.0 * self.calls
+        cumulative = 0
+        for i, count in enumerate(self.bucket_counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i < len(self.buckets):
+                    upper = self.buckets[i]
+                else:
+                    upper = max(self.latency_max, lower)
+                upper = min(upper, self.latency_max)
+                lower = min(lower, upper)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.latency_max
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Get metrics as a dictionary
+
+        Returns:
+            Dict[str, Any]: Metrics
+        """
+        return {'calls': self.calls, 'retries': self.retries, 'cache_hits': self.cache_hits,
+                'errors': dict(self.errors), 'request_bytes': self.request_bytes,
+                'response_bytes': self.response_bytes,
+                'latency': {'sum': self.latency_sum, 'max': self.latency_max, 'p50': self.percentile(50),
+                            'p95': self.percentile(95), 'p99': self.percentile(99)}}
+
+
+class Metrics(object):
+    """Per action counts of calls, retries, cache hits and errors by class, request and response bytes and latency
+    histograms for calls to HDX. Thread safe. Callbacks are called with a dictionary describing each call to HDX
+    (keys: action, latency, request_bytes, response_bytes, retry, error) so that metrics can also be sent elsewhere.
+
+    Args:
+        buckets (Optional[List[float]]): Upper bounds in seconds of latency histogram buckets. Defaults to default_buckets.
+        callbacks (Optional[List[Callable[[Dict], None]]]): Functions to call with each call to HDX. Defaults to None.
+    """
+    default_buckets = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+
+    def __init__(self, buckets=None, callbacks=None):
+        # type: (Optional[List[float]], Optional[List[Callable[[Dict], None]]]) -> None
+        if buckets is None:
+            buckets = self.default_buckets
+        self.buckets = sorted(buckets)
+        self.callbacks = list(callbacks or list())
+        self.actions = dict()  # type: Dict[str, ActionMetrics]
+        self._lock = threading.Lock()
+
+    def _get_action(self, action):
+        # type: (str) -> ActionMetrics
+        actionmetrics = self.actions.get(action)
+        if actionmetrics is None:
+            actionmetrics = ActionMetrics(self.buckets)
+            self.actions[action] = actionmetrics
+        return actionmetrics
+
+    def record(self, action, latency, request_bytes=0, response_bytes=0, retry=False, error=None):
+        # type: (str, float, int, int, bool, Optional[Exception]) -> None
+        """
+        Record a call to HDX
+
+        Args:
+            action (str): HDX action eg. package_show
+            latency (float): Seconds taken by call
+            request_bytes (int): Size of request. Defaults to 0.
+            response_bytes (int): Size of response. Defaults to 0.
+            retry (bool): Whether call was a retry. Defaults to False.
+            error (Optional[Exception]): Error raised by call if any. Defaults to None.
+
+        Returns:
+            None
+        """
+        if error is not None:
+            error = type(error).__name__
+        with self._lock:
+            self._get_action(action).record(latency, request_bytes, response_bytes, retry, error)
+        for callback in self.callbacks:
+            callback({'action': action, 'latency': latency, 'request_bytes': request_bytes,
+                      'response_bytes': response_bytes, 'retry': retry, 'error': error})
+
+    def record_cache_hit(self, action):
+        # type: (str) -> None
+        """
+        Record a call to HDX answered from the response cache
+
+        Args:
+            action (str): HDX action eg. package_show
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._get_action(action).cache_hits += 1
+
+    def reset(self):
+        # type: () -> None
+        """
+        Remove all recorded metrics
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.actions = dict()
+
+    def as_dict(self):
+        # type: () -> Dict[str, Dict[str, Any]]
+        """
+        Get metrics as a dictionary from action to metrics for that action
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Metrics by action
+        """
+        with self._lock:
+            return {action: self.actions[action].as_dict() for action in self.actions}
+
+    @staticmethod
+    def _format_value(value):
+        # type: (float) -> str
+        return repr(float(value))
+
+    def to_prometheus(self, prefix='hdx'):
+        # type: (str) -> str
+        """
+        Get metrics in Prometheus text exposition format
+
+        Args:
+            prefix (str): Prefix for metric names. Defaults to hdx.
+
+        Returns:
+            str: Metrics in Prometheus text format
+        """
+        lines = list()
+        with self._lock:
+            actions = sorted(self.actions.items())
+            lines.append('# HELP %s_calls_total Calls to HDX' % prefix)
+            lines.append('# TYPE %s_calls_total counter' % prefix)
+            for action, metrics in actions:
+                lines.append('%s_calls_total{action="%s"} %d' % (prefix, action, metrics.calls))
+            lines.append('# HELP %s_retries_total Calls to HDX that were retries' % prefix)
+            lines.append('# TYPE %s_retries_total counter' % prefix)
+            for action, metrics in actions:
+                lines.append('%s_retries_total{action="%s"} %d' % (prefix, action, metrics.retries))
+            lines.append('# HELP %s_cache_hits_total Calls to HDX answered from cache' % prefix)
+            lines.append('# TYPE %s_cache_hits_total counter' % prefix)
+            for action, metrics in actions:
+                lines.append('%s_cache_hits_total{action="%s"} %d' % (prefix, action, metrics.cache_hits))
+            lines.append('# HELP %s_errors_total Calls to HDX that raised errors' % prefix)
+            lines.append('# TYPE %s_errors_total counter' % prefix)
+            for action, metrics in actions:
+                for error, count in sorted(metrics.errors.items()):
+                    lines.append('%s_errors_total{action="%s",error="%s"} %d' % (prefix, action, error, count))
+            lines.append('# HELP %s_bytes_total Bytes sent to and received from HDX' % prefix)
+            lines.append('# TYPE %s_bytes_total counter' % prefix)
+            for action, metrics in actions:
+                lines.append('%s_bytes_total{action="%s",direction="request"} %d' %
+                             (prefix, action, metrics.request_bytes))
+                lines.append('%s_bytes_total{action="%s",direction="response"} %d' %
+                             (prefix, action, metrics.response_bytes))
+            lines.append('# HELP %s_call_duration_seconds Latency of calls to HDX' % prefix)
+            lines.append('# TYPE %s_call_duration_seconds histogram' % prefix)
+            for action, metrics in actions:
+                cumulative = 0
+                for bucket, count in zip(self.buckets, metrics.bucket_counts):
+                    cumulative += count
+                    lines.append('%s_call_duration_seconds_bucket{action="%s",le="%s"} %d' %
+                                 (prefix, action, self._format_value(bucket), cumulative))
+                lines.append('%s_call_duration_seconds_bucket{action="%s",le="+Inf"} %d' %
+                             (prefix, action, metrics.calls))
+                lines.append('%s_call_duration_seconds_sum{action="%s"} %s' %
+                             (prefix, action, self._format_value(metrics.latency_sum)))
+                lines.append('%s_call_duration_seconds_count{action="%s"} %d' % (prefix, action, metrics.calls))
+        return '\n'.join(lines) + '\n'
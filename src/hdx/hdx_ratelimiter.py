@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Client side rate limiting and adaptive concurrency for HDX calls"""
+import threading
+import time
+
+from typing import Optional, Dict, Any
+
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+
+class TokenBucket(object):
+    """Token bucket allowing a sustained rate of calls with bursts up to a capacity. Thread safe.
+
+    Args:
+        rate (float): Number of calls allowed per second
+        capacity (Optional[float]): Maximum burst size. Defaults to max(rate, 1).
+    """
+
+    def __init__(self, rate, capacity=None):
+        # type: (float, Optional[float]) -> None
+        if rate <= 0:
+            raise ValueError('Rate must be positive!')
+        self.rate = float(rate)
+        if capacity is None:
+            capacity = max(self.rate, 1.0)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._last = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # type: () -> float
+        """
+        Take a token from the bucket, going into debt if it is empty
+
+        Returns:
+            float: Number of seconds to wait before the token may be used
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            if self._tokens >= 0.0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        # type: () -> float
+        """
+        Take a token from the bucket, waiting until one is available
+
+        Returns:
+            float: Number of seconds waited
+        """
+        wait = self.reserve()
+        if wait > 0.0:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveConcurrency(object):
+    """Limit on the number of calls in flight adjusted AIMD style: the limit increases additively by one every
+    limit successful calls and decreases multiplicatively on throttling responses or when the latency of a call
+    exceeds latency_tolerance times the average latency of calls to the same action (actions like package_search and
+    datastore_upsert have very different normal latencies so they are averaged separately). It decreases at most once for calls started before the
+    previous decrease so that a burst of failures only counts once. Thread safe.
+
+    Args:
+        max_limit (int): Maximum number of calls in flight
+        min_limit (int): Minimum number of calls in flight. Defaults to 1.
+        initial_limit (Optional[int]): Starting number of calls in flight. Defaults to max_limit.
+        backoff (float): Factor to multiply limit by on decrease. Defaults to 0.5.
+        latency_tolerance (Optional[float]): Ratio to average latency regarded as congestion. Defaults to 2.0.
+    """
+    latency_smoothing = 0.1
+
+    def __init__(self, max_limit, min_limit=1, initial_limit=None, backoff=0.5, latency_tolerance=2.0):
+        # type: (int, int, Optional[int], float, Optional[float]) -> None
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError('Concurrency limits must satisfy 1 <= min_limit <= max_limit!')
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        if initial_limit is None:
+            initial_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.average_latencies = dict()  # type: Dict[Optional[str], float]
+        self.inflight = 0
+        self._last_decrease = None  # type: Optional[float]
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        # type: () -> float
+        """
+        Wait until a call can be made without exceeding the limit and count it as in flight
+
+        Returns:
+            float: Start time of call
+        """
+        with self._condition:
+            while self.inflight >= int(self.limit):
+                self._condition.wait()
+            self.inflight += 1
+        return monotonic()
+
+    def _decrease(self, start):
+        # type: (float) -> None
+        if self._last_decrease is not None and start < self._last_decrease:
+            return
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self._last_decrease = monotonic()
+
+    def release(self, start, throttled=False, action=None):
+        # type: (float, bool, Optional[str]) -> None
+        """
+        Count a call as no longer in flight and adjust the limit from its outcome
+
+        Args:
+            start (float): Start time of call returned by acquire
+            throttled (bool): Whether HDX throttled the call. Defaults to False.
+            action (Optional[str]): HDX action whose average latency the call is compared with. Defaults to None.
+
+        Returns:
+            None
+        """
+        latency = monotonic() - start
+        with self._condition:
+            self.inflight -= 1
+            if throttled:
+                self._decrease(start)
+            else:
+                congested = False
+                average_latency = self.average_latencies.get(action)
+                if average_latency is None:
+                    self.average_latencies[action] = latency
+                else:
+                    if self.latency_tolerance is not None and latency > average_latency * self.latency_tolerance:
+                        congested = True
+                    self.average_latencies[action] = average_latency + \
+                        self.latency_smoothing * (latency - average_latency)
+                if congested:
+                    self._decrease(start)
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class ActionLimiter(object):
+    """Rate and concurrency limiter for one or more HDX actions
+
+    Args:
+        rate (Optional[float]): Number of calls allowed per second. Defaults to None (unlimited).
+        burst (Optional[float]): Maximum burst size. Defaults to max(rate, 1).
+        max_concurrency (int): Maximum number of calls in flight. Defaults to 10.
+        min_concurrency (int): Minimum number of calls in flight. Defaults to 1.
+        backoff (float): Factor to multiply concurrency by on throttling or congestion. Defaults to 0.5.
+        latency_tolerance (Optional[float]): Ratio to average latency regarded as congestion. Defaults to 2.0.
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrency=10, min_concurrency=1, backoff=0.5,
+                 latency_tolerance=2.0):
+        # type: (Optional[float], Optional[float], int, int, float, Optional[float]) -> None
+        if rate is None:
+            self.bucket = None
+        else:
+            self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency, backoff=backoff,
+                                               latency_tolerance=latency_tolerance)
+
+    def acquire(self):
+        # type: () -> float
+        """
+        Wait until a call is allowed by the rate and concurrency limits
+
+        Returns:
+            float: Start time of call to pass to release
+        """
+        start = self.concurrency.acquire()
+        if self.bucket is not None:
+            self.bucket.acquire()
+            start = monotonic()
+        return start
+
+    def release(self, start, throttled=False, action=None):
+        # type: (float, bool, Optional[str]) -> None
+        """
+        Mark a call as completed
+
+        Args:
+            start (float): Start time of call returned by acquire
+            throttled (bool): Whether HDX throttled the call. Defaults to False.
+            action (Optional[str]): HDX action eg. package_search. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.concurrency.release(start, throttled, action)
+
+
+class RateLimiter(object):
+    """Rate limiter for calls to HDX with one limiter shared by all actions other than those given their own limits
+    in actions. Thread safe and so also safe to use from the asynchronous methods which run calls on executor threads.
+
+    Args:
+        actions (Optional[Dict[str, Dict]]): Limiter arguments for actions that have their own limits eg. {'datastore_upsert': {'rate': 2}}. Defaults to None.
+        **kwargs: ActionLimiter arguments for other actions. See below
+        rate (Optional[float]): Number of calls allowed per second. Defaults to None (unlimited).
+        burst (Optional[float]): Maximum burst size. Defaults to max(rate, 1).
+        max_concurrency (int): Maximum number of calls in flight. Defaults to 10.
+        min_concurrency (int): Minimum number of calls in flight. Defaults to 1.
+        backoff (float): Factor to multiply concurrency by on throttling or congestion. Defaults to 0.5.
+        latency_tolerance (Optional[float]): Ratio to average latency regarded as congestion. Defaults to 2.0.
+    """
+    throttle_statuses = frozenset([429, 503])
+
+    def __init__(self, actions=None, **kwargs):
+        # type: (Optional[Dict[str, Dict]], Any) -> None
+        self.default = ActionLimiter(**kwargs)
+        self.actions = dict()  # type: Dict[str, ActionLimiter]
+        if actions is not None:
+            for action in actions:
+                self.actions[action] = ActionLimiter(**actions[action])
+
+    def get_limiter(self, action):
+        # type: (str) -> ActionLimiter
+        """
+        Get limiter for action
+
+        Args:
+            action (str): HDX action eg. package_search
+
+        Returns:
+            ActionLimiter: Limiter for action
+        """
+        return self.actions.get(action, self.default)
+
+    def acquire(self, action):
+        # type: (str) -> float
+        """
+        Wait until a call to action is allowed
+
+        Args:
+            action (str): HDX action eg. package_search
+
+        Returns:
+            float: Start time of call to pass to release
+        """
+        return self.get_limiter(action).acquire()
+
+    def release(self, action, start, status=None):
+        # type: (str, float, Optional[int]) -> None
+        """
+        Mark a call to action as completed
+
+        Args:
+            action (str): HDX action eg. package_search
+            start (float): Start time of call returned by acquire
+            status (Optional[int]): HTTP status code of response. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.get_limiter(action).release(start, status in self.throttle_statuses, action)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Remote CKAN that records the HTTP response of each call"""
+import re
+import threading
+
+import ckanapi
+import requests
+import six
+from typing import Optional, Dict, Tuple, Any
+
+
+class HDXRemoteCKAN(ckanapi.RemoteCKAN):
+    """ckanapi RemoteCKAN that records the status code, headers and sizes of the last request and response made by
+    the calling thread so that they can be used for rate limiting, retrying and monitoring
+
+    Args:
+        address (str): Web address of the CKAN instance
+        **kwargs: Keyword arguments to pass to ckanapi RemoteCKAN
+    """
+    retry_status_regex = re.compile(r'too many (\d{3}) error responses')
+
+    def __init__(self, address, **kwargs):
+        # type: (str, ...) -> None
+        super(HDXRemoteCKAN, self).__init__(address, **kwargs)
+        self._local = threading.local()
+
+    @staticmethod
+    def _size(data):
+        # type: (Any) -> int
+        if data is None:
+            return 0
+        if isinstance(data, six.text_type):
+            return len(data.encode('utf-8'))
+        if isinstance(data, bytes):
+            return len(data)
+        if isinstance(data, dict):
+            return sum(len(six.text_type(key)) + len(six.text_type(value)) for key, value in data.items())
+        return 0
+
+    def _record_request(self, data):
+        # type: (Any) -> None
+        self._local.status = None
+        self._local.headers = dict()
+        self._local.request_bytes = self._size(data)
+        self._local.response_bytes = 0
+
+    def _record_response(self, response):
+        # type: (requests.Response) -> None
+        self._local.status = response.status_code
+        self._local.headers = getattr(response, 'headers', dict())
+        content = getattr(response, 'content', None)
+        if content is None:
+            content = response.text
+        self._local.response_bytes = self._size(content)
+
+    def _record_exception(self, exception):
+        # type: (Exception) -> None
+        match = self.retry_status_regex.search(str(exception))
+        if match:
+            self._local.status = int(match.group(1))
+
+    def last_response(self):
+        # type: () -> Tuple[Optional[int], Dict]
+        """
+        Get the status code and headers of the last response received by the calling thread. If retrying on the
+        session gave up because of repeated error responses, the status code is that of those responses.
+
+        Returns:
+            Tuple[Optional[int], Dict]: (status code or None if no response, headers)
+        """
+        return getattr(self._local, 'status', None), getattr(self._local, 'headers', dict())
+
+    def last_transfer(self):
+        # type: () -> Tuple[int, int]
+        """
+        Get the sizes of the last request sent and response received by the calling thread. File uploads are not
+        included in the request size.
+
+        Returns:
+            Tuple[int, int]: (request bytes, response bytes)
+        """
+        return getattr(self._local, 'request_bytes', 0), getattr(self._local, 'response_bytes', 0)
+
+    def _request_fn(self, url, data, headers, files, requests_kwargs):
+        self._record_request(data)
+        try:
+            r = self.session.post(url, data=data, headers=headers, files=files, allow_redirects=False,
+                                  **requests_kwargs)
+        except requests.exceptions.RetryError as e:
+            self._record_exception(e)
+            raise
+        self._record_response(r)
+        return r.status_code, r.text
+
+    def _request_fn_get(self, url, data_dict, headers, requests_kwargs):
+        self._record_request(data_dict)
+        try:
+            r = self.session.get(url, params=data_dict, headers=headers, **requests_kwargs)
+        except requests.exceptions.RetryError as e:
+            self._record_exception(e)
+            raise
+        self._record_response(r)
+        return r.status_code, r.text
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Recording of calls to HDX to a cassette file and replaying them without a network for testing and benchmarking"""
+import gzip
+import json
+import random
+import threading
+import time
+from collections import deque
+
+from six.moves.urllib.parse import urlparse
+from typing import Optional, Dict, List, Any, Tuple
+
+from hdx.hdx_remoteckan import HDXRemoteCKAN
+
+
+class CassetteError(Exception):
+    pass
+
+
+def _get_action(url):
+    # type: (str) -> str
+    return urlparse(url).path.rstrip('/').split('/')[-1]
+
+
+def _decode_request(data):
+    # type: (Any) -> Any
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    try:
+        return json.loads(data)
+    except (TypeError, ValueError):
+        return data
+
+
+def load_cassette(path):
+    # type: (str) -> Dict
+    """Load cassette of recorded calls to HDX from gzipped JSON file
+
+    Args:
+        path (str): Path to cassette
+
+    Returns:
+        Dict: Cassette with keys address and interactions
+    """
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+class RecordingRemoteCKAN(HDXRemoteCKAN):
+    """Remote CKAN that records the request and response of each call to HDX so that they can be saved to a cassette
+    file for replaying with ReplayRemoteCKAN. Files uploaded are not recorded. Set up with
+    configuration.setup_remoteckan(RecordingRemoteCKAN(configuration.get_hdx_site_url(),
+    session=configuration.create_session())).
+
+    Args:
+        address (str): Web address of the CKAN instance
+        **kwargs: Keyword arguments to pass to ckanapi RemoteCKAN
+    """
+
+    def __init__(self, address, **kwargs):
+        # type: (str, ...) -> None
+        super(RecordingRemoteCKAN, self).__init__(address, **kwargs)
+        self.interactions = list()  # type: List[Dict]
+        self._interactions_lock = threading.Lock()
+
+    def _record_interaction(self, url, data, status, text):
+        # type: (str, Any, int, str) -> None
+        interaction = {'action': _get_action(url), 'request': _decode_request(data), 'status': status,
+                       'response': text}
+        with self._interactions_lock:
+            self.interactions.append(interaction)
+
+    def _request_fn(self, url, data, headers, files, requests_kwargs):
+        status, text = super(RecordingRemoteCKAN, self)._request_fn(url, data, headers, files, requests_kwargs)
+        self._record_interaction(url, data, status, text)
+        return status, text
+
+    def _request_fn_get(self, url, data_dict, headers, requests_kwargs):
+        status, text = super(RecordingRemoteCKAN, self)._request_fn_get(url, data_dict, headers, requests_kwargs)
+        self._record_interaction(url, data_dict, status, text)
+        return status, text
+
+    def save(self, path):
+        # type: (str) -> None
+        """Save recorded calls to a gzipped JSON cassette file
+
+        Args:
+            path (str): Path to cassette
+
+        Returns:
+            None
+        """
+        with self._interactions_lock:
+            cassette = {'address': self.address, 'interactions': list(self.interactions)}
+        with gzip.open(path, 'wb') as f:
+            f.write(json.dumps(cassette).encode('utf-8'))
+
+
+class ReplayResponse(object):
+    """Response replayed from a cassette
+
+    Args:
+        status_code (int): HTTP status code
+        text (str): Response body
+    """
+
+    def __init__(self, status_code, text):
+        # type: (int, str) -> None
+        self.status_code = status_code
+        self.text = text
+        self.headers = dict()
+
+
+class ReplayRemoteCKAN(HDXRemoteCKAN):
+    """Remote CKAN that replays calls recorded in a cassette file by RecordingRemoteCKAN without using the network.
+    Calls are matched to recorded calls by action and request (or only by action if match_request is False) and
+    identical calls replay their recorded responses in order, the last being repeated once they run out. Each call
+    sleeps for a synthetic latency so that throughput can be measured reproducibly. Set up with
+    Configuration.create(remoteckan=ReplayRemoteCKAN(PATH_TO_CASSETTE), ...). Thread safe.
+
+    Args:
+        cassette (str): Path to cassette
+        latency (float): Seconds each call takes. Defaults to 0.
+        jitter (float): Maximum random seconds added to latency. Defaults to 0.
+        seed (Optional[int]): Seed for random jitter. Defaults to 0.
+        match_request (bool): Whether to match requests as well as actions. Defaults to True.
+        **kwargs: Keyword arguments to pass to ckanapi RemoteCKAN
+    """
+
+    def __init__(self, cassette, latency=0.0, jitter=0.0, seed=0, match_request=True, **kwargs):
+        # type: (str, float, float, Optional[int], bool, ...) -> None
+        data = load_cassette(cassette)
+        super(ReplayRemoteCKAN, self).__init__(data['address'], **kwargs)
+        self.latency = latency
+        self.jitter = jitter
+        self.match_request = match_request
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._responses = dict()  # type: Dict[str, deque]
+        for interaction in data['interactions']:
+            key = self._get_key(interaction['action'], interaction['request'])
+            responses = self._responses.get(key)
+            if responses is None:
+                responses = deque()
+                self._responses[key] = responses
+            responses.append((interaction['status'], interaction['response']))
+
+    def _get_key(self, action, request):
+        # type: (str, Any) -> str
+        if self.match_request:
+            return json.dumps([action, request], sort_keys=True)
+        return action
+
+    def _replay(self, url, data):
+        # type: (str, Any) -> Tuple[int, str]
+        self._record_request(data)
+        key = self._get_key(_get_action(url), _decode_request(data))
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteError('No recorded call matching %s!' % key)
+            if len(responses) > 1:
+                status, text = responses.popleft()
+            else:
+                status, text = responses[0]
+            latency = self.latency
+            if self.jitter:
+                latency += self._random.uniform(0, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+        self._record_response(ReplayResponse(status, text))
+        return status, text
+
+    def _request_fn(self, url, data, headers, files, requests_kwargs):
+        return self._replay(url, data)
+
+    def _request_fn_get(self, url, data_dict, headers, requests_kwargs):
+        return self._replay(url, data_dict)
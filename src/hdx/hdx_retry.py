@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Retrying of idempotent HDX calls with exponential backoff, jitter and Retry-After"""
+import random
+from email.utils import parsedate_tz, mktime_tz
+from time import time
+
+import requests
+from typing import Optional, Dict, Iterable
+
+
+class RetryPolicy(object):
+    """Policy for retrying HDX calls that fail transiently. Only idempotent calls are retried, so a failure costs one
+    request rather than the whole operation. Calls are idempotent if their action ends in one of idempotent_suffixes
+    or is in idempotent_actions (datastore_upsert only with method upsert) and they do not upload a file.
+
+    Args:
+        max_attempts (int): Maximum number of attempts for each call. Defaults to 5.
+        backoff_factor (float): Seconds to wait after first failure, doubling each attempt. Defaults to 0.5.
+        max_backoff (float): Maximum seconds to wait between attempts. Defaults to 60.
+        jitter (bool): Whether to wait a random time up to the backoff ("full jitter"). Defaults to True.
+        max_retry_after (float): Maximum seconds to honour from Retry-After header. Defaults to 120.
+        retry_statuses (Iterable[int]): HTTP status codes to retry. Defaults to (429, 500, 502, 503, 504).
+        idempotent_actions (Optional[Iterable[str]]): Additional actions that may be retried. Defaults to None.
+    """
+    idempotent_suffixes = ('_show', '_list', '_search', '_search_sql', '_autocomplete', '_update', '_patch',
+                           '_delete')
+    default_retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts=5, backoff_factor=0.5, max_backoff=60.0, jitter=True, max_retry_after=120.0,
+                 retry_statuses=default_retry_statuses, idempotent_actions=None):
+        # type: (int, float, float, bool, float, Iterable[int], Optional[Iterable[str]]) -> None
+        if max_attempts < 1:
+            raise ValueError('Maximum attempts must be at least 1!')
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_actions = {'datastore_upsert'}
+        if idempotent_actions is not None:
+            self.idempotent_actions.update(idempotent_actions)
+
+    def is_idempotent(self, action, data_dict=None, files=None):
+        # type: (str, Optional[Dict], Optional[Iterable]) -> bool
+        """
+        Check if a call to HDX can safely be repeated
+
+        Args:
+            action (str): HDX action eg. package_show
+            data_dict (Optional[Dict]): Data passed to action. Defaults to None.
+            files (Optional[Iterable]): Files uploaded by call. Defaults to None.
+
+        Returns:
+            bool: True if call can be repeated, False if not
+        """
+        if files:
+            return False
+        if action == 'datastore_upsert':
+            return (data_dict or dict()).get('method', 'upsert') == 'upsert'
+        return action in self.idempotent_actions or action.endswith(self.idempotent_suffixes)
+
+    def is_transient(self, exception, status=None):
+        # type: (Exception, Optional[int]) -> bool
+        """
+        Check if a failed call to HDX might succeed if repeated
+
+        Args:
+            exception (Exception): Exception raised by call
+            status (Optional[int]): HTTP status code of response. Defaults to None.
+
+        Returns:
+            bool: True if failure is transient, False if not
+        """
+        if status is not None:
+            return status in self.retry_statuses
+        return isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    @staticmethod
+    def get_retry_after(headers):
+        # type: (Dict) -> Optional[float]
+        """
+        Get seconds to wait from Retry-After header which can be a number of seconds or an HTTP date
+
+        Args:
+            headers (Dict): HTTP response headers
+
+        Returns:
+            Optional[float]: Seconds to wait or None if no valid Retry-After header
+        """
+        retry_after = None
+        for key in headers:
+            if key.lower() == 'retry-after':
+                retry_after = headers[key]
+                break
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            date = parsedate_tz(retry_after)
+            if date is None:
+                return None
+            return max(0.0, mktime_tz(date) - time())
+
+    def get_backoff(self, attempt, headers=None):
+        # type: (int, Optional[Dict]) -> float
+        """
+        Get seconds to wait before next attempt. Waits the longer of the exponential backoff (with jitter if
+        enabled) and any Retry-After header (up to max_retry_after).
+
+        Args:
+            attempt (int): Number of attempts made so far
+            headers (Optional[Dict]): HTTP response headers of failed attempt. Defaults to None.
+
+        Returns:
+            float: Seconds to wait
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        if headers:
+            retry_after = self.get_retry_after(headers)
+            if retry_after is not None:
+                backoff = max(backoff, min(retry_after, self.max_retry_after))
+        return backoff
@@ -1,10 +1,14 @@
 
 # -*- coding: UTF-8 -*-
 """Dataset Tests"""
+import asyncio
 import copy
 import datetime
 import json
 import os
+import re
+import shutil
+import sys
 import tempfile
 from os.path import join
 
@@ -14,11 +18,12 @@ from hdx.utilities.dictandlist import merge_two_dictionaries
 from hdx.utilities.loader import load_yaml
 
 from hdx.data import dataset
-from hdx.data.dataset import Dataset, NotRequestableError
+from hdx.data.dataset import Dataset, DatasetIterator, NotRequestableError
 from hdx.data.hdxobject import HDXError
 from hdx.data.organization import Organization
 from hdx.data.resource import Resource
 from hdx.data.user import User
+from hdx.hdx_changes import get_file_hash
 from hdx.hdx_configuration import Configuration
 from . import MockResponse, user_data, organization_data
 from .test_organization import organization_mockshow
@@ -394,6 +399,83 @@ class TestDataset:
 
         Configuration.read().remoteckan().session = MockSession()
 
+    @pytest.fixture(scope='function')
+    def search_pages(self):
+        class MockSession(object):
+            starts = list()
+            fls = list()
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                start = datadict['start']
+                MockSession.starts.append(start)
+                MockSession.fls.append(datadict.get('fl'))
+                results = list()
+                for i in range(start, min(start + datadict['rows'], 23)):
+                    result = copy.deepcopy(searchdict['results'][0])
+                    result['id'] = 'id%d' % i
+                    if datadict.get('fl'):
+                        result = {key: result[key] for key in datadict['fl']}
+                    results.append(result)
+                return MockResponse(200, '{"success": true, "result": %s}' % json.dumps({'count': 23,
+                                                                                         'results': results}))
+
+        Configuration.read().remoteckan().session = MockSession()
+        return MockSession
+
+    @pytest.fixture(scope='function')
+    def search_keyset(self):
+        class MockSession(object):
+            catalogue = [{'id': 'id%02d' % i, 'name': 'name%02d' % i, 'notes': 'original',
+                          'metadata_modified': '2017-01-01T00:00:%02d.000000' % i} for i in range(13)]
+            calls = list()
+            on_call = None
+
+            @staticmethod
+            def matches(datasetdict, fq):
+                if not fq:
+                    return True
+                if ' AND ' in fq:
+                    return all(MockSession.matches(datasetdict, x.strip('()')) for x in fq.split(' AND '))
+                match = re.match(r'^metadata_modified:\[(.*)Z TO \*\]$', fq)
+                if match:
+                    return datasetdict['metadata_modified'][:23] >= match.group(1)
+                match = re.match(r'^id:\{"(.*)" TO \*\]$', fq)
+                if match:
+                    return datasetdict['id'] > match.group(1)
+                match = re.match(r'^(\w+):(\w+)$', fq)
+                if match:
+                    return datasetdict[match.group(1)] == match.group(2)
+                match = re.match(r'^id:\((.*)\)$', fq)
+                return datasetdict['id'] in [x.strip('"') for x in match.group(1).split(' OR ')]
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'package_list' in url:
+                    return MockResponse(200, '{"success": true, "result": %s}' % json.dumps(
+                        [x['name'] for x in MockSession.catalogue]))
+                MockSession.calls.append(datadict)
+                if MockSession.on_call:
+                    MockSession.on_call(len(MockSession.calls))
+                results = [x for x in MockSession.catalogue if MockSession.matches(x, datadict.get('fq'))]
+                if datadict.get('sort') == 'id asc':
+                    results.sort(key=lambda x: x['id'])
+                else:
+                    assert datadict['sort'] == 'metadata_modified asc, id asc'
+                    results.sort(key=lambda x: (x['metadata_modified'][:23], x['id']))
+                count = len(results)
+                start = datadict.get('start', 0)
+                results = results[start:start + datadict['rows']]
+                if datadict.get('fl'):
+                    results = [{key: x[key] for key in datadict['fl']} for x in results]
+                return MockResponse(200, '{"success": true, "result": %s}' % json.dumps({'count': count,
+                                                                                         'results': results}))
+
+        Configuration.read().remoteckan().session = MockSession()
+        return MockSession
+
     @pytest.fixture(scope='function')
     def post_list(self):
         class MockSession(object):
@@ -469,6 +551,21 @@ class TestDataset:
         dataset = Dataset.read_from_hdx('TEST3')
         assert dataset is None
 
+    def test_aread_from_hdx(self, configuration, read):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            datasets = loop.run_until_complete(asyncio.gather(Dataset.aread_from_hdx('TEST1'),
+                                                              Dataset.aread_from_hdx('TEST2'),
+                                                              Dataset.aread_from_hdx('TEST4')))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        assert datasets[0]['id'] == '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d'
+        assert len(datasets[0].resources) == 2
+        assert datasets[1] is None
+        assert datasets[2]['id'] == 'TEST4'
+
     def test_create_in_hdx(self, configuration, post_create):
         dataset = Dataset()
         with pytest.raises(HDXError):
@@ -592,6 +689,117 @@ class TestDataset:
         assert len(dataset.resources) == 3
         os.unlink(file.name)
 
+    def test_patch_in_hdx(self, configuration):
+        posted = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                action = url.split('/')[-1]
+                if action != 'package_hxl_update':
+                    posted.append((action, datadict))
+                if action in ('package_show', 'package_hxl_update'):
+                    result = dataset_resultdict
+                elif action == 'package_patch':
+                    result = copy.deepcopy(dataset_resultdict)
+                    result.update(datadict)
+                elif action == 'resource_patch':
+                    result = [resource for resource in dataset_resultdict['resources']
+                              if resource['id'] == datadict['id']][0]
+                    result = dict(result, **datadict)
+                elif action == 'resource_create':
+                    result = dict(datadict, id='NEW')
+                else:
+                    return MockResponse(404,
+                                        '{"success": false, "error": {"message": "Not found", "__type": "Not Found Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_show"}')
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=%s"}' % (json.dumps(result), action))
+
+        Configuration.read().remoteckan().session = MockSession()
+        dataset = Dataset.read_from_hdx('TEST1')
+        assert dataset.get_dirty_fields() == dict()
+        del posted[:]
+        dataset.update_in_hdx(patch=True)
+        assert posted == list()
+        dataset['tags'].append({'name': 'new tag'})
+        resources = dataset.get_resources()
+        resources[1]['description'] = 'Changed'
+        newresource = copy.deepcopy(dataset_resultdict['resources'][0])
+        del newresource['id']
+        del newresource['package_id']
+        newresource['name'] = 'Resource3'
+        dataset.add_update_resource(newresource)
+        assert list(dataset.get_dirty_fields().keys()) == ['tags']
+        assert resources[0].get_dirty_fields() == dict()
+        dataset.update_in_hdx(patch=True)
+        actions = [action for action, _ in posted]
+        assert actions == ['resource_patch', 'resource_create', 'package_patch']
+        assert posted[0][1] == {'id': '3d777226-96aa-4239-860a-703389d16d1f', 'description': 'Changed'}
+        assert posted[1][1]['name'] == 'Resource3'
+        assert sorted(posted[2][1].keys()) == ['id', 'tags']
+        assert posted[2][1]['tags'][-1] == {'name': 'new tag'}
+        assert dataset.get_dirty_fields() == dict()
+        assert 'resources' not in dataset.data
+
+    def test_skip_unchanged(self, configuration):
+        filetoupload = join('tests', 'fixtures', 'test_data.csv')
+        server = copy.deepcopy(dataset_resultdict)
+        serverresource = server['resources'][0]
+        serverresource['url'] = 'http://test-data.humdata.org/dataset/resource1/download/test_data.csv'
+        serverresource['url_type'] = 'upload'
+        serverresource['resource_type'] = 'file.upload'
+        serverresource['hash'] = get_file_hash(filetoupload)
+        server['resources'][1]['url_type'] = 'api'
+        server['resources'][1]['resource_type'] = 'api'
+        posted = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                if isinstance(data, dict):
+                    datadict = {k.decode('utf8'): v.decode('utf8') for k, v in data.items()}
+                else:
+                    datadict = json.loads(data.decode('utf-8'))
+                posted.append(url.split('/')[-1])
+                if 'hxl' in url:
+                    return mockhxlupdate(url, datadict)
+                if 'resource' in url:
+                    result = json.dumps(serverresource)
+                else:
+                    result = json.dumps(server)
+                return MockResponse(200, '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_show"}' % result)
+
+        Configuration.read().remoteckan().session = MockSession()
+
+        def local_dataset():
+            dataset = Dataset({key: copy.deepcopy(server[key]) for key in
+                               Configuration.read()['dataset']['required_fields']})
+            for serverresource in server['resources']:
+                resource = Resource({key: serverresource[key] for key in
+                                     ('name', 'description', 'format', 'url_type', 'resource_type')})
+                if resource['name'] == 'Resource1':
+                    resource.set_file_to_upload(filetoupload)
+                else:
+                    resource['url'] = serverresource['url']
+                dataset.add_update_resource(resource)
+            return dataset
+
+        dataset = local_dataset()
+        assert dataset.create_in_hdx(skip_unchanged=True) == {'dataset': True, 'files': ['Resource1']}
+        assert posted == ['package_show']
+        del posted[:]
+        dataset = local_dataset()
+        dataset['notes'] = 'New notes'
+        assert dataset.update_in_hdx(skip_unchanged=True) == {'dataset': False, 'files': ['Resource1']}
+        assert posted == ['package_show', 'package_update', 'package_hxl_update']
+        assert dataset.resources[0]['url'] == serverresource['url']
+        del posted[:]
+        dataset = local_dataset()
+        server['resources'][0]['hash'] = ''
+        assert dataset.create_in_hdx(skip_unchanged=True) == {'dataset': False, 'files': list()}
+        assert posted == ['package_show', 'package_update', 'resource_show', 'resource_update']
+
     def test_delete_from_hdx(self, configuration, post_delete):
         dataset = Dataset.read_from_hdx('TEST1')
         dataset.delete_from_hdx()
@@ -691,6 +899,141 @@ class TestDataset:
         with pytest.raises(HDXError):
             Dataset.search_in_hdx('ACLED')
 
+    def test_search_in_hdx_pages(self, configuration, search_pages):
+        dataset.page_size = 5
+        datasets = Dataset.search_in_hdx('ACLED')
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(23)]
+        assert sorted(search_pages.starts) == [0, 5, 10, 15, 20]
+        search_pages.starts[:] = list()
+        datasets = Dataset.search_in_hdx('ACLED', start=3, rows=11)
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(3, 14)]
+        assert sorted(search_pages.starts) == [3, 8, 13]
+        dataset.page_size = 1000
+
+    def test_search_in_hdx_keyset(self, configuration, search_keyset):
+        dataset.page_size = 5
+        catalogue = search_keyset.catalogue
+
+        def edit(call):
+            if call == 2:  # while scan is in progress, update, delete and create datasets
+                catalogue[2] = dict(catalogue[2], notes='updated', metadata_modified='2017-01-02T00:00:00.000000')
+                del catalogue[1]
+                catalogue.append({'id': 'id99', 'name': 'name99', 'notes': 'new',
+                                  'metadata_modified': '2017-01-02T00:00:01.000000'})
+
+        search_keyset.on_call = edit
+        datasets = Dataset.search_in_hdx('*:*', keyset=True)
+        ids = [x['id'] for x in datasets]
+        assert ids == ['id00'] + ['id%02d' % i for i in range(3, 13)] + ['id02', 'id99']
+        assert datasets[-2]['notes'] == 'updated'
+        assert search_keyset.calls[1]['fq'] == 'metadata_modified:[2017-01-01T00:00:04.000Z TO *]'
+        search_keyset.on_call = None
+        del search_keyset.calls[:]
+        for datasetdict in catalogue:
+            datasetdict['metadata_modified'] = '2017-01-03T00:00:00.000000'
+        datasets = Dataset.search_in_hdx('*:*', keyset=True, rows=7)
+        assert [x['id'] for x in datasets] == ['id00'] + ['id%02d' % i for i in range(2, 8)]
+        datasets = Dataset.search_in_hdx('*:*', keyset=True, fl=['name'])
+        assert sorted(datasets[0].keys()) == ['id', 'metadata_modified', 'name']
+        datasets = Dataset.get_all_datasets(keyset=True)
+        assert len(datasets) == 13
+        assert len(set(x['id'] for x in datasets)) == 13
+        dataset.page_size = 1000
+
+    def test_search_in_hdx_fields(self, configuration, search_pages):
+        dataset.page_size = 5
+        datasets = Dataset.search_in_hdx('ACLED', fl='name,metadata_modified')
+        assert len(datasets) == 23
+        assert search_pages.fls == [['name', 'metadata_modified', 'id']] * 5
+        assert sorted(datasets[0].keys()) == ['id', 'metadata_modified', 'name']
+        assert datasets[0].get_resources() == list()
+        datasets = list(Dataset.iter_search_in_hdx('ACLED', fl=['name']))
+        assert sorted(datasets[22].keys()) == ['id', 'name']
+        dataset.page_size = 1000
+
+    def test_get_changed_since(self, configuration, search_keyset):
+        dataset.page_size = 5
+        datasets = Dataset.get_changed_since('2017-01-01T00:00:08.000000')
+        assert [x['id'] for x in datasets] == ['id08', 'id09', 'id10', 'id11', 'id12']
+        assert search_keyset.calls[0]['fq'] == 'metadata_modified:[2017-01-01T00:00:08.000Z TO *]'
+        datasets = Dataset.get_changed_since(datetime.datetime(2017, 1, 1, 0, 0, 11), fq='name:name12')
+        assert [x['id'] for x in datasets] == ['id12']
+        assert search_keyset.calls[-1]['fq'] == '(name:name12) AND metadata_modified:[2017-01-01T00:00:11.000Z TO *]'
+        dataset.page_size = 1000
+
+    def test_sync_changes(self, configuration, search_keyset):
+        dataset.page_size = 5
+        catalogue = search_keyset.catalogue
+        tempdir = tempfile.mkdtemp()
+        watermark_path = join(tempdir, 'watermark.json')
+        changed, deleted = Dataset.sync_changes(watermark_path)
+        assert len(changed) == 13
+        assert deleted == list()
+        with open(watermark_path) as f:
+            assert json.load(f)['metadata_modified'] == '2017-01-01T00:00:12.000000'
+        catalogue[3] = dict(catalogue[3], name='renamed', metadata_modified='2017-01-02T00:00:00.000000')
+        del catalogue[5]
+        changed, deleted = Dataset.sync_changes(watermark_path)
+        assert [x['name'] for x in changed] == ['name12', 'renamed']
+        assert sorted(deleted) == ['name03', 'name05']
+        changed, deleted = Dataset.sync_changes(watermark_path)
+        assert [x['name'] for x in changed] == ['renamed']
+        assert deleted == list()
+        shutil.rmtree(tempdir)
+        dataset.page_size = 1000
+
+    def test_iter_search_in_hdx(self, configuration, search_pages):
+        dataset.page_size = 5
+        iterator = Dataset.iter_search_in_hdx('ACLED')
+        datasets = [next(iterator) for _ in range(7)]
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(7)]
+        assert iterator.position == 7
+        assert len(iterator.page) == 3
+        datasets = list(Dataset.iter_search_in_hdx('ACLED', position=iterator.position))
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(7, 23)]
+        assert search_pages.starts == [0, 5, 7, 12, 17, 22]
+        datasets = list(Dataset.iter_search_in_hdx('ACLED', position=9, start=3, rows=11))
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(9, 14)]
+        dataset.page_size = 1000
+
+    def test_iter_seen_page(self, configuration):
+        dataset.page_size = 5
+        catalogue = [{'id': 'id%d' % i} for i in range(12)]
+        starts = list()
+
+        def read_page(offset, rows):
+            starts.append(offset)
+            if offset == 5:  # five datasets already returned moved to after them
+                catalogue[5:5] = catalogue[:5]
+            return catalogue[offset:offset + rows]
+
+        datasets = list(DatasetIterator(read_page, 0, sys.maxsize))
+        assert [x['id'] for x in datasets] == ['id%d' % i for i in range(12)]
+        assert starts == [0, 5, 10, 15]
+        dataset.page_size = 1000
+
+    def test_asearch_in_hdx(self, configuration, search):
+        dataset.page_size = 1000
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            datasets = loop.run_until_complete(Dataset.asearch_in_hdx('ACLED'))
+            assert len(datasets) == 10
+            with pytest.raises(HDXError):
+                loop.run_until_complete(Dataset.asearch_in_hdx('"'))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def test_iter_all_datasets(self, configuration, all):
+        dataset.page_size = 1000
+        iterator = Dataset.iter_all_datasets()
+        datasets = list(iterator)
+        assert len(datasets) == 10
+        assert iterator.position == 10
+        datasets = list(Dataset.iter_all_datasets(limit=11))  # duplicate is skipped
+        assert len(datasets) == 10
+
     def test_get_all_dataset_names(self, configuration, post_list):
         dataset_names = Dataset.get_all_dataset_names()
         assert dataset_names == dataset_list
@@ -705,6 +1048,25 @@ class TestDataset:
         # with pytest.raises(HDXError):
         #     Dataset.get_all_datasets()
 
+    def test_get_all_datasets_full_pages(self, configuration):
+        offsets = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                offsets.append(datadict['offset'])
+                result = alldict if datadict['offset'] == 0 else list()
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=current_package_list_with_resources"}' % json.dumps(result))
+
+        Configuration.read().remoteckan().session = MockSession()
+        dataset.page_size = len(alldict)
+        datasets = Dataset.get_all_datasets()
+        assert len(datasets) == len(alldict)
+        assert offsets == [0, len(alldict)]
+        dataset.page_size = 1000
+
     def test_get_all_resources(self, configuration, search):
         datasets = Dataset.search_in_hdx('ACLED')
         resources = Dataset.get_all_resources(datasets)
@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+"""Mirror Tests"""
+import copy
+import json
+import re
+import shutil
+import tempfile
+from os.path import join
+
+import pytest
+from hdx.utilities.loader import load_yaml
+
+from hdx.data import dataset
+from hdx.data.dataset import Dataset
+from hdx.data.mirror import Mirror
+from hdx.data.organization import Organization
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+from hdx.hdx_locations import Locations
+from . import MockResponse
+
+searchdict = load_yaml(join('tests', 'fixtures', 'dataset_search_results.yml'))
+locations = [{'name': 'eri', 'title': 'Eritrea'}, {'name': 'gin', 'title': 'Guinea'}]
+
+
+class TestMirror:
+    @pytest.fixture(scope='function')
+    def post_search(self):
+        class MockSession(object):
+            datasets = copy.deepcopy(searchdict['results'])
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'group_list' in url:
+                    result = locations
+                elif 'package_list' in url:
+                    result = [x['name'] for x in MockSession.datasets]
+                else:
+                    results = sorted(MockSession.datasets, key=lambda x: x['metadata_modified'])
+                    fq = datadict.get('fq')
+                    if fq:  # only metadata_modified ranges
+                        since = max(re.findall(r'metadata_modified:\[(.*?)Z TO \*\]', fq))
+                        results = [x for x in results if x['metadata_modified'][:23] >= since]
+                    start = datadict.get('start', 0)
+                    result = {'count': len(results), 'results': results[start:start + datadict['rows']]}
+                return MockResponse(200, '{"success": true, "result": %s}' % json.dumps(result))
+
+        Configuration.read().remoteckan().session = MockSession()
+        dataset.page_size = 3
+        yield MockSession
+        dataset.page_size = 1000
+        Locations.set_validlocations(None)
+
+    def test_add_and_get(self, configuration):
+        mirror = Mirror()
+        mirror.add_datasets(searchdict['results'][:5])
+        assert mirror.count_datasets() == 5
+        datasets = mirror.get_datasets()
+        assert isinstance(datasets[0], Dataset)
+        assert [x['name'] for x in datasets] == ['acled-conflict-data-for-guinea', 'acled-conflict-data-for-kenya',
+                                                 'acled-conflict-data-for-lesotho', 'acled-conflict-data-for-liberia',
+                                                 'acled-conflict-data-for-libya']
+        datasetobject = mirror.get_dataset('acled-conflict-data-for-guinea')
+        assert datasetobject['id'] == '87a5dbbc-db76-4a0f-a20f-5210a20a3bc9'
+        assert len(datasetobject.get_resources()) == 1
+        assert mirror.get_dataset('NOTEXIST') is None
+        assert mirror.count_datasets(location='gin') == 1
+        assert mirror.count_datasets(tag='conflict') == 5
+        assert mirror.count_datasets(tag='conflict', location='ken') == 1
+        assert mirror.count_datasets(organization='acled') == 5
+        assert mirror.count_datasets(organization='b67e6c74-c185-4f43-b561-0e114a736f19') == 5
+        assert mirror.count_datasets(modified_since='2016-03-29T17:33:20.000000') == 3
+        resources = mirror.get_resources(format='xlsx', location='gin')
+        assert len(resources) == 1
+        assert isinstance(resources[0], Resource)
+        assert resources[0]['format'] == 'XLSX'
+        assert mirror.get_resources(format='csv') == list()
+        organization = mirror.get_organization('acled')
+        assert isinstance(organization, Organization)
+        assert organization['id'] == 'b67e6c74-c185-4f43-b561-0e114a736f19'
+        mirror.add_datasets([Dataset(datasetobject.data)])  # replace with no resources
+        assert mirror.count_datasets() == 5
+        assert mirror.get_resources() == list()
+        mirror.remove_datasets(['acled-conflict-data-for-guinea', '8fc7bcd9-5daa-44a8-b219-e707af2cd4a8'])
+        assert mirror.count_datasets() == 3
+        assert mirror.get_dataset('acled-conflict-data-for-kenya') is None
+        mirror.close()
+
+    def test_update_from_hdx(self, configuration, post_search):
+        tempdir = tempfile.mkdtemp()
+        mirror = Mirror(join(tempdir, 'mirror.db'))
+        mirror.add_datasets([{'id': 'OLD', 'name': 'old'}])
+        mirror.update_from_hdx()
+        assert mirror.count_datasets() == 10
+        assert mirror.get_dataset('old') is None
+        assert len(mirror.get_resources(format='XLSX', location='eri')) == 2
+        assert mirror.get_locations() == locations
+        mirror.close()
+        mirror = Mirror(join(tempdir, 'mirror.db'))
+        assert mirror.count_datasets() == 10
+        watermark_path = join(tempdir, 'watermark.json')
+        mirror.update_from_hdx(watermark_path)
+        assert mirror.count_datasets() == 10
+        post_search.datasets[0] = dict(post_search.datasets[0], title='Updated',
+                                       metadata_modified='2017-01-01T00:00:00.000000')
+        del post_search.datasets[1]
+        mirror.update_from_hdx(watermark_path)
+        assert mirror.count_datasets() == 9
+        assert mirror.get_dataset('acled-conflict-data-for-libya')['title'] == 'Updated'
+        assert mirror.get_dataset('acled-conflict-data-for-liberia') is None
+        mirror.close()
+        shutil.rmtree(tempdir)
+
+    def test_update_from_hdx_unlocked(self, configuration, post_search):
+        mirror = Mirror()
+        mirror.add_datasets([{'id': 'OLD', 'name': 'old'}])
+        post = post_search.post
+        locked = list()
+
+        def post_unlocked(*args, **kwargs):
+            locked.append(mirror._lock.locked())
+            return post(*args, **kwargs)
+
+        post_search.post = staticmethod(post_unlocked)
+        Locations.set_validlocations([{'name': 'zmb', 'title': 'Zambia'}])
+        mirror.update_from_hdx()
+        assert len(locked) == 5
+        assert not any(locked)
+        assert mirror.count_datasets() == 10
+        assert mirror.get_dataset('old') is None
+        assert mirror.get_locations() == locations
+        assert Locations.validlocations() == [{'name': 'zmb', 'title': 'Zambia'}]
+        mirror.close()
@@ -9,7 +9,9 @@ import pytest
 from hdx.data.hdxobject import HDXError
 from hdx.data.organization import Organization
 from hdx.data.user import User
+from hdx.hdx_cache import MemoryCache
 from hdx.hdx_configuration import Configuration
+from hdx.hdx_identitymap import IdentityMap
 from hdx.utilities.dictandlist import merge_two_dictionaries
 from hdx.utilities.loader import load_yaml
 from . import MockResponse, organization_data, user_data
@@ -254,6 +256,34 @@ class TestOrganization:
         assert organization['id'] == 'b67e6c74-c185-4f43-b561-0e114a736f19'
         assert organization['name'] == 'MyOrganization1'
 
+    def test_patch_in_hdx(self, configuration):
+        posted = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                posted.append((url.split('/')[-1], datadict))
+                if 'patch' in url:
+                    result = copy.deepcopy(resultdict)
+                    result.update(datadict)
+                    return MockResponse(200,
+                                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=organization_patch"}' % json.dumps(result))
+                return organization_mockshow(url, datadict)
+
+        Configuration.read().remoteckan().session = MockSession()
+        organization = Organization.read_from_hdx('TEST1')
+        del posted[:]
+        organization.update_in_hdx(patch=True)
+        assert posted == list()
+        organization['description'] = 'New description'
+        organization['users'][0]['capacity'] = 'member'
+        organization.update_in_hdx(patch=True)
+        assert [action for action, _ in posted] == ['organization_patch']
+        assert sorted(posted[0][1].keys()) == ['description', 'id', 'users']
+        assert posted[0][1]['description'] == 'New description'
+        assert organization.get_dirty_fields() == dict()
+
     def test_delete_from_hdx(self, configuration, post_delete):
         organization = Organization.read_from_hdx('b67e6c74-c185-4f43-b561-0e114a736f19')
         organization.delete_from_hdx()
@@ -337,8 +367,148 @@ class TestOrganization:
         with pytest.raises(HDXError):
             organization.remove_user(123)
 
+    def test_users_read_once(self, configuration):
+        class MockSession(object):
+            ids = list()
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                MockSession.ids.append(datadict['id'])
+                return user_mockshow(url, datadict)
+
+        Configuration.read().remoteckan().session = MockSession()
+        organization = Organization({'name': 'MyOrg', 'users': [
+            {'id': '9f3e9973-7dbe-4c65-8820-f48578e3ffea', 'name': 'MyUser1', 'capacity': 'admin'},
+            {'name': 'MyUser1', 'capacity': 'editor'},
+            {'id': '9f3e9973-7dbe-4c65-8820-f48578e3ffea', 'capacity': 'member'},
+            {'name': 'TEST2', 'capacity': 'member'}]})
+        users = organization.get_users()
+        assert sorted(MockSession.ids) == ['9f3e9973-7dbe-4c65-8820-f48578e3ffea', 'MyUser1', 'TEST2']
+        assert [user['capacity'] for user in users] == ['admin', 'editor', 'member']
+        assert users[0] is not users[2]
+        assert users[2]['name'] == 'MyUser1'
+        users = organization.get_users('member')
+        assert len(users) == 1
+        del MockSession.ids[:]
+        users = organization.get_users(full=False)
+        assert MockSession.ids == list()
+        assert [user.data.get('name') for user in users] == ['MyUser1', 'MyUser1', None, 'TEST2']
+        assert isinstance(users[0], User)
+        users[0]['capacity'] = 'member'
+        assert organization['users'][0]['capacity'] == 'admin'
+
+    def test_users_identity_map(self, hdx_key_file, project_config_yaml):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                return user_mockshow(url, json.loads(data.decode('utf-8')))
+
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              identity_map=IdentityMap())
+        Configuration.read().remoteckan().session = MockSession()
+        identitymap = Configuration.read().identity_map()
+        with identitymap.scope():
+            organization_a = Organization({'name': 'OrgA', 'users': [
+                {'id': '9f3e9973-7dbe-4c65-8820-f48578e3ffea', 'capacity': 'admin'}]})
+            organization_b = Organization({'name': 'OrgB', 'users': [
+                {'id': '9f3e9973-7dbe-4c65-8820-f48578e3ffea', 'capacity': 'member'}]})
+            users_a = organization_a.get_users()
+            users_b = organization_b.get_users()
+            assert users_a[0]['capacity'] == 'admin'
+            assert users_b[0]['capacity'] == 'member'
+            assert users_a[0] is not users_b[0]
+            shared = identitymap.get('User', '9f3e9973-7dbe-4c65-8820-f48578e3ffea')
+            assert shared is not None
+            assert 'capacity' not in shared.data
+
     def test_get_datasets(self, configuration, datasets_get):
         org_data = copy.deepcopy(resultdict)
         organization = Organization(org_data)
         datasets = organization.get_datasets()
         assert len(datasets) == 10
+
+    def test_cache(self, hdx_key_file, project_config_yaml):
+        calls = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                calls.append(url.split('/')[-1])
+                if 'update' in url:
+                    resultdictcopy = copy.deepcopy(resultdict)
+                    merge_two_dictionaries(resultdictcopy, datadict)
+                    return MockResponse(200,
+                                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=organization_update"}' % json.dumps(resultdictcopy))
+                return organization_mockshow(url, datadict)
+
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              cache=MemoryCache())
+        Configuration.read().remoteckan().session = MockSession()
+        organization = Organization.read_from_hdx('TEST1')
+        organization['description'] = 'Changed locally'
+        organization = Organization.read_from_hdx('TEST1')
+        assert organization['description'] == resultdict['description']
+        assert Organization.read_from_hdx('TEST2') is None
+        assert Organization.read_from_hdx('TEST2') is None
+        assert calls == ['organization_show', 'organization_show', 'organization_show']
+        organization['description'] = 'Humanitarian work'
+        organization.update_in_hdx()
+        assert calls[-1] == 'organization_update'
+        del calls[:]
+        organization = Organization.read_from_hdx('TEST1')
+        assert calls == ['organization_show']
+
+    def test_identity_map(self, hdx_key_file, project_config_yaml):
+        calls = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                calls.append(url.split('/')[-1])
+                if 'delete' in url:
+                    return MockResponse(200,
+                                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=organization_delete"}' % json.dumps(resultdict))
+                return organization_mockshow(url, datadict)
+
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              identity_map=IdentityMap())
+        Configuration.read().remoteckan().session = MockSession()
+        identitymap = Configuration.read().identity_map()
+        with identitymap.scope():
+            organization = Organization.read_from_hdx('TEST1')
+            organization['description'] = 'Changed locally'
+            assert Organization.read_from_hdx('TEST1') is organization
+            assert Organization.read_from_hdx('acled') is organization
+            assert Organization.read_from_hdx('b67e6c74-c185-4f43-b561-0e114a736f19') is organization
+            assert Organization.read_from_hdx('TEST2') is None
+            assert calls == ['organization_show', 'organization_show']
+            organization.delete_from_hdx()
+            assert identitymap.get('Organization', 'acled') is None
+        del calls[:]
+        organization = Organization.read_from_hdx('TEST1')
+        assert organization['description'] == resultdict['description']
+        assert calls == ['organization_show']
+
+    def test_delete_identity_map(self, hdx_key_file, project_config_yaml):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'delete' in url:
+                    return MockResponse(200,
+                                        '{"success": true, "result": null, "help": "http://test-data.humdata.org/api/3/action/help_show?name=organization_delete"}')
+                return organization_mockshow(url, datadict)
+
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              identity_map=IdentityMap())
+        Configuration.read().remoteckan().session = MockSession()
+        identitymap = Configuration.read().identity_map()
+        with identitymap.scope():
+            organization = Organization.read_from_hdx('TEST1')
+            assert identitymap.get('Organization', 'acled') is organization
+            organization.delete_from_hdx()
+            assert identitymap.get('Organization', 'acled') is None
+            assert identitymap.get('Organization', 'b67e6c74-c185-4f43-b561-0e114a736f19') is None
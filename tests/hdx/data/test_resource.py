@@ -4,7 +4,7 @@ import copy
 import json
 import os
 from os import unlink
-from os.path import join
+from os.path import join, exists
 
 import pytest
 from hdx.utilities.dictandlist import merge_two_dictionaries
@@ -12,7 +12,9 @@ from hdx.utilities.downloader import DownloadError
 
 from hdx.data.hdxobject import HDXError
 from hdx.data.resource import Resource
+from hdx.hdx_changes import get_file_hash
 from hdx.hdx_configuration import Configuration
+from hdx.hdx_datastore import Checkpoint
 from . import MockResponse
 from .test_dataset import dataset_resultdict
 
@@ -187,6 +189,18 @@ class TestResource:
 
         Configuration.read().remoteckan().session = MockSession()
 
+    @pytest.fixture(scope='function')
+    def read_many(self):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if datadict['id'] == 'ERROR':
+                    raise ValueError('Connection failed!')
+                return mockshow(url, datadict)
+
+        Configuration.read().remoteckan().session = MockSession()
+
     @pytest.fixture(scope='function')
     def post_create(self):
         class MockSession(object):
@@ -363,6 +377,22 @@ class TestResource:
         resource = Resource.read_from_hdx('TEST3')
         assert resource is None
 
+    def test_read_many_from_hdx(self, configuration, read_many):
+        identifiers = ['TEST1', 'TEST2', 'ERROR', 'TEST5', 'TEST1']
+        resources, errors = Resource.read_many_from_hdx(identifiers, max_workers=3)
+        assert len(resources) == 5
+        assert resources[0]['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
+        assert resources[1] is None
+        assert resources[2] is None
+        assert resources[3]['id'] == 'datastore_unknown_resource'
+        assert resources[4]['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
+        assert resources[0] is not resources[4]
+        assert list(errors.keys()) == ['ERROR']
+        assert isinstance(errors['ERROR'], HDXError)
+        resources, errors = Resource.read_many_from_hdx(list())
+        assert resources == list()
+        assert errors == dict()
+
     def test_create_in_hdx(self, configuration, post_create):
         resource = Resource()
         with pytest.raises(HDXError):
@@ -480,6 +510,44 @@ class TestResource:
         assert resource['name'] == 'MyResource1'
         assert resource.get_file_type() == 'zipped csv'
 
+    def test_patch_in_hdx(self, configuration):
+        posted = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                posted.append((url, datadict))
+                if 'show' in url:
+                    return mockshow(url, datadict)
+                return mockpatch(url, datadict)
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource.read_from_hdx('TEST1')
+        assert resource.get_dirty_fields() == dict()
+        del posted[:]
+        resource.update_in_hdx(patch=True)
+        assert posted == list()
+        resource['description'] = 'My New Resource'
+        resource['extra'] = 'something'
+        assert resource.get_dirty_fields() == {'description': 'My New Resource', 'extra': 'something'}
+        resource.update_in_hdx(patch=True)
+        assert len(posted) == 1
+        url, datadict = posted[0]
+        assert 'resource_patch' in url
+        assert datadict == {'id': 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5', 'description': 'My New Resource',
+                            'extra': 'something'}
+        assert resource.get_dirty_fields() == dict()
+        resource = Resource({'id': 'TEST1', 'description': 'Unread'})
+        assert resource.get_dirty_fields() == {'id': 'TEST1', 'description': 'Unread'}
+        del posted[:]
+        resource.update_in_hdx(patch=True)
+        assert len(posted) == 1
+        assert 'resource_patch' in posted[0][0]
+        del resource['id']
+        with pytest.raises(HDXError):
+            resource.update_in_hdx(patch=True)
+
     def test_touch(self, configuration, post_patch):
         resource = Resource()
         resource['id'] = 'TEST1'
@@ -512,6 +580,187 @@ class TestResource:
         with pytest.raises(DownloadError):
             resource2.download()
 
+    def test_datastore_chunks(self, configuration):
+        upserts = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'datastore_upsert' in url:
+                    records = datadict['records']
+                    if TestResource.datastore == 'fail':
+                        return MockResponse(500, '{"success": false, "error": {"message": "Internal Server Error", "__type": "Internal Server Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_upsert"}')
+                    if len(records) > 2:
+                        return MockResponse(413, '{"success": false, "error": {"message": "Request Entity Too Large", "__type": "Request Entity Too Large"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_upsert"}')
+                    upserts.append([record.get('EVENT_ID_CNTY') for record in records])
+                return MockResponse(200, '{"success": true, "result": {}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource(copy.deepcopy(resultdict))
+        filefordatastore = join('tests', 'fixtures', 'test_data.csv')
+        TestResource.datastore = None
+        resource.create_datastore(path=filefordatastore, chunk_bytes=100000)
+        assert upserts == [['1416RTA', '2229RTA'], ['2230RTA'], ['2231RTA', None]]
+        del upserts[:]
+        resource.create_datastore(path=filefordatastore, primary_key='EVENT_ID_CNTY', workers=3)
+        assert sorted(sum(upserts, list()), key=str) == ['1416RTA', '2229RTA', '2230RTA', '2231RTA', None]
+        TestResource.datastore = 'fail'
+        with pytest.raises(HDXError) as excinfo:
+            resource.create_datastore(path=filefordatastore)
+        assert 'rows 1 to 5' in str(excinfo.value.__cause__)
+
+    def test_datastore_resume(self, configuration, tmpdir):
+        actions = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                action = url.split('/')[-1]
+                if 'datastore_upsert' in url:
+                    records = datadict['records']
+                    if TestResource.datastore == 'fail' and records[0].get('EVENT_ID_CNTY') in ('1416RTA', '2230RTA'):
+                        return MockResponse(500, '{"success": false, "error": {"message": "Internal Server Error", "__type": "Internal Server Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_upsert"}')
+                    action = [record.get('EVENT_ID_CNTY') for record in records]
+                actions.append(action)
+                return MockResponse(200, '{"success": true, "result": {}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource(copy.deepcopy(resultdict))
+        filefordatastore = join('tests', 'fixtures', 'test_data.csv')
+        checkpoint = join(str(tmpdir), 'checkpoint.json')
+        TestResource.datastore = 'fail'
+        with pytest.raises(HDXError):
+            resource.create_datastore(path=filefordatastore, delete_first=1, checkpoint=checkpoint, resume=True)
+        assert actions == ['datastore_delete', 'datastore_create']
+        assert not exists(checkpoint)
+        del actions[:]
+        Checkpoint(checkpoint).save(resource['id'], get_file_hash(filefordatastore), 2)
+        with pytest.raises(HDXError):
+            resource.create_datastore(path=filefordatastore, delete_first=1, checkpoint=checkpoint, resume=True)
+        assert actions == []
+        assert exists(checkpoint)
+        del actions[:]
+        TestResource.datastore = None
+        resource.create_datastore(path=filefordatastore, delete_first=1, checkpoint=checkpoint, resume=True)
+        assert actions == [['2230RTA', '2231RTA', None]]
+        assert not exists(checkpoint)
+        del actions[:]
+        resource.create_datastore(path=filefordatastore, checkpoint=checkpoint, resume=True)
+        assert actions == ['datastore_create', ['1416RTA', '2229RTA', '2230RTA', '2231RTA', None]]
+
+    def test_datastore_resume_split(self, configuration, tmpdir):
+        upserts = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'datastore_upsert' in url:
+                    records = datadict['records']
+                    if len(records) > 2:
+                        return MockResponse(413, '{"success": false, "error": {"message": "Request Entity Too Large", "__type": "Request Entity Too Large"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_upsert"}')
+                    if TestResource.datastore == 'fail' and records[0].get('EVENT_ID_CNTY') == '2230RTA':
+                        return MockResponse(500, '{"success": false, "error": {"message": "Internal Server Error", "__type": "Internal Server Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_upsert"}')
+                    upserts.append([record.get('EVENT_ID_CNTY') for record in records])
+                return MockResponse(200, '{"success": true, "result": {}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource(copy.deepcopy(resultdict))
+        filefordatastore = join('tests', 'fixtures', 'test_data.csv')
+        checkpoint = join(str(tmpdir), 'checkpoint.json')
+        TestResource.datastore = 'fail'
+        with pytest.raises(HDXError):
+            resource.create_datastore(path=filefordatastore, checkpoint=checkpoint, resume=True)
+        assert upserts == [['1416RTA', '2229RTA']]
+        assert Checkpoint(checkpoint).load(resource['id'], get_file_hash(filefordatastore)) == 2
+        del upserts[:]
+        TestResource.datastore = None
+        resource.create_datastore(path=filefordatastore, checkpoint=checkpoint, resume=True)
+        assert upserts == [['2230RTA'], ['2231RTA', None]]
+
+    def test_datastore_index(self, configuration, tmpdir):
+        actions = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'datastore_upsert' in url:
+                    actions.append(('upsert', [record.get('EVENT_ID_CNTY') for record in datadict['records']]))
+                elif 'datastore_delete' in url:
+                    actions.append(('delete', datadict.get('filters')))
+                return MockResponse(200, '{"success": true, "result": {}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource(copy.deepcopy(resultdict))
+        filefordatastore = join('tests', 'fixtures', 'test_data.csv')
+        index = join(str(tmpdir), 'index.json')
+        with pytest.raises(HDXError):
+            resource.create_datastore(path=filefordatastore, index=index)
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=filefordatastore, index=index)
+        assert actions == [('upsert', ['1416RTA', '2229RTA', '2230RTA', '2231RTA', None])]
+        del actions[:]
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=filefordatastore, index=index, workers=2)
+        assert actions == []
+        with open(filefordatastore) as f:
+            lines = f.readlines()
+        lines[2] = lines[2].replace(',2001,', ',2002,')
+        lines.insert(5, lines[4].replace('2231RTA', '9999RTA'))
+        del lines[1]
+        changedfile = join(str(tmpdir), 'test_data.csv')
+        with open(changedfile, 'w') as f:
+            f.writelines(lines)
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=changedfile, index=index)
+        assert actions == [('upsert', ['2229RTA', '9999RTA']), ('delete', {'EVENT_ID_CNTY': ['1416RTA']})]
+        del actions[:]
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=changedfile, index=index)
+        assert actions == []
+        resource.create_datastore(primary_key='EVENT_ID_CNTY', delete_first=1, path=changedfile, index=index)
+        assert actions == [('delete', None), ('upsert', ['2229RTA', '2230RTA', '2231RTA', '9999RTA', None])]
+        del actions[:]
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=changedfile, index=index, infer_types=True)
+        assert actions == [('upsert', ['2229RTA', '2230RTA', '2231RTA', '9999RTA', None])]
+        del actions[:]
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=changedfile, index=index, infer_types=True)
+        assert actions == []
+        resource.update_datastore(primary_key='EVENT_ID_CNTY', path=changedfile, index=index)
+        assert actions == [('upsert', ['2229RTA', '2230RTA', '2231RTA', '9999RTA', None])]
+
+    def test_datastore_infer(self, configuration):
+        posts = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                posts.append((url.split('/')[-1], json.loads(data.decode('utf-8'))))
+                return MockResponse(200, '{"success": true, "result": {}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+
+        Configuration.read().remoteckan().session = MockSession()
+        resource = Resource(copy.deepcopy(resultdict))
+        filefordatastore = join('tests', 'fixtures', 'test_data.csv')
+        resource.create_datastore(path=filefordatastore, infer_types=True)
+        action, data = posts[0]
+        assert action == 'datastore_create'
+        types = {field['id']: field['type'] for field in data['fields']}
+        assert types['GWNO'] == 'int'
+        assert types['LATITUDE'] == 'numeric'
+        assert types['EVENT_ID_CNTY'] == 'text'
+        action, data = posts[1]
+        assert action == 'datastore_upsert'
+        record = data['records'][0]
+        assert record['GWNO'] == 615
+        assert record['LATITUDE'] == '36.61954'
+        assert record['EVENT_ID_NO_CNTY'] == ''
+        assert record['ADMIN3'] == ''
+        assert data['records'][2]['ACTOR2'] == ''
+        assert data['records'][2]['INTER2'] == 0
+        del posts[:]
+        resource.create_datastore(path=filefordatastore)
+        assert all(field['type'] == 'text' for field in posts[0][1]['fields'])
+        assert posts[1][1]['records'][0]['GWNO'] == '615'
+
     def test_datastore(self, configuration, post_datastore, topline_yaml, topline_json):
         resource = Resource.read_from_hdx('TEST1')
         resource2 = Resource.read_from_hdx('TEST5')
@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+"""Response Cache Tests"""
+from os.path import join
+
+import pytest
+
+from hdx.hdx_cache import ResponseCache, MemoryCache, DiskCache
+
+
+class TestResponseCache:
+    @pytest.fixture(params=['memory', 'disk'])
+    def cache(self, request, tmpdir):
+        if request.param == 'memory':
+            return lambda **kwargs: MemoryCache(**kwargs)
+        return lambda **kwargs: DiskCache(join(str(tmpdir), 'cache.sqlite'), **kwargs)
+
+    def test_make_key(self):
+        key = ResponseCache.make_key('https://data.humdata.org', 'package_show', {'id': 'x', 'a': 1}, 'KEY')
+        assert key == ResponseCache.make_key('https://data.humdata.org', 'package_show', {'a': 1, 'id': 'x'}, 'KEY')
+        assert key != ResponseCache.make_key('https://data.humdata.org', 'package_show', {'id': 'x', 'a': 1})
+        assert key != ResponseCache.make_key('https://test-data.humdata.org', 'package_show', {'id': 'x', 'a': 1},
+                                             'KEY')
+        assert key != ResponseCache.make_key('https://data.humdata.org', 'organization_show', {'id': 'x', 'a': 1},
+                                             'KEY')
+        cache = MemoryCache(actions=['group_list'])
+        assert cache.is_cacheable('group_list') is True
+        assert cache.is_cacheable('package_show') is False
+        assert MemoryCache().is_cacheable('package_show') is True
+        assert MemoryCache().is_cacheable('package_show', [('upload', 'x')]) is False
+        with pytest.raises(ValueError):
+            MemoryCache(max_size=0)
+
+    def test_get_set(self, cache):
+        cache = cache()
+        assert cache.get('a') is None
+        value = {'id': '1', 'name': 'a', 'tags': [{'name': 'x'}]}
+        cache.set('a', value)
+        value['tags'].append({'name': 'y'})
+        result = cache.get('a')
+        assert result == {'id': '1', 'name': 'a', 'tags': [{'name': 'x'}]}
+        result['name'] = 'b'
+        assert cache.get('a')['name'] == 'a'
+        cache.set('list', ['x', 'y'])
+        assert cache.get('list') == ['x', 'y']
+        assert len(cache) == 2
+        cache.clear()
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_lru(self, cache):
+        cache = cache(max_size=2)
+        cache.set('a', {'id': '1'})
+        cache.set('b', {'id': '2'})
+        assert cache.get('a') == {'id': '1'}
+        cache.set('c', {'id': '3'})
+        assert cache.get('b') is None
+        assert cache.get('a') == {'id': '1'}
+        assert cache.get('c') == {'id': '3'}
+        assert len(cache) == 2
+
+    def test_ttl(self, cache):
+        cache = cache(ttl=-1)
+        cache.set('a', {'id': '1'})
+        assert cache.get('a') is None
+
+    def test_invalidate(self, cache):
+        cache = cache()
+        cache.set('byid', {'id': '1', 'name': 'a'})
+        cache.set('byname', {'id': '1', 'name': 'a'})
+        cache.set('other', {'id': '2', 'name': 'b'})
+        cache.invalidate('1')
+        assert cache.get('byid') is None
+        assert cache.get('byname') is None
+        assert cache.get('other') == {'id': '2', 'name': 'b'}
+
+    def test_disk_persists(self, tmpdir):
+        path = join(str(tmpdir), 'cache.sqlite')
+        cache = DiskCache(path)
+        cache.set('a', {'id': '1'})
+        cache.close()
+        assert DiskCache(path).get('a') == {'id': '1'}
@@ -0,0 +1,18 @@
+# -*- coding: UTF-8 -*-
+"""Change Detection Tests"""
+from hdx.hdx_changes import project, get_metadata_hash, is_unchanged
+
+
+class TestChanges:
+    def test_project(self):
+        remote = {'name': 'a', 'tags': [{'name': 'x', 'id': '1'}, {'name': 'y', 'id': '2'}], 'extra': 1}
+        assert project(remote, {'tags': [{'name': 'x'}, {'name': 'y'}]}) == {'tags': [{'name': 'x'}, {'name': 'y'}]}
+        assert project(remote, {'tags': [{'name': 'x'}]}) == {'tags': remote['tags']}
+        assert project(remote, {'missing': None}) == {'missing': None}
+
+    def test_is_unchanged(self):
+        assert get_metadata_hash({'a': 1, 'b': 2}) == get_metadata_hash({'b': 2, 'a': 1})
+        remote = {'name': 'a', 'notes': 'Notes', 'tags': [{'name': 'x', 'id': '1'}]}
+        assert is_unchanged({'name': 'a', 'tags': [{'name': 'x'}]}, remote) is True
+        assert is_unchanged({'name': 'a', 'notes': 'New'}, remote) is False
+        assert is_unchanged({'name': 'a', 'tags': [{'name': 'x'}, {'name': 'z'}]}, remote) is False
@@ -1,11 +1,17 @@
 # -*'coding: UTF-8 -*-
 """Configuration Tests"""
+import asyncio
 from os.path import join
 
 import ckanapi
 import pytest
+import requests
 
+from hdx.hdx_cache import MemoryCache
 from hdx.hdx_configuration import Configuration, ConfigurationError
+from hdx.hdx_ratelimiter import RateLimiter
+from hdx.hdx_remoteckan import HDXRemoteCKAN
+from hdx.hdx_retry import RetryPolicy
 from hdx.utilities.loader import LoadError
 
 
@@ -518,3 +524,224 @@ hello there'''
         Configuration.delete()
         with pytest.raises(ConfigurationError):
             Configuration.read().remoteckan()
+
+    def test_run_async(self, project_config_yaml):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={}, max_workers=2,
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.max_workers == 2
+        executor = configuration.executor()
+        assert executor is configuration.executor()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            futures = [configuration.run_async(pow, 2, i) for i in range(5)]
+            assert loop.run_until_complete(asyncio.gather(*futures)) == [1, 2, 4, 8, 16]
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        configuration.shutdown_executor()
+        assert configuration.executor() is not executor
+        configuration.shutdown_executor()
+
+    def test_run_concurrently(self, project_config_yaml):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+
+        def invert(value):
+            return 1.0 / value
+
+        results = configuration.run_concurrently(invert, [1, 2, 0, 4], max_workers=2)
+        assert results[0] == (1.0, None)
+        assert results[1] == (0.5, None)
+        assert results[2][0] is None
+        assert isinstance(results[2][1], ZeroDivisionError)
+        assert results[3] == (0.25, None)
+        assert configuration.run_concurrently(invert, list()) == list()
+        with pytest.raises(ConfigurationError):
+            configuration.run_concurrently(invert, [1], max_workers=0)
+
+    def test_create_session(self, project_config_yaml):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        session = configuration.create_session()
+        adapter = session.get_adapter('https://data.humdata.org/')
+        assert adapter._pool_connections == 10
+        assert adapter._pool_maxsize == 10
+        assert adapter.timeout is None
+        assert session.headers['Connection'] == 'keep-alive'
+        remoteckan = configuration.create_remoteckan()
+        assert remoteckan.session is not configuration.create_remoteckan().session
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={}, max_workers=50, pool_connections=2,
+                              connect_timeout=3.05, read_timeout=27, keep_alive=False,
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        session = configuration.remoteckan().session
+        for url in ('https://data.humdata.org/', 'http://data.humdata.org/'):
+            adapter = session.get_adapter(url)
+            assert adapter._pool_connections == 2
+            assert adapter._pool_maxsize == 50
+            assert adapter.timeout == (3.05, 27)
+            assert adapter.max_retries.total == 5
+            assert adapter.max_retries.read == 0
+            assert not adapter.max_retries.status_forcelist
+        assert session.headers['Connection'] == 'close'
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={}, pool_maxsize=20, read_timeout=60,
+                              project_config_yaml=project_config_yaml)
+        adapter = Configuration.read().remoteckan().session.get_adapter('https://data.humdata.org/')
+        assert adapter._pool_maxsize == 20
+        assert adapter.timeout == (None, 60)
+
+    def test_ratelimiter(self, project_config_yaml):
+        class MockResponse(object):
+            def __init__(self, status_code, text):
+                self.status_code = status_code
+                self.text = text
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth=None):
+                if 'package_search' in url:
+                    return MockResponse(429, 'Too Many Requests')
+                return MockResponse(200, '{"success": true, "result": {"name": "x"}}')
+
+        ratelimiter = RateLimiter(max_concurrency=8, actions={'package_search': {'max_concurrency': 4}})
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={}, ratelimiter=ratelimiter, retry_policy=RetryPolicy(max_attempts=1),
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.ratelimiter() is ratelimiter
+        remoteckan = configuration.remoteckan()
+        assert isinstance(remoteckan, HDXRemoteCKAN)
+        remoteckan.session = MockSession()
+        assert configuration.call_remoteckan('package_show', {'id': 'x'}) == {'name': 'x'}
+        assert remoteckan.last_response() == (200, dict())
+        with pytest.raises(ckanapi.CKANAPIError):
+            configuration.call_remoteckan('package_search', {'q': 'x'})
+        assert remoteckan.last_response()[0] == 429
+        assert ratelimiter.get_limiter('package_search').concurrency.limit == 2
+        assert ratelimiter.default.concurrency.limit == 8
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={}, max_workers=3,
+                              project_config_yaml=project_config_yaml)
+        assert Configuration.read().ratelimiter().default.concurrency.max_limit == 3
+
+    def test_retry_policy(self, project_config_yaml):
+        class MockResponse(object):
+            def __init__(self, status_code, text, headers=None):
+                self.status_code = status_code
+                self.text = text
+                self.headers = headers or dict()
+
+        class MockSession(object):
+            calls = list()
+
+            def post(self, url, data, headers, files, allow_redirects, auth=None):
+                action = url.split('/')[-1]
+                self.calls.append(action)
+                if len([call for call in self.calls if call == action]) < 3:
+                    if action == 'package_search':
+                        raise requests.exceptions.ConnectionError('Connection reset')
+                    return MockResponse(503, 'Service Unavailable', {'Retry-After': '0'})
+                if action == 'package_show':
+                    return MockResponse(404, '{"success": false, "error": {"__type": "Not Found Error", "message": "Not found"}}')
+                return MockResponse(200, '{"success": true, "result": {"name": "x"}}')
+
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={},
+                              retry_policy=RetryPolicy(max_attempts=3, backoff_factor=0),
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.retry_policy().max_attempts == 3
+        session = MockSession()
+        configuration.remoteckan().session = session
+        assert configuration.call_remoteckan('organization_show', {'id': 'x'}) == {'name': 'x'}
+        assert session.calls == ['organization_show'] * 3
+        assert configuration.call_remoteckan('package_search', {'q': 'x'}) == {'name': 'x'}
+        assert session.calls[3:] == ['package_search'] * 3
+        with pytest.raises(ckanapi.NotFound):
+            configuration.call_remoteckan('package_show', {'id': 'x'})
+        assert session.calls[6:] == ['package_show'] * 3
+        with pytest.raises(ckanapi.CKANAPIError):
+            configuration.call_remoteckan('package_create', {'name': 'x'})
+        assert session.calls[9:] == ['package_create']
+        session.calls = list()
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={},
+                              retry_policy=RetryPolicy(max_attempts=2, backoff_factor=0),
+                              project_config_yaml=project_config_yaml)
+        Configuration.read().remoteckan().session = session
+        with pytest.raises(ckanapi.CKANAPIError):
+            Configuration.read().call_remoteckan('user_show', {'id': 'x'})
+        assert session.calls == ['user_show'] * 2
+
+    def test_cache(self, project_config_yaml):
+        class MockResponse(object):
+            def __init__(self, status_code, text):
+                self.status_code = status_code
+                self.text = text
+
+        class MockSession(object):
+            calls = list()
+
+            def post(self, url, data, headers, files, allow_redirects, auth=None):
+                self.calls.append(url.split('/')[-1])
+                return MockResponse(200, '{"success": true, "result": [{"id": "abw"}]}')
+
+        cache = MemoryCache()
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={}, cache=cache,
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.cache() is cache
+        session = MockSession()
+        configuration.remoteckan().session = session
+        assert configuration.call_remoteckan('group_list', {'all_fields': True}) == [{'id': 'abw'}]
+        assert configuration.call_remoteckan('group_list', {'all_fields': True}) == [{'id': 'abw'}]
+        assert configuration.call_remoteckan('group_list', {'all_fields': False}) == [{'id': 'abw'}]
+        assert configuration.call_remoteckan('package_search', {'q': 'x'}) == [{'id': 'abw'}]
+        assert configuration.call_remoteckan('package_search', {'q': 'x'}) == [{'id': 'abw'}]
+        assert session.calls == ['group_list', 'group_list', 'package_search', 'package_search']
+        configuration.invalidate_cache(None)
+        assert len(cache) == 2
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        assert Configuration.read().cache() is None
+        Configuration.read().invalidate_cache('abw')
+
+    def test_metrics(self, project_config_yaml):
+        class MockResponse(object):
+            def __init__(self, status_code, text):
+                self.status_code = status_code
+                self.text = text
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth=None):
+                if 'package_show' in url:
+                    return MockResponse(404, '{"success": false, "error": {"__type": "Not Found Error", "message": "Not found"}}')
+                return MockResponse(200, '{"success": true, "result": {"id": "x"}}')
+
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={}, cache=MemoryCache(),
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        configuration.remoteckan().session = MockSession()
+        configuration.call_remoteckan('organization_show', {'id': 'x'})
+        configuration.call_remoteckan('organization_show', {'id': 'x'})
+        with pytest.raises(ckanapi.NotFound):
+            configuration.call_remoteckan('package_show', {'id': 'x'})
+        metrics = configuration.metrics().as_dict()
+        assert metrics['organization_show']['calls'] == 1
+        assert metrics['organization_show']['cache_hits'] == 1
+        assert metrics['organization_show']['request_bytes'] == len(b'{"id": "x"}')
+        assert metrics['organization_show']['response_bytes'] == len(b'{"success": true, "result": {"id": "x"}}')
+        assert metrics['package_show']['errors'] == {'NotFound': 1}
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY', hdx_config_dict={}, metrics=None,
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.metrics() is None
+        configuration.remoteckan().session = MockSession()
+        assert configuration.call_remoteckan('organization_show', {'id': 'x'}) == {'id': 'x'}
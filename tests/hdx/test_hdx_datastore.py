@@ -0,0 +1,240 @@
+# -*- coding: UTF-8 -*-
+"""Datastore Helper Tests"""
+import threading
+from datetime import datetime, date
+from os.path import join, exists
+
+import pytest
+import requests
+from hdx.utilities import raisefrom
+
+from hdx.data.hdxobject import HDXError
+from hdx.hdx_datastore import ChunkSizer, UpsertPipeline, Checkpoint, RowIndex, TypeInferrer, infer_schema
+
+
+class TestChunkSizer:
+    def test_get_rows(self):
+        sizer = ChunkSizer(target_bytes=10000, target_seconds=10.0, initial_rows=50, min_bytes=1000)
+        assert sizer.get_rows() == 50
+        sizer.record(50, 5000, 1.0)
+        assert sizer.bytes_per_row == 100
+        assert sizer.get_rows() == 100
+        sizer.record(100, 10000, 20.0)
+        assert sizer.get_rows() == 50
+        sizer.record(50, 5000, 1.0)
+        assert sizer.get_rows() == 75
+        sizer.record(50, 5000, 1.0)
+        assert sizer.get_rows() == 100
+        sizer.shrink()
+        sizer.shrink()
+        sizer.shrink()
+        sizer.shrink()
+        assert sizer.get_rows() == 10
+        with pytest.raises(ValueError):
+            ChunkSizer(target_bytes=0)
+
+    def test_is_too_large(self):
+        assert ChunkSizer.is_too_large(HDXError('Failed'), 413) is True
+        assert ChunkSizer.is_too_large(HDXError('Failed'), 500) is False
+        try:
+            try:
+                raise requests.exceptions.ReadTimeout('Timed out')
+            except Exception as e:
+                raisefrom(HDXError, 'Failed', e)
+        except HDXError as e:
+            assert ChunkSizer.is_too_large(e) is True
+        assert ChunkSizer.is_too_large(HDXError('Failed')) is False
+
+
+class TestUpsertPipeline:
+    def test_insert(self):
+        upserted = list()
+        lock = threading.Lock()
+
+        def upsert(rows, rownumbers):
+            with lock:
+                upserted.extend(rownumbers)
+
+        pipeline = UpsertPipeline(upsert, workers=3)
+        for offset in range(0, 100, 10):
+            assert pipeline.put([{'a': i} for i in range(offset, offset + 10)], offset) is True
+        assert pipeline.close() is None
+        assert sorted(upserted) == list(range(1, 101))
+        assert pipeline.committed == 100
+
+    def test_key(self):
+        upserted = dict()
+
+        def upsert(rows, rownumbers):
+            for row, rownumber in zip(rows, rownumbers):
+                upserted.setdefault(row['key'], list()).append(rownumber)
+
+        pipeline = UpsertPipeline(upsert, workers=4, key=['key'])
+        for offset in range(0, 100, 10):
+            pipeline.put([{'key': i % 7} for i in range(offset, offset + 10)], offset)
+        assert pipeline.close() is None
+        for key, rownumbers in upserted.items():
+            assert rownumbers == list(range(key + 1, 101, 7))
+
+    def test_error(self):
+        def upsert(rows, rownumbers):
+            if 25 in rownumbers:
+                raise HDXError('Failed for rows %d to %d' % (rownumbers[0], rownumbers[-1]))
+
+        pipeline = UpsertPipeline(upsert)
+        offset = 0
+        while pipeline.put([{'a': 1}] * 10, offset):
+            offset += 10
+            assert offset < 1000
+        error = pipeline.close()
+        assert str(error) == 'Failed for rows 21 to 30'
+        assert pipeline.committed == 20
+        commits = list()
+        pipeline = UpsertPipeline(upsert, workers=2, on_commit=commits.append)
+        offset = 0
+        while pipeline.put([{'a': 1}] * 10, offset):
+            offset += 10
+        pipeline.close()
+        assert commits == sorted(commits)
+        assert commits[-1] == pipeline.committed == 20
+
+
+    def test_partial(self):
+        def upsert(rows, rownumbers):
+            if 25 in rownumbers:
+                error = HDXError('Failed for row 25')
+                error.rows_done = 4
+                raise error
+
+        commits = list()
+        pipeline = UpsertPipeline(upsert, on_commit=commits.append)
+        offset = 10
+        while pipeline.put([{'a': 1}] * 10, offset):
+            offset += 10
+        assert str(pipeline.close()) == 'Failed for row 25'
+        assert pipeline.committed == 24
+        assert commits == [20, 24]
+        pipeline = UpsertPipeline(upsert, key=['a'], on_commit=commits.append)
+        offset = 10
+        while pipeline.put([{'a': 1}] * 10, offset):
+            offset += 10
+        pipeline.close()
+        assert pipeline.committed == 20
+        with pytest.raises(ValueError):
+            UpsertPipeline(upsert, workers=0)
+
+
+class TestCheckpoint:
+    def test_checkpoint(self, tmpdir):
+        path = join(str(tmpdir), 'checkpoint.json')
+        checkpoint = Checkpoint(path)
+        assert checkpoint.load('res1', 'hash1') == 0
+        checkpoint.save('res1', 'hash1', 20)
+        checkpoint.save('res1', 'hash1', 30)
+        assert not exists('%s.part' % path)
+        assert checkpoint.load('res1', 'hash1') == 30
+        assert checkpoint.load('res2', 'hash1') == 0
+        assert checkpoint.load('res1', 'hash2') == 0
+        with open(path, 'w') as f:
+            f.write('{"resource_id": ')
+        assert checkpoint.load('res1', 'hash1') == 0
+        checkpoint.delete()
+        assert not exists(path)
+        checkpoint.delete()
+
+
+class TestRowIndex:
+    def test_row_index(self, tmpdir):
+        path = join(str(tmpdir), 'index.json')
+        rows = [{'a': 1, 'b': 'x', 'c': 'one'}, {'a': 1, 'b': 'y', 'c': 'two'}, {'a': 2, 'b': 'x', 'c': 'three'}]
+        schema = [{'id': 'a', 'type': 'int'}, {'id': 'b', 'type': 'text'}, {'id': 'c', 'type': 'text'}]
+        index = RowIndex(path, ['a', 'b'], schema)
+        assert index.load('res1') is False
+        changed, rownumbers, keyhashes = index.get_changed(rows, [1, 2, 3])
+        assert changed == rows
+        assert rownumbers == [1, 2, 3]
+        index.commit(keyhashes[:2])
+        index.save('res1')
+        assert RowIndex.get_hash({'c': 'one', 'b': 'x', 'a': 1}) == RowIndex.get_hash(rows[0])
+        index = RowIndex(path, ['a', 'b'], schema)
+        assert index.load('res1') is True
+        assert RowIndex(path, ['a'], schema).load('res1') is False
+        assert RowIndex(path, ['a', 'b'], schema).load('res2') is False
+        textschema = [{'id': 'a', 'type': 'text'}, {'id': 'b', 'type': 'text'}, {'id': 'c', 'type': 'text'}]
+        assert RowIndex(path, ['a', 'b'], textschema).load('res1') is False
+        index.see(rows[:1])
+        changed, rownumbers, keyhashes = index.get_changed([rows[2], {'a': 1, 'b': 'y', 'c': 'four'}], [2, 3])
+        assert changed == [rows[2], {'a': 1, 'b': 'y', 'c': 'four'}]
+        assert rownumbers == [2, 3]
+        index.commit(keyhashes)
+        assert index.get_deleted() == list()
+        index.save('res1')
+        index = RowIndex(path, ['a', 'b'], schema)
+        index.load('res1')
+        index.see(rows[2:])
+        assert sorted(index.get_deleted()) == [[1, 'x'], [1, 'y']]
+        index.remove([[1, 'x'], [1, 'y']])
+        assert index.get_deleted() == list()
+        index.clear()
+        assert index.hashes == dict()
+
+
+class TestTypeInferrer:
+    def test_get_type(self):
+        assert TypeInferrer.get_type(None) is None
+        assert TypeInferrer.get_type(' ') is None
+        assert TypeInferrer.get_type(615) == 'int'
+        assert TypeInferrer.get_type(' -615 ') == 'int'
+        assert TypeInferrer.get_type('3000000000') == 'numeric'
+        assert TypeInferrer.get_type('007') == 'text'
+        assert TypeInferrer.get_type('0.5') == 'numeric'
+        assert TypeInferrer.get_type('007.5') == 'text'
+        assert TypeInferrer.get_type(36.61954) == 'numeric'
+        assert TypeInferrer.get_type('36.61954') == 'numeric'
+        assert TypeInferrer.get_type('1e-3') == 'numeric'
+        assert TypeInferrer.get_type('nan') == 'text'
+        assert TypeInferrer.get_type(float('nan')) == 'text'
+        assert TypeInferrer.get_type(True) == 'text'
+        assert TypeInferrer.get_type(datetime(2001, 4, 18)) == 'timestamp'
+        assert TypeInferrer.get_type('2001-04-18') == 'timestamp'
+        assert TypeInferrer.get_type('2001-04-18T10:20:30.5+02:00') == 'timestamp'
+        assert TypeInferrer.get_type('2001-18-04') == 'text'
+        assert TypeInferrer.get_type('18/04/2001') == 'text'
+
+    def test_add(self):
+        inferrer = TypeInferrer()
+        inferrer.add(['1', '1', '1', '2001-04-18', 'a', ''])
+        inferrer.add(['2', '2.5', '2001-04-18', '2001-04-19', '1'])
+        inferrer.add([None, '3', '3', None, None, None])
+        assert inferrer.get_schema(['a', 'b', 'c', None, 'e', 'f']) == [
+            {'id': 'a', 'type': 'int'}, {'id': 'b', 'type': 'numeric'}, {'id': 'c', 'type': 'text'},
+            {'id': 'e', 'type': 'text'}, {'id': 'f', 'type': 'text'}]
+
+    def test_convert(self):
+        assert TypeInferrer.convert(' 615 ', 'int') == 615
+        assert TypeInferrer.convert(615.0, 'int') == 615
+        assert TypeInferrer.convert('', 'int') is None
+        assert TypeInferrer.convert('abc', 'int') == 'abc'
+        assert TypeInferrer.convert('36.123456789012345678', 'numeric') == '36.123456789012345678'
+        assert TypeInferrer.convert(36.5, 'numeric') == 36.5
+        assert TypeInferrer.convert(datetime(2001, 4, 18), 'timestamp') == '2001-04-18T00:00:00'
+        assert TypeInferrer.convert(date(2001, 4, 18), 'timestamp') == '2001-04-18'
+        assert TypeInferrer.convert(None, 'timestamp') is None
+        assert TypeInferrer.convert(615, 'text') == '615'
+        assert TypeInferrer.convert(None, 'text') == 'None'
+
+    def test_infer_schema(self):
+        path = join('tests', 'fixtures', 'test_data.csv')
+        schema = infer_schema(path)['schema']
+        types = {field['id']: field['type'] for field in schema}
+        assert len(schema) == 25
+        assert types['GWNO'] == 'int'
+        assert types['EVENT_ID_CNTY'] == 'text'
+        assert types['EVENT_ID_NO_CNTY'] == 'text'
+        assert types['EVENT_DATE'] == 'text'
+        assert types['LATITUDE'] == 'numeric'
+        assert infer_schema(path, infer_rows=1)['schema'] == schema
+        path = join('tests', 'fixtures', 'datastore', 'ACLED-All-Africa-File_20170101-to-20170708.xlsx')
+        types = {field['id']: field['type'] for field in infer_schema(path, None)['schema']}
+        assert types['EVENT_DATE'] == 'timestamp'
+        assert types['FATALITIES'] == 'int'
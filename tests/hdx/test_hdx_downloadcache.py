@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+"""Download Cache Tests"""
+import threading
+from os.path import join, exists
+
+import pytest
+from six.moves import BaseHTTPServer
+
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+from hdx.hdx_downloadcache import DownloadCache
+from hdx.utilities.downloader import DownloadError
+
+
+class TestDownloadCache:
+    @pytest.fixture(scope='function')
+    def server(self):
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            content = b'a,b\n1,2\n'
+            etag = '"v1"'
+            requests = list()
+
+            def do_GET(self):
+                Handler.requests.append((self.path, self.headers.get('If-None-Match'),
+                                         self.headers.get('If-Modified-Since')))
+                if self.path.endswith('missing.csv'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == Handler.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', Handler.etag)
+                self.send_header('Last-Modified', 'Wed, 21 Oct 2015 07:28:00 GMT')
+                self.send_header('Content-Length', str(len(Handler.content)))
+                self.end_headers()
+                self.wfile.write(Handler.content)
+
+            def log_message(self, format, *args):
+                pass
+
+        httpd = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+        yield 'http://127.0.0.1:%d' % httpd.server_address[1], Handler
+        httpd.shutdown()
+        httpd.server_close()
+
+    def test_download(self, server, tmpdir):
+        baseurl, handler = server
+        url = '%s/dataset/resource/download/test_data.csv' % baseurl
+        folder = join(str(tmpdir), 'cache')
+        cache = DownloadCache(folder)
+        assert cache.get_metadata(url) is None
+        path, downloaded = cache.download(url)
+        assert downloaded is True
+        assert path.endswith('_test_data.csv')
+        with open(path, 'rb') as f:
+            assert f.read() == b'a,b\n1,2\n'
+        assert cache.get_metadata(url) == {'url': url, 'etag': '"v1"', 'last_modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+        path2, downloaded = DownloadCache(folder).download(url)
+        assert path2 == path
+        assert downloaded is False
+        assert handler.requests[-1] == ('/dataset/resource/download/test_data.csv', '"v1"',
+                                        'Wed, 21 Oct 2015 07:28:00 GMT')
+        handler.content = b'a,b\n3,4\n'
+        handler.etag = '"v2"'
+        path3, downloaded = cache.download(url)
+        assert path3 == path
+        assert downloaded is True
+        with open(path, 'rb') as f:
+            assert f.read() == b'a,b\n3,4\n'
+        assert not exists('%s.part' % path)
+        with pytest.raises(DownloadError):
+            cache.download('%s/missing.csv' % baseurl)
+
+    def test_resource_download(self, server, tmpdir, hdx_key_file, project_config_yaml):
+        baseurl, handler = server
+        url = '%s/download/test_data.csv' % baseurl
+        cache = DownloadCache(join(str(tmpdir), 'cache'))
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              download_cache=cache)
+        assert Configuration.read().download_cache() is cache
+        resource = Resource({'url': url})
+        resulturl, path = resource.download()
+        assert resulturl == url
+        assert path == cache.get_paths(url)[0]
+        folder = str(tmpdir)
+        _, path = resource.download(folder)
+        assert path == join(folder, 'test_data.csv')
+        with open(path, 'rb') as f:
+            assert f.read() == b'a,b\n1,2\n'
+        assert len(handler.requests) == 2
+        assert handler.requests[1][1] == '"v1"'
@@ -0,0 +1,47 @@
+# -*- coding: UTF-8 -*-
+"""Identity Map Tests"""
+import gc
+
+from hdx.hdx_identitymap import IdentityMap
+
+
+class HDXThing(dict):
+    pass
+
+
+class TestIdentityMap:
+    def test_get_add_remove(self):
+        identitymap = IdentityMap()
+        thing = HDXThing(id='1234', name='thing')
+        identitymap.add('Thing', thing, ['1234', 'thing', None])
+        assert identitymap.get('Thing', '1234') is thing
+        assert identitymap.get('Thing', 'thing') is thing
+        assert identitymap.get('Other', 'thing') is None
+        assert len(identitymap) == 2
+        identitymap.remove('Thing', ['1234', 'thing'])
+        assert identitymap.get('Thing', '1234') is None
+        identitymap.add('Thing', thing, ['1234'])
+        identitymap.clear()
+        assert len(identitymap) == 0
+
+    def test_weak(self):
+        identitymap = IdentityMap()
+        identitymap.add('Thing', HDXThing(id='1234'), ['1234'])
+        gc.collect()
+        assert identitymap.get('Thing', '1234') is None
+
+    def test_scope(self):
+        identitymap = IdentityMap()
+        kept = HDXThing(id='1')
+        identitymap.add('Thing', kept, ['1'])
+        with identitymap.scope():
+            identitymap.add('Thing', HDXThing(id='2'), ['2'])
+            gc.collect()
+            assert identitymap.get('Thing', '2')['id'] == '2'
+            with identitymap.scope() as inner:
+                inner.add('Thing', HDXThing(id='3'), ['3'])
+                assert identitymap.get('Thing', '3')['id'] == '3'
+            assert identitymap.get('Thing', '3') is None
+            assert identitymap.get('Thing', '2')['id'] == '2'
+        assert identitymap.get('Thing', '2') is None
+        assert identitymap.get('Thing', '1') is kept
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+"""Metrics Tests"""
+import pytest
+
+from hdx.hdx_metrics import Metrics
+
+
+class TestMetrics:
+    def test_record(self):
+        records = list()
+        metrics = Metrics(buckets=[0.1, 1.0, 10.0], callbacks=[records.append])
+        for _ in range(90):
+            metrics.record('package_show', 0.05, 100, 1000)
+        for _ in range(9):
+            metrics.record('package_show', 0.5, 100, 1000, retry=True)
+        metrics.record('package_show', 5.0, 100, 0, error=ValueError('x'))
+        metrics.record('package_search', 20.0, error=KeyError('x'))
+        metrics.record_cache_hit('package_show')
+        result = metrics.as_dict()
+        show = result['package_show']
+        assert show['calls'] == 100
+        assert show['retries'] == 9
+        assert show['cache_hits'] == 1
+        assert show['errors'] == {'ValueError': 1}
+        assert show['request_bytes'] == 10000
+        assert show['response_bytes'] == 99000
+        assert show['latency']['sum'] == pytest.approx(4.5 + 4.5 + 5.0)
+        assert show['latency']['max'] == 5.0
+        assert 0.0 < show['latency']['p50'] <= 0.1
+        assert 0.1 < show['latency']['p95'] <= 1.0
+        assert show['latency']['p99'] == pytest.approx(1.0)
+        search = result['package_search']
+        assert 10.0 < search['latency']['p50'] <= 20.0
+        assert search['errors'] == {'KeyError': 1}
+        assert len(records) == 101
+        assert records[-1] == {'action': 'package_search', 'latency': 20.0, 'request_bytes': 0,
+                               'response_bytes': 0, 'retry': False, 'error': 'KeyError'}
+        metrics.reset()
+        assert metrics.as_dict() == dict()
+
+    def test_to_prometheus(self):
+        metrics = Metrics(buckets=[0.1, 1.0])
+        metrics.record('package_show', 0.05, 10, 20)
+        metrics.record('package_show', 0.5, 10, 20, retry=True, error=ValueError('x'))
+        text = metrics.to_prometheus()
+        assert 'hdx_calls_total{action="package_show"} 2\n' in text
+        assert 'hdx_retries_total{action="package_show"} 1\n' in text
+        assert 'hdx_errors_total{action="package_show",error="ValueError"} 1\n' in text
+        assert 'hdx_bytes_total{action="package_show",direction="request"} 20\n' in text
+        assert 'hdx_bytes_total{action="package_show",direction="response"} 40\n' in text
+        assert 'hdx_call_duration_seconds_bucket{action="package_show",le="0.1"} 1\n' in text
+        assert 'hdx_call_duration_seconds_bucket{action="package_show",le="1.0"} 2\n' in text
+        assert 'hdx_call_duration_seconds_bucket{action="package_show",le="+Inf"} 2\n' in text
+        assert 'hdx_call_duration_seconds_count{action="package_show"} 2\n' in text
+        assert '# TYPE hdx_call_duration_seconds histogram\n' in text
+        assert Metrics().to_prometheus(prefix='x').startswith('# HELP x_calls_total')
@@ -0,0 +1,112 @@
+# -*- coding: UTF-8 -*-
+"""Rate Limiter Tests"""
+import threading
+import time
+
+import pytest
+
+from hdx.hdx_ratelimiter import TokenBucket, AdaptiveConcurrency, RateLimiter
+
+
+class TestRateLimiter:
+    def test_token_bucket(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+        bucket = TokenBucket(100, 2)
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        wait = bucket.reserve()
+        assert 0.0 < wait <= 0.01
+        bucket = TokenBucket(200, 1)
+        bucket.acquire()
+        start = time.time()
+        for _ in range(4):
+            bucket.acquire()
+        assert time.time() - start >= 0.015
+
+    def test_adaptive_concurrency(self):
+        with pytest.raises(ValueError):
+            AdaptiveConcurrency(2, min_limit=3)
+        concurrency = AdaptiveConcurrency(8, min_limit=2, latency_tolerance=None)
+        assert concurrency.limit == 8
+        starts = [concurrency.acquire() for _ in range(4)]
+        assert concurrency.inflight == 4
+        for start in starts:
+            concurrency.release(start, throttled=True)
+        assert concurrency.inflight == 0
+        assert concurrency.limit == 4
+        start = concurrency.acquire()
+        concurrency.release(start, throttled=True)
+        assert concurrency.limit == 2
+        start = concurrency.acquire()
+        concurrency.release(start, throttled=True)
+        assert concurrency.limit == 2
+        for _ in range(6):
+            concurrency.release(concurrency.acquire())
+        assert 4 < concurrency.limit < 5
+        for _ in range(100):
+            concurrency.release(concurrency.acquire())
+        assert concurrency.limit == 8
+
+    def test_latency(self):
+        concurrency = AdaptiveConcurrency(8, latency_tolerance=2.0)
+        concurrency.release(concurrency.acquire())
+        concurrency.average_latencies[None] = 0.001
+        start = concurrency.acquire()
+        time.sleep(0.01)
+        concurrency.release(start)
+        assert concurrency.limit == 4
+
+    def test_latency_per_action(self):
+        concurrency = AdaptiveConcurrency(8, latency_tolerance=2.0)
+        concurrency.average_latencies['package_show'] = 0.001
+        start = concurrency.acquire()
+        time.sleep(0.01)
+        concurrency.release(start, action='datastore_upsert')
+        assert concurrency.limit == 8
+        for _ in range(10):
+            start = concurrency.acquire()
+            concurrency.release(start, action='package_show')
+        assert concurrency.limit == 8
+        start = concurrency.acquire()
+        time.sleep(0.05)
+        concurrency.release(start, action='datastore_upsert')
+        assert concurrency.limit == 4
+        ratelimiter = RateLimiter(max_concurrency=8)
+        for action in ('package_show', 'datastore_upsert'):
+            ratelimiter.release(action, ratelimiter.acquire(action))
+        assert sorted(ratelimiter.default.concurrency.average_latencies) == ['datastore_upsert', 'package_show']
+
+    def test_blocks_at_limit(self):
+        concurrency = AdaptiveConcurrency(1)
+        start = concurrency.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            concurrency.release(concurrency.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        assert acquired.wait(0.05) is False
+        concurrency.release(start)
+        assert acquired.wait(5) is True
+        thread.join()
+
+    def test_per_action(self):
+        ratelimiter = RateLimiter(max_concurrency=4, actions={'datastore_upsert': {'rate': 10, 'max_concurrency': 2}})
+        assert ratelimiter.get_limiter('package_show') is ratelimiter.get_limiter('package_search')
+        upsert = ratelimiter.get_limiter('datastore_upsert')
+        assert upsert is not ratelimiter.default
+        assert upsert.bucket.rate == 10
+        assert ratelimiter.default.bucket is None
+        start = ratelimiter.acquire('datastore_upsert')
+        ratelimiter.release('datastore_upsert', start, 429)
+        assert upsert.concurrency.limit == 1
+        assert ratelimiter.default.concurrency.limit == 4
+        start = ratelimiter.acquire('package_show')
+        ratelimiter.release('package_show', start, 503)
+        assert ratelimiter.default.concurrency.limit == 2
+        start = ratelimiter.acquire('package_show')
+        ratelimiter.release('package_show', start, 404)
+        assert ratelimiter.default.concurrency.limit == 2.5
@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+"""Record and Replay Tests"""
+import json
+import time
+from os.path import join
+
+import ckanapi
+import pytest
+
+from hdx.data.organization import Organization
+from hdx.hdx_configuration import Configuration
+from hdx.hdx_replay import RecordingRemoteCKAN, ReplayRemoteCKAN, CassetteError, load_cassette
+
+
+class TestReplay:
+    @pytest.fixture(scope='function')
+    def cassette(self, tmpdir):
+        return join(str(tmpdir), 'cassette.json.gz')
+
+    @pytest.fixture(scope='function')
+    def session(self):
+        class MockResponse(object):
+            def __init__(self, status_code, text):
+                self.status_code = status_code
+                self.text = text
+
+        class MockSession(object):
+            calls = 0
+
+            def post(self, url, data, headers, files, allow_redirects, auth=None):
+                self.calls += 1
+                datadict = json.loads(data.decode('utf-8'))
+                if datadict['id'] == 'missing':
+                    return MockResponse(404, '{"success": false, "error": {"__type": "Not Found Error", "message": "Not found"}}')
+                return MockResponse(200, json.dumps({'success': True, 'result': {'id': datadict['id'], 'name': 'org',
+                                                                                  'title': 'Org %d' % self.calls}}))
+
+        return MockSession()
+
+    def test_record_replay(self, hdx_key_file, project_config_yaml, cassette, session):
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        remoteckan = RecordingRemoteCKAN(configuration.get_hdx_site_url(), session=session)
+        configuration.setup_remoteckan(remoteckan)
+        assert Organization.read_from_hdx('a')['title'] == 'Org 1'
+        assert Organization.read_from_hdx('a')['title'] == 'Org 2'
+        assert Organization.read_from_hdx('b')['title'] == 'Org 3'
+        assert Organization.read_from_hdx('missing') is None
+        remoteckan.save(cassette)
+        data = load_cassette(cassette)
+        assert data['address'] == configuration.get_hdx_site_url()
+        assert [(x['action'], x['request'], x['status']) for x in data['interactions']] == \
+            [('organization_show', {'id': 'a'}, 200), ('organization_show', {'id': 'a'}, 200),
+             ('organization_show', {'id': 'b'}, 200), ('organization_show', {'id': 'missing'}, 404)]
+
+        Configuration._create(hdx_key_file=hdx_key_file, project_config_yaml=project_config_yaml,
+                              remoteckan=ReplayRemoteCKAN(cassette))
+        assert Organization.read_from_hdx('a')['title'] == 'Org 1'
+        assert Organization.read_from_hdx('b')['title'] == 'Org 3'
+        assert Organization.read_from_hdx('a')['title'] == 'Org 2'
+        assert Organization.read_from_hdx('a')['title'] == 'Org 2'
+        assert Organization.read_from_hdx('missing') is None
+        assert Configuration.read().metrics().as_dict()['organization_show']['calls'] == 5
+        with pytest.raises(CassetteError):
+            Configuration.read().call_remoteckan('organization_show', {'id': 'c'})
+        assert session.calls == 4
+
+    def test_latency(self, hdx_key_file, project_config_yaml, cassette, session):
+        remoteckan = RecordingRemoteCKAN('https://data.humdata.org', session=session)
+        remoteckan.call_action('organization_show', {'id': 'a'})
+        remoteckan.save(cassette)
+        replay = ReplayRemoteCKAN(cassette, latency=0.02, match_request=False)
+        start = time.time()
+        assert replay.call_action('organization_show', {'id': 'anything'})['title'] == 'Org 1'
+        assert time.time() - start >= 0.02
+        assert replay.last_response()[0] == 200
+        with pytest.raises(CassetteError):
+            replay.call_action('package_show', {'id': 'a'})
+        replays = [ReplayRemoteCKAN(cassette, latency=0.0, jitter=0.01, seed=1) for _ in range(2)]
+        assert replays[0]._random.random() == replays[1]._random.random()
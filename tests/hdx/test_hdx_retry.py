@@ -0,0 +1,50 @@
+# -*- coding: UTF-8 -*-
+"""Retry Policy Tests"""
+from email.utils import formatdate
+from time import time
+
+import pytest
+import requests
+from ckanapi import NotFound, CKANAPIError
+
+from hdx.hdx_retry import RetryPolicy
+
+
+class TestRetryPolicy:
+    def test_is_idempotent(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+        policy = RetryPolicy(idempotent_actions=['hdx_basic_user_info'])
+        assert policy.is_idempotent('package_show', {'id': 'x'}) is True
+        assert policy.is_idempotent('package_search') is True
+        assert policy.is_idempotent('group_list') is True
+        assert policy.is_idempotent('resource_update', {'id': 'x'}) is True
+        assert policy.is_idempotent('resource_update', {'id': 'x'}, [('upload', 'file')]) is False
+        assert policy.is_idempotent('package_create', {'name': 'x'}) is False
+        assert policy.is_idempotent('datastore_upsert', {'method': 'upsert'}) is True
+        assert policy.is_idempotent('datastore_upsert', {'method': 'insert'}) is False
+        assert policy.is_idempotent('hdx_basic_user_info') is True
+
+    def test_is_transient(self):
+        policy = RetryPolicy()
+        assert policy.is_transient(CKANAPIError('x'), 503) is True
+        assert policy.is_transient(CKANAPIError('x'), 429) is True
+        assert policy.is_transient(NotFound('x'), 404) is False
+        assert policy.is_transient(requests.exceptions.ConnectionError('x')) is True
+        assert policy.is_transient(requests.exceptions.ReadTimeout('x')) is True
+        assert policy.is_transient(ValueError('x')) is False
+
+    def test_get_backoff(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False, max_retry_after=30)
+        assert policy.get_backoff(1) == 1
+        assert policy.get_backoff(2) == 2
+        assert policy.get_backoff(3) == 4
+        assert policy.get_backoff(4) == 5
+        assert policy.get_backoff(1, {'Retry-After': '10'}) == 10
+        assert policy.get_backoff(1, {'retry-after': '100'}) == 30
+        assert policy.get_backoff(4, {'Retry-After': '0'}) == 5
+        assert policy.get_backoff(1, {'Retry-After': 'rubbish'}) == 1
+        assert 15 <= policy.get_backoff(1, {'Retry-After': formatdate(time() + 20, usegmt=True)}) <= 20
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for attempt in range(1, 6):
+            assert 0 <= policy.get_backoff(attempt) <= min(5, 2 ** (attempt - 1))